@@ -5,6 +5,12 @@ Provides Django app configuration for the 'core' app.
 """
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.admin import autodiscover
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core.checks import Tags, register
+from django.db.backends.signals import connection_created
 from django.utils.translation import gettext_lazy as _
 
 
@@ -13,3 +19,32 @@ class CoreConfig(AppConfig):
 
     name = "core"
     verbose_name = _("Core")
+
+    def ready(self):
+        """Register the system checks and the query metrics of the app."""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import checks  # noqa: F401
+        from .metrics import install_query_recorder
+
+        if settings.METRICS_ENABLED:
+            connection_created.connect(install_query_recorder)
+
+
+def check_admin(app_configs, **kwargs):
+    """Discover the admin modules, then check the registered model admins."""
+    autodiscover()
+    return check_admin_app(app_configs, **kwargs)
+
+
+class LazyAdminConfig(SimpleAdminConfig):
+    """
+    The admin app of the "lazy" startup profile, see config/startup.py.
+
+    The admin modules of the apps are not imported by `django.setup()` but
+    by the URLconf, or by the system checks of the model admins.
+    """
+
+    def ready(self):
+        """Register the system checks of the admin."""
+        register(check_dependencies, Tags.admin)
+        register(check_admin, Tags.admin)
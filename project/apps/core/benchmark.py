@@ -0,0 +1,267 @@
+"""
+Module: benchmark
+
+Provides the building blocks of the in-process benchmarks: calling the WSGI
+and ASGI application like a server would, summarizing the latencies of a
+scenario and comparing results with a baseline.
+
+A baseline is a JSON file of the results of every scenario, keyed by the
+interface and scenario name, e.g. "wsgi schema":
+
+    {
+        "environment": {"python": "3.12.4", "django": "5.1", ...},
+        "results": {
+            "wsgi schema": {
+                "requests": 200,
+                "requests_per_second": 812.4,
+                "p50_ms": 1.2,
+                "p90_ms": 1.4,
+                "p99_ms": 2.9,
+                "queries_per_request": 2.0
+            }
+        }
+    }
+"""
+
+import asyncio
+import json
+import platform
+import sys
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from statistics import quantiles
+
+import django
+from django.db import connection
+
+# statistics that regress when they grow, and when they shrink; the p99 of a
+# few hundred requests is mostly noise of the machine, so it is only reported
+LOWER_IS_BETTER = ("p50_ms", "p90_ms")
+HIGHER_IS_BETTER = ("requests_per_second",)
+
+
+@dataclass
+class Scenario:
+    """A request sent repeatedly to the application."""
+
+    name: str
+    path: str
+    query: str = ""
+    method: str = "GET"
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+    # the status every response must have
+    status: int = 200
+    # the number of requests, defaults to the one of the suite
+    requests: int | None = None
+
+
+def wsgi_request(
+    application, path_info, query="", method="GET", headers=None, body=b""
+):
+    """
+    Call a WSGI application like a server would.
+
+    Args:
+        application (callable): The WSGI application.
+        path_info (str): The path of the request.
+        query (str, optional): The query string.
+        method (str, optional): The request method.
+        headers (dict, optional): The headers by lowercase name.
+        body (bytes, optional): The request body.
+
+    Returns:
+        int: The status code of the response.
+    """
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in (headers or {}).items():
+        key = name.upper().replace("-", "_")
+        if key != "CONTENT_TYPE":
+            key = f"HTTP_{key}"
+        environ[key] = value
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        del headers, exc_info
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return statuses[0]
+
+
+async def asgi_request(
+    application, path_info, query="", method="GET", headers=None, body=b""
+):
+    """
+    Call an ASGI application like a server would.
+
+    Args:
+        application (callable): The ASGI application.
+        path_info (str): The path of the request.
+        query (str, optional): The query string.
+        method (str, optional): The request method.
+        headers (dict, optional): The headers by lowercase name.
+        body (bytes, optional): The request body.
+
+    Returns:
+        int: The status code of the response.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path_info,
+        "raw_path": path_info.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-length", str(len(body)).encode()),
+            *(
+                (name.encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # the client never disconnects, Django cancels the wait
+        return await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+def summarize(elapsed, latencies, queries):
+    """
+    Summarize the requests of a scenario.
+
+    Args:
+        elapsed (float): The seconds all requests took.
+        latencies (list): The seconds of every request, at least two.
+        queries (int): The SQL queries of all requests.
+
+    Returns:
+        dict: The throughput, latency percentiles and queries per request.
+    """
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p90_ms": round(percentiles[89] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        "queries_per_request": round(queries / len(latencies), 2),
+    }
+
+
+def compare(baseline, results, threshold):
+    """
+    Compare results with a baseline.
+
+    Timings regress when they are worse than the baseline by more than the
+    threshold, query counts when they grow at all, since they do not depend
+    on the machine. Scenarios missing from either side are not compared.
+
+    Args:
+        baseline (dict): The baseline results by scenario.
+        results (dict): The new results by scenario.
+        threshold (float): The tolerated change, e.g. 0.2 for 20%.
+
+    Returns:
+        list: A description of every regression.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        expected = baseline.get(scenario)
+        if expected is None:
+            continue
+        for name in LOWER_IS_BETTER:
+            if result[name] > expected[name] * (1 + threshold):
+                regressions.append(
+                    f"{scenario}: {name} {result[name]:g} > "
+                    f"{expected[name]:g} (+{threshold:.0%})"
+                )
+        for name in HIGHER_IS_BETTER:
+            if result[name] < expected[name] * (1 - threshold):
+                regressions.append(
+                    f"{scenario}: {name} {result[name]:g} < "
+                    f"{expected[name]:g} (-{threshold:.0%})"
+                )
+        if result["queries_per_request"] > expected["queries_per_request"]:
+            regressions.append(
+                f"{scenario}: queries_per_request "
+                f"{result['queries_per_request']:g} > "
+                f"{expected['queries_per_request']:g}"
+            )
+    return regressions
+
+
+def get_environment():
+    """Describe the environment results were measured in."""
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+    }
+
+
+def load_baseline(path):
+    """
+    Load the results of a baseline file.
+
+    Returns:
+        dict: The results by scenario, None if there is no baseline.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+
+def save_baseline(path, results):
+    """Write results to a baseline file."""
+    Path(path).write_text(
+        json.dumps(
+            {"environment": get_environment(), "results": results},
+            indent=4,
+            sort_keys=True,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
@@ -0,0 +1,142 @@
+"""
+Module: checks
+
+Provides the system checks of the core app.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags
+from django.core.checks import Warning as CheckWarning
+from django.core.checks import register
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from .routers import get_replicas
+
+HOOKS = ("process_request", "process_view", "process_response")
+
+LOCMEM_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+# cache backends whose entries only the process writing them sees
+LOCAL_CACHE_BACKENDS = (
+    LOCMEM_CACHE_BACKEND,
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register("async")
+def check_async_middleware(app_configs, **kwargs):
+    """
+    Check that the middleware in `MIDDLEWARE` run without thread hops under
+    ASGI.
+
+    Django runs a synchronous-only middleware, and everything below it, in
+    a worker thread, and `MiddlewareMixin` runs every hook in a worker
+    thread, so either adds thread hops to every request.
+
+    Returns:
+        list: A warning for every middleware that hops threads.
+    """
+    del app_configs, kwargs
+    warnings = []
+    for path in settings.MIDDLEWARE:
+        middleware = import_string(path)
+        if not getattr(middleware, "async_capable", False):
+            warnings.append(
+                CheckWarning(
+                    f"{path} does not support async requests.",
+                    hint=(
+                        "Under ASGI it runs in a worker thread, make it "
+                        "async capable or remove it."
+                    ),
+                    obj=path,
+                    id="core.W001",
+                )
+            )
+        elif (
+            # pylint: disable-next=comparison-with-callable
+            getattr(middleware, "__acall__", None) == MiddlewareMixin.__acall__
+            and any(hasattr(middleware, hook) for hook in HOOKS)
+        ):
+            warnings.append(
+                CheckWarning(
+                    f"{path} runs its hooks in a worker thread.",
+                    hint=(
+                        "Add core.middleware.InlineHooksMixin if its hooks "
+                        "do not block, or use the version of "
+                        "core.middleware."
+                    ),
+                    obj=path,
+                    id="core.W002",
+                )
+            )
+    return warnings
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Check that the default and the response cache are shared by all
+    processes if they have to be, see `CACHE_SHARED_REQUIRED`, or if read
+    replicas are configured.
+
+    The revoked API tokens are kept in the default cache (see
+    `users.tokens`). In a cache of the process, a revoked or used token
+    still works on every other process and after a restart. The sessions
+    and tokens pinned to the primary after a write (see
+    `core.middleware.ReplicaPinningMiddleware`) are kept there too, in a
+    cache of the process their next request reads a replica that may not
+    have the write yet on every other process. The versions of the tags of
+    cached responses (see `core.http_cache`) are kept in the response
+    cache, in a memory cache of the process the other processes serve
+    their invalidated responses until they expire.
+
+    Returns:
+        list: An error for every cache that is local to the process.
+    """
+    del app_configs, kwargs
+    errors = []
+    default = settings.CACHES["default"]["BACKEND"]
+    response = settings.CACHES[settings.RESPONSE_CACHE_ALIAS]["BACKEND"]
+    if settings.CACHE_SHARED_REQUIRED and default in LOCAL_CACHE_BACKENDS:
+        errors.append(
+            Error(
+                "The default cache is local to the process.",
+                hint=(
+                    "Set CACHE_URL to a cache shared by all processes, e.g. "
+                    "redis://host:6379/0, the revoked API tokens are only "
+                    "known to the process that revoked them otherwise."
+                ),
+                obj="CACHES",
+                id="core.E001",
+            )
+        )
+    if get_replicas() and default in LOCAL_CACHE_BACKENDS:
+        errors.append(
+            Error(
+                "Read replicas are configured with a default cache that is "
+                "local to the process.",
+                hint=(
+                    "Set CACHE_URL to a cache shared by all processes, e.g. "
+                    "redis://host:6379/0, the reads after a write are only "
+                    "pinned to the primary on the process that served the "
+                    "write otherwise."
+                ),
+                obj="CACHES",
+                id="core.E002",
+            )
+        )
+    # a dummy cache stores no responses, so none can be stale
+    if settings.CACHE_SHARED_REQUIRED and response == LOCMEM_CACHE_BACKEND:
+        errors.append(
+            Error(
+                "The response cache is local to the process.",
+                hint=(
+                    "Set RESPONSE_CACHE_ALIAS to a cache shared by all "
+                    "processes, e.g. redis://host:6379/0, a process only "
+                    "invalidates its own cached responses otherwise."
+                ),
+                obj="CACHES",
+                id="core.E003",
+            )
+        )
+    return errors
@@ -0,0 +1,81 @@
+"""
+Module: fields
+
+Provides model fields shared by the apps.
+
+`UUID7Field` holds a time-ordered UUID (version 7 of RFC 9562), generated by
+`uuid7`. Ids generated one after the other are increasing, so new rows are
+appended to the end of the primary key index, instead of being inserted at
+random points of it like random `uuid4` ids, and rows can be paginated by
+id in the order they were created.
+"""
+
+import os
+import threading
+import time
+from uuid import UUID
+
+from django.db import models
+
+# the last millisecond and counter of `uuid7`, as one number
+_last = 0
+_lock = threading.Lock()
+
+
+def uuid7(timestamp=None):
+    """
+    Generate a time-ordered UUID, version 7 of RFC 9562.
+
+    The UUID starts with the Unix time in milliseconds, followed by a 12 bit
+    counter that keeps the UUIDs of a process increasing within the same
+    millisecond, and 62 random bits.
+
+    Args:
+        timestamp (float, optional): The Unix time in seconds to generate
+            a UUID of, e.g. of a row created earlier, with a random counter.
+            Defaults to now.
+
+    Returns:
+        UUID: The UUID.
+    """
+    global _last  # pylint: disable=global-statement
+    if timestamp is None:
+        with _lock:
+            # a counter overflowing within a millisecond moves on to the next
+            _last = max((time.time_ns() // 1_000_000) << 12, _last + 1)
+            clock = _last
+    else:
+        clock = (int(timestamp * 1000) << 12) | (
+            int.from_bytes(os.urandom(2)) & 0xFFF
+        )
+    random_bits = int.from_bytes(os.urandom(8)) >> 2
+    return UUID(
+        int=(clock >> 12) << 80
+        | 0x7 << 76
+        | (clock & 0xFFF) << 64
+        | 0b10 << 62
+        | random_bits
+    )
+
+
+class UUID7Field(models.UUIDField):
+    """
+    A UUID field defaulting to a time-ordered `uuid7`.
+
+    Usage:
+        id = UUID7Field(primary_key=True)
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("default", uuid7)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        """Leave out the arguments of the defaults."""
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get("default") is uuid7:
+            del kwargs["default"]
+        if kwargs.get("editable") is False:
+            del kwargs["editable"]
+        return name, path, args, kwargs
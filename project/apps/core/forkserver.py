@@ -0,0 +1,228 @@
+"""
+Module: forkserver
+
+Provides a pre-forking WSGI server. The server process loads everything the
+first requests of a worker would load (`preload`), then forks its workers,
+which start serving at once and share the loaded modules, URLconf, compiled
+templates, translation catalogs and API schema with the server process
+through copy-on-write memory, instead of each loading them again.
+
+Every worker serves the listening socket of the server process with Django's
+threaded WSGI server. A worker that exits is replaced. SIGTERM and SIGINT stop
+the workers after their current requests, SIGTTIN adds a worker and SIGTTOU
+removes one.
+
+Use it through the `runforkserver` management command. The workers use the
+WSGI server of `runserver`, which Django does not audit for production, so
+the server is meant for development; production runs gunicorn with the same
+preload (see `config/gunicorn.py`).
+"""
+
+import os
+import select
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import translation
+
+from config.startup import pause_collection, resume_collection
+
+from .metrics import clear_files
+from .schema import schema_cache
+
+# templates of the admin compiled before forking, cached by the cached
+# template loader (see config/templates.py)
+PRELOAD_TEMPLATES = (
+    "admin/base_site.html",
+    "admin/login.html",
+    "admin/index.html",
+    "admin/change_list.html",
+    "admin/change_form.html",
+)
+# seconds the workers get to finish their requests when stopping
+STOP_TIMEOUT = 10
+# seconds an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = 5
+# seconds before a worker that exited is replaced, so that a worker failing
+# at startup is not forked in a loop
+RESPAWN_DELAY = 1
+
+
+def preload():
+    """
+    Load what the first requests of a worker would, before forking it.
+
+    Loads the URLconf with the views and the admin modules, the translation
+    catalogs of every language, the admin templates and the API schema, and
+    closes the database connections, which must not be shared by processes.
+
+    The loaded objects are then frozen, see `config.startup`.
+    """
+    pause_collection()
+    get_resolver().url_patterns  # pylint: disable=expression-not-assigned
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            translation.gettext("")
+    for name in PRELOAD_TEMPLATES:
+        get_template(name)
+    schema_cache.warm()
+    connections.close_all()
+    resume_collection()
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    """Handles the requests of a connection, closing it when idle."""
+
+    # a stopping worker waits for the threads of its connections
+    timeout = KEEPALIVE_TIMEOUT
+
+
+class ForkServer:
+    """
+    Serves a WSGI application from forked worker processes.
+
+    Usage:
+        preload()
+        ForkServer(application, ("0.0.0.0", 8000), workers=4).serve()
+    """
+
+    def __init__(self, application, address, workers, log=print):
+        self.application = application
+        self.address = address
+        self.workers = workers
+        self.log = log
+        self.listener = None
+        self.server_name = None
+        # the pids of the running workers
+        self.children = set()
+        self.stopping = None
+        self._wakeup = None
+
+    def serve(self):
+        """Serve until SIGTERM or SIGINT and all workers have exited."""
+        self.listener = socket.create_server(self.address, backlog=1024)
+        # the pids of the workers of a previous server may be reused
+        clear_files()
+        self.server_name = socket.getfqdn(self.address[0])
+        self.log(
+            f"Serving on {self.address[0]}:{self.address[1]} with "
+            f"{self.workers} workers (pid {os.getpid()})"
+        )
+        wakeup, self._wakeup = os.pipe()
+        os.set_blocking(self._wakeup, False)
+        signal.set_wakeup_fd(self._wakeup)
+        signal.signal(signal.SIGCHLD, self._handle_signal)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._handle_signal)
+        signal.signal(signal.SIGTTIN, self._handle_signal)
+        signal.signal(signal.SIGTTOU, self._handle_signal)
+        next_spawn = 0.0
+        try:
+            while self.stopping is None or self.children:
+                self.reap()
+                if self.stopping is None:
+                    if len(self.children) > self.workers:
+                        os.kill(min(self.children), signal.SIGTERM)
+                    elif (
+                        len(self.children) < self.workers
+                        and time.monotonic() >= next_spawn
+                    ):
+                        self.spawn()
+                        # the initial workers are forked at once
+                        if len(self.children) == self.workers:
+                            next_spawn = time.monotonic() + RESPAWN_DELAY
+                        continue
+                elif time.monotonic() > self.stopping + STOP_TIMEOUT:
+                    for pid in self.children:
+                        os.kill(pid, signal.SIGKILL)
+                # wait for a signal, e.g. a worker exiting
+                if select.select([wakeup], [], [], RESPAWN_DELAY)[0]:
+                    os.read(wakeup, 512)
+        finally:
+            signal.set_wakeup_fd(-1)
+            os.close(wakeup)
+            os.close(self._wakeup)
+            self.listener.close()
+
+    def _handle_signal(self, signum, frame):
+        """Update the state of the server on a signal."""
+        del frame
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            if self.stopping is None:
+                self.stopping = time.monotonic()
+                self.log("Stopping the workers")
+                for pid in self.children:
+                    os.kill(pid, signal.SIGTERM)
+        elif signum == signal.SIGTTIN:
+            self.workers += 1
+        elif signum == signal.SIGTTOU:
+            self.workers = max(self.workers - 1, 1)
+
+    def reap(self):
+        """Remove the workers that exited."""
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            self.children.discard(pid)
+            if self.stopping is None and os.waitstatus_to_exitcode(status):
+                self.log(
+                    f"Worker {pid} exited with "
+                    f"{os.waitstatus_to_exitcode(status)}"
+                )
+
+    def spawn(self):
+        """Fork a worker."""
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        status = 0
+        try:
+            self.run_worker()
+        except BaseException:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            status = 1
+        finally:
+            # no cleanup of the server process, e.g. atexit handlers
+            os._exit(status)  # pylint: disable=protected-access
+
+    def run_worker(self):
+        """Serve requests in a forked worker until SIGTERM."""
+        signal.set_wakeup_fd(-1)
+        os.close(self._wakeup)
+        for signum in (signal.SIGCHLD, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+        # the server process stops and scales the workers
+        for signum in (signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_IGN)
+        server = ThreadedWSGIServer(
+            self.address, WorkerRequestHandler, bind_and_activate=False
+        )
+        # finish the current requests when stopping
+        server.daemon_threads = False
+        server.socket.close()
+        server.socket = self.listener
+        server.server_address = self.listener.getsockname()
+        server.server_name = self.server_name
+        server.server_port = server.server_address[1]
+        server.setup_environ()
+        server.set_app(self.application)
+        # shutdown() waits for serve_forever(), so it cannot be called from
+        # the signal handler of the thread running it
+        signal.signal(
+            signal.SIGTERM,
+            lambda signum, frame: threading.Thread(
+                target=server.shutdown
+            ).start(),
+        )
+        server.serve_forever()
+        server.server_close()
@@ -0,0 +1,43 @@
+"""
+Module: generators
+
+Provides the OpenAPI schema generator of the project, see
+`SPECTACULAR_SETTINGS`. It includes the views that are built on their first
+request (see `config.decorators.lazy_view`), such as the documentation
+views, which keep the schema generator of drf-spectacular out of the
+modules loaded to serve the other requests.
+"""
+
+from drf_spectacular import generators
+
+
+def resolve_view(callback):
+    """Return the view of a URL pattern, building it if it is lazy."""
+    build_view = getattr(callback, "build_view", None)
+    return callback if build_view is None else build_view()
+
+
+class EndpointEnumerator(generators.EndpointEnumerator):
+    """Endpoint enumerator building the lazy views."""
+
+    def should_include_endpoint(self, path, callback):
+        """Include the built view of a lazy view like any other."""
+        return super().should_include_endpoint(path, resolve_view(callback))
+
+    def get_allowed_methods(self, callback):
+        """Return the methods of the built view of a lazy view."""
+        return super().get_allowed_methods(resolve_view(callback))
+
+    def get_api_endpoints(self, patterns=None, prefix=""):
+        """Return the endpoints with the built views of the lazy views."""
+        endpoints = super().get_api_endpoints(patterns, prefix)
+        return [
+            (path, path_regex, method, resolve_view(callback))
+            for path, path_regex, method, callback in endpoints
+        ]
+
+
+class SchemaGenerator(generators.SchemaGenerator):
+    """Schema generator including the lazy views."""
+
+    endpoint_inspector_cls = EndpointEnumerator
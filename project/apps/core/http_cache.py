@@ -0,0 +1,327 @@
+"""
+Module: http_cache
+
+Provides a cache of rendered GET responses with conditional requests.
+
+Responses are cached per path and query, active language (as set by the
+`LocaleMiddleware`), accepted media type and principal, the authenticated
+user or anonymous. They are served with an ETag and a Last-Modified header,
+so that a client revalidating an unchanged response gets a 304 without the
+view running.
+
+Every entry is stored with the versions of its tags, e.g. "leaderboard" and
+the tag of its user. `invalidate_responses` replaces the version of a tag,
+which invalidates every entry stored with it, e.g. when a model is saved:
+
+    invalidate_responses(user_tag(user.pk))
+"""
+
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from asgiref.sync import iscoroutinefunction
+
+from .metrics import record_cache
+
+# headers of a response that are cached with its content
+CACHED_HEADERS = ("Content-Type", "Content-Language", "Allow")
+# request headers that select the principal or the content of a response
+VARY_HEADERS = ("Accept", "Authorization", "Cookie")
+
+
+def get_cache():
+    """Return the cache the responses are stored in."""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def user_tag(user_id):
+    """Return the tag of the responses of a user."""
+    return f"user:{user_id}"
+
+
+def get_tag_key(tag):
+    """Build the cache key of the version of a tag."""
+    return f"core:response-tag:{tag}"
+
+
+def invalidate_responses(*tags):
+    """
+    Invalidate the cached responses with any of the tags.
+
+    Args:
+        *tags (str): The tags, e.g. "leaderboard" or `user_tag(user.pk)`.
+    """
+    if tags:
+        get_cache().set_many(
+            {get_tag_key(tag): uuid.uuid4().hex for tag in tags}, None
+        )
+
+
+def invalidate_user_responses(user_ids):
+    """
+    Invalidate the cached responses of users.
+
+    Args:
+        user_ids (iterable): The ids of the users.
+    """
+    invalidate_responses(*map(user_tag, user_ids))
+
+
+def add_validators(response, etag, last_modified):
+    """Add the validators and caching headers to a response."""
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # responses depend on the principal, clients revalidate with a 304
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, VARY_HEADERS)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A rendered response and its validators."""
+
+    content: bytes
+    headers: dict
+    etag: str
+    last_modified: int
+    versions: dict
+
+    def to_response(self, request):
+        """Return the response, or a 304 if the client has it."""
+        response = HttpResponse(self.content, headers=self.headers)
+        add_validators(response, self.etag, self.last_modified)
+        return get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=self.last_modified,
+            response=response,
+        )
+
+
+@dataclass
+class Lookup:
+    """The result of looking up a request in a `ResponseCache`."""
+
+    key: str
+    versions: dict
+    response: HttpResponse = None
+
+
+class ResponseCache:
+    """
+    The cached responses of a view.
+
+    Usage:
+        response_cache = ResponseCache(tags=["leaderboard"])
+        lookup = response_cache.lookup(request, request.user)
+        if lookup.response is not None:
+            return lookup.response
+        return response_cache.store(lookup, request, view(request))
+    """
+
+    def __init__(self, tags=(), timeout=None):
+        self.tags = tuple(tags)
+        self.timeout = timeout
+
+    def is_cacheable(self, request):
+        """Check whether the response of a request may be cached."""
+        return request.method == "GET"
+
+    def get_tags(self, user):
+        """Return the tags of the responses of a principal."""
+        if user is not None and user.is_authenticated:
+            return (*self.tags, user_tag(user.pk))
+        return self.tags
+
+    def get_key(self, request, user):
+        """Build the cache key of the response of a request."""
+        principal = ""
+        if user is not None and user.is_authenticated:
+            principal = str(user.pk)
+        parts = (
+            settings.CODE_VERSION,
+            request.get_full_path(),
+            translation.get_language() or "",
+            request.headers.get("Accept", ""),
+            principal,
+        )
+        digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+        return f"core:response:{digest}"
+
+    def get_lookup(self, request, key, tags, values):
+        """Build the lookup from the cached entry and tag versions."""
+        versions = {tag: values.get(get_tag_key(tag)) for tag in tags}
+        lookup = Lookup(key=key, versions=versions)
+        entry = values.get(key)
+        if entry is not None and entry.versions == versions:
+            lookup.response = entry.to_response(request)
+        record_cache("response", lookup.response is not None)
+        return lookup
+
+    def lookup(self, request, user):
+        """
+        Look up the cached response of a request.
+
+        Args:
+            request (HttpRequest): The request.
+            user (User): The authenticated user, or None.
+
+        Returns:
+            Lookup: The lookup, with the response if it is cached.
+        """
+        key, tags = self.get_key(request, user), self.get_tags(user)
+        values = get_cache().get_many([key, *map(get_tag_key, tags)])
+        return self.get_lookup(request, key, tags, values)
+
+    async def alookup(self, request, user):
+        """Async version of `lookup`."""
+        key, tags = self.get_key(request, user), self.get_tags(user)
+        values = await get_cache().aget_many([key, *map(get_tag_key, tags)])
+        return self.get_lookup(request, key, tags, values)
+
+    @staticmethod
+    def is_storable(response):
+        """Check whether a response may be cached."""
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not response.has_header("Cache-Control")
+        )
+
+    def get_entry(self, response, versions):
+        """Render a response into a cache entry."""
+        if not getattr(response, "is_rendered", True):
+            response.render()
+        content = response.content
+        return CachedResponse(
+            content=content,
+            headers={
+                header: response[header]
+                for header in CACHED_HEADERS
+                if response.has_header(header)
+            },
+            etag=f'"{hashlib.sha256(content).hexdigest()}"',
+            last_modified=int(time.time()),
+            versions=versions,
+        )
+
+    def store(self, lookup, request, response):
+        """
+        Cache the response of a request, if it may be cached.
+
+        Args:
+            lookup (Lookup): The lookup that missed.
+            request (HttpRequest): The request.
+            response (HttpResponse): The response of the view.
+
+        Returns:
+            HttpResponse: The response with validators, or a 304 if the
+            client has it.
+        """
+        if not self.is_storable(response):
+            return response
+        cache = get_cache()
+        versions = dict(lookup.versions)
+        for tag, version in versions.items():
+            if version is None:
+                # entries are never stored without a version, so that they
+                # are invalid once an evicted version is created again
+                key = get_tag_key(tag)
+                cache.add(key, uuid.uuid4().hex, None)
+                versions[tag] = cache.get(key)
+        entry = self.get_entry(response, versions)
+        cache.set(lookup.key, entry, self.get_timeout())
+        return self.finish(request, response, entry)
+
+    async def astore(self, lookup, request, response):
+        """Async version of `store`."""
+        if not self.is_storable(response):
+            return response
+        cache = get_cache()
+        versions = dict(lookup.versions)
+        for tag, version in versions.items():
+            if version is None:
+                key = get_tag_key(tag)
+                await cache.aadd(key, uuid.uuid4().hex, None)
+                versions[tag] = await cache.aget(key)
+        entry = self.get_entry(response, versions)
+        await cache.aset(lookup.key, entry, self.get_timeout())
+        return self.finish(request, response, entry)
+
+    def get_timeout(self):
+        """Return the seconds a response is cached."""
+        if self.timeout is None:
+            return settings.RESPONSE_CACHE_TIMEOUT
+        return self.timeout
+
+    @staticmethod
+    def finish(request, response, entry):
+        """Add the validators of the entry to the fresh response."""
+        add_validators(response, entry.etag, entry.last_modified)
+        return get_conditional_response(
+            request,
+            etag=entry.etag,
+            last_modified=entry.last_modified,
+            response=response,
+        )
+
+
+def cache_response(*tags, timeout=None):
+    """
+    Decorator caching the GET responses of a Django view, see
+    `ResponseCache`. The principal is the user of the session.
+
+    Usage:
+        cache_response("docs")(view)
+
+    Args:
+        *tags (str): The tags of the responses.
+        timeout (int, optional): The seconds a response is cached, defaults
+            to `RESPONSE_CACHE_TIMEOUT`.
+    """
+    response_cache = ResponseCache(tags, timeout)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                if not response_cache.is_cacheable(request):
+                    return await view_func(request, *args, **kwargs)
+                user = await request.auser()
+                lookup = await response_cache.alookup(request, user)
+                if lookup.response is not None:
+                    return lookup.response
+                response = await view_func(request, *args, **kwargs)
+                return await response_cache.astore(lookup, request, response)
+
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not response_cache.is_cacheable(request):
+                return view_func(request, *args, **kwargs)
+            lookup = response_cache.lookup(request, request.user)
+            if lookup.response is not None:
+                return lookup.response
+            response = view_func(request, *args, **kwargs)
+            return response_cache.store(lookup, request, response)
+
+        return _wrapped_view
+
+    return decorator
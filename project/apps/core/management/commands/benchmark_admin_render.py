@@ -0,0 +1,183 @@
+"""
+Module: benchmark_admin_render
+
+Provides a management command that reports the time admin pages spend
+rendering templates, separately from the time spent in queries, for every
+template profile, with and without the template fragment cache.
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.backends.django import Template
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from config.templates import TEMPLATE_PROFILES, template_config
+
+from users.models import CustomUser
+
+PAGES = {
+    "admin index": "admin:index",
+    "user changelist": "admin:users_customuser_changelist",
+}
+
+
+class Timings:
+    """The time spent in queries and templates, in seconds."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        # query time while a template renders, e.g. of lazy querysets
+        self.render_query_time = 0.0
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every query."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            self.queries += 1
+            self.query_time += elapsed
+            if self.rendering:
+                self.render_query_time += elapsed
+
+    @contextmanager
+    def render(self):
+        """Time the outermost template render."""
+        if self.rendering:
+            yield
+            return
+        self.rendering = True
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.render_time += perf_counter() - start
+            self.rendering = False
+
+    @property
+    def template_time(self):
+        """The render time without the queries run while rendering."""
+        return self.render_time - self.render_query_time
+
+
+class Command(BaseCommand):
+    """Benchmark the rendering of admin pages."""
+
+    help = (
+        "Report milliseconds per request spent in templates and in queries "
+        "for the admin index and the user changelist. All data is rolled "
+        "back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="The number of requests per page and configuration.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100,
+            help="The number of users listed on the changelist.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        number = options["requests"]
+        self.stdout.write(
+            f"{'page':18}{'configuration':28}{'total ms':>10}"
+            f"{'template ms':>13}{'query ms':>10}{'queries':>9}"
+        )
+        with override_settings(DEBUG=False), transaction.atomic():
+            user = CustomUser.objects.create_superuser(
+                email="render-benchmark@example.com", password=None
+            )
+            CustomUser.objects.bulk_create(
+                CustomUser(email=f"render-benchmark-{i}@example.com")
+                for i in range(options["users"])
+            )
+            for page, url_name in PAGES.items():
+                for configuration, overrides in self.get_configurations():
+                    with override_settings(**overrides):
+                        caches["template_fragments"].clear()
+                        total, timings = self.measure(
+                            user, reverse(url_name), number
+                        )
+                    self.stdout.write(
+                        f"{page:18}{configuration:28}"
+                        f"{total / number * 1000:10.3f}"
+                        f"{timings.template_time / number * 1000:13.3f}"
+                        f"{timings.query_time / number * 1000:10.3f}"
+                        f"{timings.queries / number:9.1f}"
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def get_configurations():
+        """
+        Return the benchmarked configurations.
+
+        Returns:
+            list: Tuples of a name and the settings to override.
+        """
+        dirs = settings.TEMPLATES[0]["DIRS"]
+        no_fragments = {
+            **settings.CACHES,
+            "template_fragments": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            },
+        }
+        configurations = []
+        for profile in TEMPLATE_PROFILES:
+            templates = [template_config(profile, dirs)]
+            configurations += [
+                (
+                    f"{profile}, no fragments",
+                    {"TEMPLATES": templates, "CACHES": no_fragments},
+                ),
+                (profile, {"TEMPLATES": templates}),
+            ]
+        return configurations
+
+    @staticmethod
+    def measure(user, url, number):
+        """
+        Load a page as a logged in user.
+
+        Returns:
+            tuple: The total seconds and the `Timings` of the requests.
+        """
+        client = Client()
+        client.force_login(user)
+        # warm up the template loaders and the fragment cache
+        client.get(url)
+        timings = Timings()
+        render = Template.render
+
+        def timed_render(template, *args, **kwargs):
+            with timings.render():
+                return render(template, *args, **kwargs)
+
+        with (
+            mock.patch.object(Template, "render", timed_render),
+            connection.execute_wrapper(timings.execute),
+        ):
+            start = perf_counter()
+            for _ in range(number):
+                client.get(url)
+            total = perf_counter() - start
+        return total, timings
@@ -0,0 +1,171 @@
+"""
+Module: benchmark_asgi
+
+Provides a management command that compares the requests/second and the
+latency of the WSGI and the ASGI application of the project under
+concurrent requests to a view waiting for slow I/O, e.g. an external API.
+
+Both applications run in-process with the full middleware stack, without a
+server or sockets. WSGI requests are served by a fixed number of threads,
+like a threaded server (`gunicorn --threads`), ASGI requests by the event
+loop, like daphne or uvicorn. The view waits with `time.sleep` under WSGI
+and with `asyncio.sleep` under ASGI.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from threading import BoundedSemaphore
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.test import override_settings
+from django.urls import path
+
+from core.benchmark import asgi_request, wsgi_request
+
+
+def slow_view(request):
+    """Wait for `delay` seconds, blocking the serving thread."""
+    delay = float(request.GET["delay"])
+    time.sleep(delay)
+    return JsonResponse({"delay": delay})
+
+
+async def async_slow_view(request):
+    """Wait for `delay` seconds, serving other requests meanwhile."""
+    delay = float(request.GET["delay"])
+    await asyncio.sleep(delay)
+    return JsonResponse({"delay": delay})
+
+
+# URLconf of the benchmark, see `ROOT_URLCONF` in `Command.handle`
+urlpatterns = [
+    path("slow/", slow_view),
+    path("async/slow/", async_slow_view),
+]
+
+
+class Command(BaseCommand):
+    """Benchmark the WSGI against the ASGI application."""
+
+    help = (
+        "Send concurrent requests to a view waiting for slow I/O through "
+        "config.wsgi and config.asgi and report requests/second and the "
+        "p50 and p99 latency."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="The number of requests sent to each application.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=200,
+            help="The number of clients sending requests at once.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="The number of threads serving WSGI requests.",
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=50,
+            help="The milliseconds the view waits for I/O.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        # pylint: disable=import-outside-toplevel
+        from config.asgi import application as asgi_application
+        from config.wsgi import application as wsgi_application
+
+        query = f"delay={options['delay'] / 1000}"
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} "
+            f"clients, {options['delay']:g} ms I/O per request"
+        )
+        # no query log, which would grow with the number of requests
+        with override_settings(DEBUG=False, ROOT_URLCONF=__name__):
+            self.report(
+                f"wsgi ({options['threads']} threads)",
+                *self.run_wsgi(wsgi_application, query, options),
+            )
+            self.report(
+                "asgi",
+                *asyncio.run(self.run_asgi(asgi_application, query, options)),
+            )
+
+    def run_wsgi(self, application, query, options):
+        """
+        Send the requests to the WSGI application from client threads.
+
+        Returns:
+            tuple: The elapsed seconds and the latency of every request.
+        """
+        server = BoundedSemaphore(options["threads"])
+
+        def send(index):
+            del index
+            start = perf_counter()
+            # wait for a free server thread, like a request in the backlog
+            with server:
+                status = wsgi_request(application, "/slow/", query)
+            return status, perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            start = perf_counter()
+            results = list(pool.map(send, range(options["requests"])))
+            elapsed = perf_counter() - start
+        return elapsed, self.get_latencies(results)
+
+    async def run_asgi(self, application, query, options):
+        """
+        Send the requests to the ASGI application from client tasks.
+
+        Returns:
+            tuple: The elapsed seconds and the latency of every request.
+        """
+        pending = iter(range(options["requests"]))
+        results = []
+
+        async def client():
+            for _ in pending:
+                start = perf_counter()
+                status = await asgi_request(application, "/async/slow/", query)
+                results.append((status, perf_counter() - start))
+
+        start = perf_counter()
+        await asyncio.gather(
+            *(client() for _ in range(options["concurrency"]))
+        )
+        return perf_counter() - start, self.get_latencies(results)
+
+    @staticmethod
+    def get_latencies(results):
+        """Return the latencies of successful requests, or fail."""
+        failed = [status for status, latency in results if status != 200]
+        if failed:
+            raise CommandError(
+                f"{len(failed)} requests failed, e.g. with status {failed[0]}"
+            )
+        return [latency for status, latency in results]
+
+    def report(self, name, elapsed, latencies):
+        """Write the throughput and latency of an application."""
+        percentiles = quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:20} {len(latencies) / elapsed:8.1f} requests/s "
+            f"p50 {percentiles[49] * 1000:7.1f} ms "
+            f"p99 {percentiles[98] * 1000:7.1f} ms"
+        )
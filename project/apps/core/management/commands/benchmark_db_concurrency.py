@@ -0,0 +1,119 @@
+"""
+Module: benchmark_db_concurrency
+
+Provides a management command that writes users from several threads and
+processes at once, to measure write throughput and locking errors of the
+configured database.
+"""
+
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from users.models import CustomUser
+
+# email domain of the users created by the benchmark
+BENCHMARK_DOMAIN = "db-benchmark.invalid"
+
+
+def init_process():
+    """Set up Django in a worker process without inherited connections."""
+    django.setup()
+    connections.close_all()
+
+
+def write_users(prefix, count):
+    """
+    Write users one transaction at a time, like concurrent sign-ups.
+
+    Args:
+        prefix (str): A prefix making the emails of this worker unique.
+        count (int): The number of users to write.
+
+    Returns:
+        tuple: The number of written users and of failed transactions.
+    """
+    written = errors = 0
+    for i in range(count):
+        email = f"{prefix}-{i}@{BENCHMARK_DOMAIN}"
+        try:
+            with transaction.atomic():
+                # read before writing, which upgrades the lock of a deferred
+                # SQLite transaction
+                if not CustomUser.objects.filter(email=email).exists():
+                    CustomUser.objects.create(email=email, password="!")
+            written += 1
+        except OperationalError:
+            errors += 1
+    connection.close()
+    return written, errors
+
+
+class Command(BaseCommand):
+    """Benchmark concurrent writes against the configured database."""
+
+    help = (
+        "Write users from several threads and processes and report "
+        "users/second and failed transactions (e.g. 'database is locked'). "
+        "Run once with SQLITE_TUNING=0 to compare with the untuned database."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="The number of concurrent threads or processes.",
+        )
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=200,
+            help="The number of users each worker writes.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        workers, count = options["workers"], options["count"]
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"{connection.vendor} {settings_dict['NAME']} "
+            f"options={settings_dict.get('OPTIONS', {})}"
+        )
+        # processes must not inherit an open connection
+        connections.close_all()
+        try:
+            for name, executor in (
+                ("threads", ThreadPoolExecutor(max_workers=workers)),
+                (
+                    "processes",
+                    ProcessPoolExecutor(
+                        max_workers=workers, initializer=init_process
+                    ),
+                ),
+            ):
+                with executor:
+                    start = perf_counter()
+                    results = list(
+                        executor.map(
+                            write_users,
+                            [uuid.uuid4().hex for _ in range(workers)],
+                            [count] * workers,
+                        )
+                    )
+                    elapsed = perf_counter() - start
+                written = sum(result[0] for result in results)
+                errors = sum(result[1] for result in results)
+                self.stdout.write(
+                    f"{name:10} {written / elapsed:10.1f} users/s "
+                    f"{errors:6} failed transactions"
+                )
+        finally:
+            CustomUser.objects.filter(
+                email__endswith=f"@{BENCHMARK_DOMAIN}"
+            ).delete()
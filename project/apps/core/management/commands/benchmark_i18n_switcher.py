@@ -0,0 +1,82 @@
+"""
+Module: benchmark_i18n_switcher
+
+Provides a management command that compares the language switcher of the
+admin header before and after precomputing the language table.
+"""
+
+from timeit import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.templatetags.i18n_switcher import (
+    get_lang_alternates,
+    switch_lang_code,
+)
+
+
+def legacy_switch_lang_code(path, language):
+    """The original `switch_lang_code`, kept as the benchmark baseline."""
+    lang_codes = [c for (c, name) in settings.LANGUAGES]
+    if not path:
+        raise ValueError("URL path for language switch is empty")
+    if not path.startswith("/"):
+        raise ValueError(
+            'URL path for language switch does not start with "/"'
+        )
+    if language not in lang_codes:
+        raise ValueError(f"{language} is not a supported language code")
+    parts = path.split("/")
+    if parts[1] in lang_codes:
+        parts[1] = language
+    else:
+        parts[0] = "/" + language
+    return "/".join(parts)
+
+
+class Command(BaseCommand):
+    """Benchmark the i18n_switcher filters."""
+
+    help = (
+        "Compare rendering the language alternates of a path with one "
+        "switch_i18n call per language against one i18n_alternates call."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=100000,
+            help="The number of simulated page renders.",
+        )
+        parser.add_argument(
+            "--path",
+            default="/en/users/customuser/?q=example&o=1",
+            help="The request path to switch.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        number, path = options["number"], options["path"]
+        codes = [code for (code, name) in settings.LANGUAGES]
+        results = {
+            "legacy switch_i18n per language": timeit(
+                lambda: [legacy_switch_lang_code(path, c) for c in codes],
+                number=number,
+            ),
+            "cached switch_i18n per language": timeit(
+                lambda: [switch_lang_code(path, c) for c in codes],
+                number=number,
+            ),
+            "i18n_alternates (one call)": timeit(
+                lambda: get_lang_alternates(path), number=number
+            ),
+        }
+        baseline = results["legacy switch_i18n per language"]
+        for name, elapsed in results.items():
+            self.stdout.write(
+                f"{name:35} {elapsed / number * 1e6:8.3f} us/render "
+                f"{baseline / elapsed:6.1f}x"
+            )
@@ -0,0 +1,117 @@
+"""
+Module: benchmark_sessions
+
+Provides a management command that reports the session queries per request
+of every session mode.
+"""
+
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import CustomUser
+
+SESSION_MODES = {
+    "db": "django.contrib.sessions.backends.db",
+    "db (coalesced)": "core.sessions.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cached_db (coalesced)": "core.sessions.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+
+def rewrite_session_view(request):
+    """A view that stores a value the session already holds."""
+    request.session["language"] = "en"
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    """Benchmark the session modes."""
+
+    help = (
+        "Report session queries and time per request for every session "
+        "mode, for admin page loads and for requests that rewrite an "
+        "unchanged session value. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="The number of requests per mode and scenario.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        number = options["requests"]
+        self.stdout.write(
+            f"{'mode':24}{'admin q/req':>12}{'admin ms':>10}"
+            f"{'rewrite q/req':>15}{'rewrite ms':>12}"
+        )
+        with transaction.atomic():
+            user = CustomUser.objects.create_superuser(
+                email="session-benchmark@example.com", password=None
+            )
+            for mode, engine in SESSION_MODES.items():
+                cache.clear()
+                with override_settings(SESSION_ENGINE=engine):
+                    admin = self._measure(self._admin_requests, user, number)
+                    rewrite = self._measure(self._rewrite_requests, number)
+                self.stdout.write(
+                    f"{mode:24}{admin[0]:12.2f}{admin[1]:10.3f}"
+                    f"{rewrite[0]:15.2f}{rewrite[1]:12.3f}"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _measure(func, *args):
+        """
+        Run a scenario and measure its session queries and time.
+
+        Returns:
+            tuple: The session queries and milliseconds per request.
+        """
+        number = args[-1]
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            func(*args)
+            elapsed = perf_counter() - start
+        session_queries = [
+            query for query in queries if "django_session" in query["sql"]
+        ]
+        return len(session_queries) / number, elapsed / number * 1000
+
+    @staticmethod
+    def _admin_requests(user, number):
+        """Load the admin index as a logged in user."""
+        client = Client()
+        client.force_login(user)
+        url = reverse("admin:index")
+        for _ in range(number):
+            client.get(url)
+
+    @staticmethod
+    def _rewrite_requests(number):
+        """Send requests that rewrite an unchanged session value."""
+        middleware = SessionMiddleware(rewrite_session_view)
+        factory = RequestFactory()
+        cookies = {}
+        for _ in range(number):
+            request = factory.get("/")
+            request.COOKIES.update(cookies)
+            response = middleware(request)
+            if settings.SESSION_COOKIE_NAME in response.cookies:
+                cookies[settings.SESSION_COOKIE_NAME] = response.cookies[
+                    settings.SESSION_COOKIE_NAME
+                ].value
@@ -0,0 +1,385 @@
+"""
+Module: benchmark_suite
+
+Provides a management command that sends every benchmark scenario, e.g. a
+login, the admin user changelist or the API schema, through the WSGI and
+the ASGI application of the project in-process, and compares throughput,
+latency percentiles and SQL queries per request with a JSON baseline.
+
+Requests are sent one at a time with the full middleware stack, so that the
+latencies are those of the code rather than of a contended machine. The
+users of the suite are created in a transaction that is rolled back.
+
+Add a scenario to `Command.get_scenarios` with every new endpoint.
+"""
+
+import json
+from time import perf_counter
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import translation
+from django.utils.crypto import get_random_string
+
+from asgiref.sync import async_to_sync
+
+from core.benchmark import (
+    Scenario,
+    asgi_request,
+    compare,
+    load_baseline,
+    save_baseline,
+    summarize,
+    wsgi_request,
+)
+from users.models import CustomUser
+from users.tokens import create_token_pair
+
+# email domain of the users created by the suite
+BENCHMARK_DOMAIN = "suite-benchmark.invalid"
+# password of the benchmark admin
+PASSWORD = "benchmark-password"
+# number of users inserted at once
+INSERT_BATCH_SIZE = 5000
+# number of logins per interface, every one hashes the password
+LOGIN_REQUESTS = 20
+
+
+class Command(BaseCommand):
+    """Benchmark the endpoints of the project against a baseline."""
+
+    help = (
+        "Send the benchmark scenarios through config.wsgi and config.asgi "
+        "and report requests/second, p50/p90/p99 latency and queries per "
+        "request. Fails if a result regressed beyond the threshold compared "
+        "with the baseline file, unless --save-baseline is given."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="The number of requests per scenario and interface.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            nargs="+",
+            default=[10000, 100000],
+            help="The user counts the admin changelist is measured at.",
+        )
+        parser.add_argument(
+            "--interface",
+            choices=["wsgi", "asgi"],
+            nargs="+",
+            default=["wsgi", "asgi"],
+            help="The applications to send the requests to.",
+        )
+        parser.add_argument(
+            "--scenario",
+            nargs="+",
+            help="Only run the scenarios whose name contains one of these.",
+        )
+        parser.add_argument(
+            "--baseline",
+            default="benchmark-baseline.json",
+            help="The baseline file to compare with or to save.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results to the baseline file instead.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="The tolerated slowdown, e.g. 0.25 for 25%%.",
+        )
+        parser.add_argument(
+            "--output",
+            help="A file to write the results to as JSON.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the suite."""
+        self.options = options
+        results = {}
+        # the connection has to stay open for the rolled back transaction,
+        # as with the test client
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            # no query log, which would grow with the number of requests
+            with override_settings(DEBUG=False), translation.override(
+                "en"
+            ), transaction.atomic():
+                applications = {
+                    "wsgi": get_wsgi_application(),
+                    "asgi": get_asgi_application(),
+                }
+                admin = CustomUser.objects.create_superuser(
+                    email=f"admin@{BENCHMARK_DOMAIN}", password=PASSWORD
+                )
+                self.write_header()
+                for scenario in self.get_scenarios(admin):
+                    if self.is_selected(scenario):
+                        self.run_scenario(applications, scenario, results)
+                for count in sorted(options["users"]):
+                    scenarios = [
+                        scenario
+                        for scenario in self.get_changelist_scenarios(
+                            admin, count
+                        )
+                        if self.is_selected(scenario)
+                    ]
+                    if scenarios:
+                        self.insert_users(count)
+                    for scenario in scenarios:
+                        self.run_scenario(applications, scenario, results)
+                transaction.set_rollback(True)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=4, sort_keys=True)
+        self.check_baseline(results)
+
+    @staticmethod
+    def get_session_headers(user):
+        """Return the headers of a request with a logged in session."""
+        client = Client()
+        client.force_login(user)
+        return {
+            "cookie": f"{settings.SESSION_COOKIE_NAME}="
+            f"{client.session.session_key}"
+        }
+
+    def get_scenarios(self, admin):
+        """
+        Build the scenarios that do not depend on the number of users.
+
+        Args:
+            admin (CustomUser): The superuser the requests are made as.
+
+        Returns:
+            list: The scenarios.
+        """
+        session = self.get_session_headers(admin)
+        csrf_token = get_random_string(32)
+        bearer = {
+            "authorization": f"Bearer {create_token_pair(admin)['access']}"
+        }
+        return [
+            Scenario(
+                "login (admin)",
+                reverse("admin:login"),
+                method="POST",
+                headers={
+                    "content-type": "application/x-www-form-urlencoded",
+                    "cookie": f"csrftoken={csrf_token}",
+                },
+                body=(
+                    f"username=admin%40{BENCHMARK_DOMAIN}&password={PASSWORD}"
+                    f"&csrfmiddlewaretoken={csrf_token}"
+                ).encode(),
+                status=302,
+                requests=LOGIN_REQUESTS,
+            ),
+            Scenario(
+                "login (api token)",
+                reverse("token_obtain"),
+                method="POST",
+                headers={"content-type": "application/json"},
+                body=json.dumps(
+                    {"email": admin.email, "password": PASSWORD}
+                ).encode(),
+                requests=LOGIN_REQUESTS,
+            ),
+            Scenario("schema", reverse("schema"), headers=session),
+            Scenario("swagger-ui", reverse("swagger-ui"), headers=session),
+            Scenario("redoc", reverse("redoc"), headers=session),
+            Scenario("i18n redirect", "/", status=302),
+            Scenario(
+                "i18n redirect (accept-language)",
+                "/documentation/schema/",
+                headers={"accept-language": "de"},
+                status=302,
+            ),
+            Scenario(
+                "api footprint",
+                reverse("footprint"),
+                query="period=day",
+                headers=bearer,
+            ),
+            Scenario(
+                "api leaderboard",
+                reverse("leaderboard_users"),
+                headers=bearer,
+            ),
+        ]
+
+    def get_changelist_scenarios(self, admin, count):
+        """Build the admin changelist scenarios at a number of users."""
+        session = self.get_session_headers(admin)
+        path = reverse("admin:users_customuser_changelist")
+        return [
+            Scenario(
+                f"admin changelist ({count} users)", path, headers=session
+            ),
+            Scenario(
+                f"admin changelist search ({count} users)",
+                path,
+                query=f"q=user-{count // 2}%40",
+                headers=session,
+            ),
+        ]
+
+    @staticmethod
+    def insert_users(count):
+        """Insert users until there are `count` benchmark users."""
+        existing = CustomUser.objects.filter(
+            email__endswith=f"@{BENCHMARK_DOMAIN}"
+        ).count()
+        CustomUser.objects.bulk_create(
+            (
+                CustomUser(
+                    email=f"user-{i}@{BENCHMARK_DOMAIN}",
+                    first_name=f"First{i}",
+                    last_name=f"Last{i}",
+                    password="!",
+                )
+                for i in range(existing, count)
+            ),
+            batch_size=INSERT_BATCH_SIZE,
+        )
+
+    def is_selected(self, scenario):
+        """Check whether a scenario is selected with --scenario."""
+        selected = self.options["scenario"]
+        return not selected or any(name in scenario.name for name in selected)
+
+    def run_scenario(self, applications, scenario, results):
+        """Send a scenario to every interface and report its results."""
+        requests = scenario.requests or self.options["requests"]
+        for interface in self.options["interface"]:
+            application = applications[interface]
+            if interface == "wsgi":
+                send = self.send_wsgi
+            else:
+                send = async_to_sync(self.send_asgi)
+            # the first request warms caches and imports
+            send(application, scenario, 1)
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_query):
+                elapsed, latencies = send(application, scenario, requests)
+            result = summarize(elapsed, latencies, len(queries))
+            results[f"{interface} {scenario.name}"] = result
+            self.write_result(interface, scenario.name, result)
+
+    @staticmethod
+    def check_status(scenario, status):
+        """Fail if a response has an unexpected status."""
+        if status != scenario.status:
+            raise CommandError(
+                f"{scenario.name}: status {status}, expected {scenario.status}"
+            )
+
+    def send_wsgi(self, application, scenario, requests):
+        """
+        Send the requests of a scenario to the WSGI application.
+
+        Returns:
+            tuple: The elapsed seconds and the latency of every request.
+        """
+        latencies = []
+        start = perf_counter()
+        for _ in range(requests):
+            request_start = perf_counter()
+            status = wsgi_request(
+                application,
+                scenario.path,
+                scenario.query,
+                scenario.method,
+                scenario.headers,
+                scenario.body,
+            )
+            latencies.append(perf_counter() - request_start)
+            self.check_status(scenario, status)
+        return perf_counter() - start, latencies
+
+    async def send_asgi(self, application, scenario, requests):
+        """
+        Send the requests of a scenario to the ASGI application.
+
+        Synchronous code runs in the thread calling `async_to_sync`, which
+        keeps the connection of the transaction.
+
+        Returns:
+            tuple: The elapsed seconds and the latency of every request.
+        """
+        latencies = []
+        start = perf_counter()
+        for _ in range(requests):
+            request_start = perf_counter()
+            status = await asgi_request(
+                application,
+                scenario.path,
+                scenario.query,
+                scenario.method,
+                scenario.headers,
+                scenario.body,
+            )
+            latencies.append(perf_counter() - request_start)
+            self.check_status(scenario, status)
+        return perf_counter() - start, latencies
+
+    def write_header(self):
+        """Write the header of the result table."""
+        self.stdout.write(
+            f"{'interface':10}{'scenario':42}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p90 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+
+    def write_result(self, interface, name, result):
+        """Write the result of a scenario."""
+        self.stdout.write(
+            f"{interface:10}{name:42}{result['requests_per_second']:9.1f}"
+            f"{result['p50_ms']:9.2f}{result['p90_ms']:9.2f}"
+            f"{result['p99_ms']:9.2f}{result['queries_per_request']:9.1f}"
+        )
+
+    def check_baseline(self, results):
+        """Save the baseline, or fail if a result regressed."""
+        path = self.options["baseline"]
+        if self.options["save_baseline"]:
+            save_baseline(path, results)
+            self.stdout.write(f"Saved the baseline to {path}.")
+            return
+        baseline = load_baseline(path)
+        if baseline is None:
+            self.stdout.write(
+                f"No baseline at {path}, save one with --save-baseline."
+            )
+            return
+        regressions = compare(baseline, results, self.options["threshold"])
+        if regressions:
+            raise CommandError(
+                "Regressions compared with the baseline:\n"
+                + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
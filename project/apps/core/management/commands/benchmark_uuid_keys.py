@@ -0,0 +1,184 @@
+"""
+Module: benchmark_uuid_keys
+
+Provides a management command that compares random (`uuid4`) with
+time-ordered (`core.fields.uuid7`) UUID primary keys: inserting rows,
+the size of the table and its index, paginating all rows by key and looking
+up recently inserted rows.
+"""
+
+import random
+from itertools import count
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, models, transaction
+from django.test import override_settings
+
+from core.fields import uuid7
+
+# rows per page of the keyset pagination
+PAGE_SIZE = 1000
+
+# the key generators compared
+GENERATORS = (("uuid4", uuid4), ("uuid7", uuid7))
+
+
+class Command(BaseCommand):
+    """Benchmark random against time-ordered UUID primary keys."""
+
+    help = (
+        "Insert rows with uuid4 and uuid7 primary keys into a table like the "
+        "one of a model and report rows/second of the first and last tenth "
+        "of the inserts, the size of the table with its index, the rate of "
+        "paginating all rows by key and of looking up recent rows. The "
+        "tables are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=2_000_000,
+            help="The number of rows inserted per generator.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="The rows inserted per statement batch.",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=10_000,
+            help="The lookups of rows among the last tenth inserted.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        if options["rows"] < 10 or options["batch_size"] < 1:
+            raise CommandError("At least 10 rows and a batch are required.")
+        self.stdout.write(
+            f"{connection.vendor}: {options['rows']} rows per generator"
+        )
+        for name, generate in GENERATORS:
+            # with DEBUG every query is logged, which grows the memory
+            with override_settings(DEBUG=False), transaction.atomic():
+                self._run(name, generate, options)
+                transaction.set_rollback(True)
+
+    def _run(self, name, generate, options):
+        """Create the table of a generator and measure it."""
+        table = f"benchmark_{name}_keys"
+        field = models.UUIDField()
+        prep = field.get_db_prep_value
+        rows, batch_size = options["rows"], options["batch_size"]
+        tenth = rows // 10
+        recent, rates = [], []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {table} (id {field.db_type(connection)} "
+                "NOT NULL PRIMARY KEY, payload varchar(64) NOT NULL)"
+            )
+            sequence = count()
+            for start in range(0, rows, batch_size):
+                batch = [
+                    (prep(generate(), connection), f"row {next(sequence)}")
+                    for _ in range(min(batch_size, rows - start))
+                ]
+                begin = perf_counter()
+                cursor.executemany(
+                    f"INSERT INTO {table} (id, payload) VALUES (%s, %s)",
+                    batch,
+                )
+                rates.append((start, len(batch), perf_counter() - begin))
+                if start + len(batch) > rows - tenth:
+                    recent += [key for key, _payload in batch]
+            self._report(name, "insert first tenth", rates, 0, tenth)
+            self._report(name, "insert last tenth", rates, rows - tenth, rows)
+            total = sum(elapsed for _start, _count, elapsed in rates)
+            self._write(name, "insert", rows / total, "rows/s")
+            size = self._size(cursor, table)
+            if size is not None:
+                self._write(name, "table and index", size / 2**20, "MiB")
+
+            begin, last, scanned = perf_counter(), None, 0
+            while True:
+                if last is None:
+                    cursor.execute(
+                        f"SELECT id FROM {table} ORDER BY id LIMIT {PAGE_SIZE}"
+                    )
+                else:
+                    cursor.execute(
+                        f"SELECT id FROM {table} WHERE id > %s "
+                        f"ORDER BY id LIMIT {PAGE_SIZE}",
+                        [last],
+                    )
+                page = cursor.fetchall()
+                if not page:
+                    break
+                scanned += len(page)
+                last = page[-1][0]
+            self._write(
+                name,
+                "paginate by key",
+                scanned / (perf_counter() - begin),
+                "rows/s",
+            )
+
+            lookups = random.choices(recent, k=options["lookups"])
+            begin = perf_counter()
+            for key in lookups:
+                cursor.execute(
+                    f"SELECT payload FROM {table} WHERE id = %s", [key]
+                )
+                cursor.fetchone()
+            self._write(
+                name,
+                "look up recent rows",
+                len(lookups) / (perf_counter() - begin),
+                "rows/s",
+            )
+
+    @staticmethod
+    def _size(cursor, table):
+        """
+        Measure the size of a table and its indexes.
+
+        Returns:
+            int: The bytes, or None if the database does not report them.
+        """
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                    "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                    [table],
+                )
+            except DatabaseError:
+                # SQLite built without the dbstat table
+                return None
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+    def _report(self, name, label, rates, first, last):
+        """Write the insert rate of the rows between two positions."""
+        batches = [
+            (size, elapsed)
+            for start, size, elapsed in rates
+            if first <= start < last
+        ]
+        rows = sum(size for size, _elapsed in batches)
+        elapsed = sum(elapsed for _size, elapsed in batches)
+        if elapsed:
+            self._write(name, label, rows / elapsed, "rows/s")
+
+    def _write(self, name, label, value, unit):
+        """Write a measurement."""
+        self.stdout.write(f"{name:6} {label:22} {value:14.1f} {unit}")
@@ -0,0 +1,43 @@
+"""
+Module: export_schema
+
+Provides a management command that writes the OpenAPI schema of every
+language and format at deploy time.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import SCHEMA_RENDERERS, schema_cache
+
+
+class Command(BaseCommand):
+    """Write the schema of every language and format to a directory."""
+
+    help = (
+        "Write schema.<language>.<yaml|json> for every language, in the "
+        "same shape as docs/api/schema.yml."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--output-dir",
+            default=settings.BASE_DIR / "docs" / "api",
+            type=Path,
+            help="The directory to write the schemas to.",
+        )
+
+    def handle(self, *args, **options):
+        """Write the schemas."""
+        output_dir = options["output_dir"]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for language, _name in settings.LANGUAGES:
+            for file_format in SCHEMA_RENDERERS:
+                path = output_dir / f"schema.{language}.{file_format}"
+                path.write_bytes(
+                    schema_cache.get(language, file_format).content
+                )
+                self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,57 @@
+"""
+Module: runforkserver
+
+Provides a management command that serves the WSGI application of the
+project from worker processes forked from a preloaded server process, see
+`core.forkserver`.
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forkserver import ForkServer, preload
+
+
+class Command(BaseCommand):
+    """Serve the project from preloaded, forked workers."""
+
+    help = (
+        "Load the project, the URLconf, templates, translations and the API "
+        "schema once, then fork the workers serving config.wsgi. SIGTTIN "
+        "adds a worker, SIGTTOU removes one. For development only, the "
+        "workers use the WSGI server of runserver; in production, use "
+        "gunicorn with config/gunicorn.py."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--bind",
+            default="127.0.0.1:8000",
+            help="The address to listen on, as host:port.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="The number of worker processes, defaults to the CPUs.",
+        )
+
+    def handle(self, *args, **options):
+        """Preload the project and serve it."""
+        host, _, port = options["bind"].rpartition(":")
+        if not host or not port.isdigit():
+            raise CommandError(f"Invalid address: {options['bind']}")
+        if options["workers"] < 1:
+            raise CommandError("At least one worker is required.")
+        # pylint: disable=import-outside-toplevel
+        from config.wsgi import application
+
+        preload()
+        ForkServer(
+            application,
+            (host.strip("[]"), int(port)),
+            options["workers"],
+            log=self.stdout.write,
+        ).serve()
@@ -0,0 +1,213 @@
+"""
+Module: startup_report
+
+Provides a management command that measures the cold start of the project
+in fresh interpreters for every startup profile (see config/startup.py):
+the interpreter itself, importing the WSGI application, which sets Django
+up, and its first request, and how long a worker forked from a preloaded
+process (see `core.forkserver`) takes to answer its first request.
+
+With --imports, it also reports the packages and modules that take longest
+to import, from the output of `python -X importtime`.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config.startup import STARTUP_PROFILES
+
+# the first request of a probe, answered without a database
+PROBE_PATH = "/en/api/v1/leaderboard/users/"
+
+# measures the phases of a cold start, in a fresh interpreter
+PROBE = """
+import json, os, time
+start = time.perf_counter()
+from config.wsgi import application
+loaded = time.perf_counter()
+from core.benchmark import wsgi_request
+wsgi_request(application, {path!r})
+print(json.dumps({{
+    "application": loaded - start,
+    "first request": time.perf_counter() - loaded,
+}}))
+"""
+
+# measures a worker forked from a preloaded process, see core.forkserver
+FORK_PROBE = """
+import json, os, time
+from config.wsgi import application
+from core.benchmark import wsgi_request
+from core.forkserver import preload
+preload()
+start = time.perf_counter()
+pid = os.fork()
+if not pid:
+    wsgi_request(application, {path!r})
+    os._exit(0)
+os.waitpid(pid, 0)
+print(json.dumps({{"first request": time.perf_counter() - start}}))
+"""
+
+PHASES = ("python", "application", "first request")
+
+
+def parse_importtime(output):
+    """
+    Parse the output of `python -X importtime`.
+
+    Args:
+        output (str): The standard error of the interpreter.
+
+    Returns:
+        dict: The self and cumulative microseconds by module.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header
+            continue
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def group_by_package(modules):
+    """
+    Sum the self import time of modules by top-level package.
+
+    Args:
+        modules (dict): The result of `parse_importtime`.
+
+    Returns:
+        Counter: The microseconds by package.
+    """
+    packages = Counter()
+    for module, (self_us, _cumulative_us) in modules.items():
+        packages[module.split(".")[0]] += self_us
+    return packages
+
+
+class Command(BaseCommand):
+    """Report the cold start time of the project per startup profile."""
+
+    help = (
+        "Start fresh interpreters with every STARTUP_PROFILE and report the "
+        "median milliseconds of the interpreter, importing config.wsgi and "
+        "the first request, and of the first request of a worker forked "
+        "from a preloaded process."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="The number of interpreters started per profile.",
+        )
+        parser.add_argument(
+            "--imports",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Also report the N slowest packages and modules to import.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the probes."""
+        if options["runs"] < 1:
+            raise CommandError("At least one run is required.")
+        self.stdout.write(
+            f"{'profile':10}"
+            + "".join(f"{phase + ' ms':>18}" for phase in PHASES)
+            + f"{'total ms':>12}"
+        )
+        for profile in STARTUP_PROFILES:
+            runs = [self.probe(PROBE, profile) for _ in range(options["runs"])]
+            self.write_result(profile, runs)
+        runs = [
+            self.probe(FORK_PROBE, "eager") for _ in range(options["runs"])
+        ]
+        self.write_result("forked", runs)
+        if options["imports"]:
+            for profile in STARTUP_PROFILES:
+                self.write_imports(profile, options["imports"])
+
+    @staticmethod
+    def run_python(script, profile, *flags):
+        """
+        Run a script in a fresh interpreter with a startup profile.
+
+        Returns:
+            tuple: The seconds until it exited and its completed process.
+        """
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "config.settings",
+            "STARTUP_PROFILE": profile,
+        }
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, *flags, "-c", script.format(path=PROBE_PATH)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        elapsed = perf_counter() - start
+        if process.returncode:
+            raise CommandError(
+                f"The {profile} probe failed:\n{process.stderr}"
+            )
+        return elapsed, process
+
+    def probe(self, script, profile):
+        """
+        Measure the phases of a probe.
+
+        Returns:
+            dict: The seconds of every phase; "python" is the time of the
+            interpreter outside of the probe, to start and to exit.
+        """
+        elapsed, process = self.run_python(script, profile)
+        phases = json.loads(process.stdout.splitlines()[-1])
+        if script == PROBE:
+            phases["python"] = elapsed - sum(phases.values())
+        return phases
+
+    def write_result(self, name, runs):
+        """Write the median of every phase and of the total."""
+        line = f"{name:10}"
+        for phase in PHASES:
+            if phase in runs[0]:
+                line += f"{median(run[phase] for run in runs) * 1000:18.1f}"
+            else:
+                line += f"{'-':>18}"
+        total = median(sum(run.values()) for run in runs)
+        self.stdout.write(f"{line}{total * 1000:12.1f}")
+
+    def write_imports(self, profile, limit):
+        """Write the slowest packages and modules to import of a profile."""
+        _elapsed, process = self.run_python(PROBE, profile, "-X", "importtime")
+        modules = parse_importtime(process.stderr)
+        self.stdout.write(f"\n{profile}: slowest packages (self ms)")
+        for package, self_us in group_by_package(modules).most_common(limit):
+            self.stdout.write(f"{self_us / 1000:10.1f}  {package}")
+        self.stdout.write(f"{profile}: slowest modules (cumulative ms)")
+        slowest = sorted(
+            modules.items(), key=lambda item: item[1][1], reverse=True
+        )
+        for module, (_self_us, cumulative_us) in slowest[:limit]:
+            self.stdout.write(f"{cumulative_us / 1000:10.1f}  {module}")
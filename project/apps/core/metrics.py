@@ -0,0 +1,500 @@
+"""
+Module: metrics
+
+Provides per-route request metrics in Prometheus text format.
+
+`MetricsMiddleware` (see `core.middleware`) measures every request: its wall
+time, its SQL queries and their time, the time spent rendering templates
+and hashing passwords, and the hits and misses of the application caches.
+Code reports into the measurement of the current request through a context
+variable, so that it works in threads and coroutines alike:
+
+    with timed("hashing"):
+        hasher.encode(password, salt)
+    record_cache("schema", hit=True)
+
+Measurements are aggregated into fixed-bucket histograms in the memory of
+every worker, under one lock per request. A background thread writes the
+aggregates of a worker to `METRICS_DIR` every `METRICS_FLUSH_INTERVAL`
+seconds, and the metrics view merges the files of all workers of the host,
+so that a scrape sees the whole host whichever worker answers it. The files
+of workers that exited are folded into one file of exited workers when
+merging, so that counters never go backwards when a worker is recycled, and
+all files are removed when the `runforkserver` server starts.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+
+# file holding the metrics of the workers that exited
+EXITED_FILE = "exited.json"
+# file locked while merging, so that exited workers are folded only once
+LOCK_FILE = "merge.lock"
+# prefix of the exported metric names
+PREFIX = "eco_track_"
+# upper bounds of the buckets of time histograms, in seconds
+TIME_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# upper bounds of the buckets of the query count histogram
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# the exported metrics: their type, help text and histogram buckets
+METRICS = {
+    "request_duration_seconds": (
+        "histogram",
+        "Wall time of requests.",
+        TIME_BUCKETS,
+    ),
+    "request_queries": (
+        "histogram",
+        "SQL queries per request.",
+        COUNT_BUCKETS,
+    ),
+    "request_query_seconds": (
+        "histogram",
+        "Time per request spent in SQL queries.",
+        TIME_BUCKETS,
+    ),
+    "request_template_seconds": (
+        "histogram",
+        "Time per request spent rendering templates, without queries.",
+        TIME_BUCKETS,
+    ),
+    "request_hashing_seconds": (
+        "histogram",
+        "Time per request spent hashing passwords.",
+        TIME_BUCKETS,
+    ),
+    "cache_requests_total": (
+        "counter",
+        "Lookups of the application caches by result.",
+        None,
+    ),
+}
+# methods exported as they are, others are exported as "other"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+@dataclass
+class RequestMetrics:
+    """The measurements of one request."""
+
+    queries: int = 0
+    query_time: float = 0.0
+    template_time: float = 0.0
+    hashing_time: float = 0.0
+    # lookups by cache name and result
+    cache: Counter = field(default_factory=Counter)
+    # the timers that are running, nested timers are not counted twice
+    running: set = field(default_factory=set)
+
+
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+@contextmanager
+def timed(kind):
+    """
+    Add the time of a block to the current request.
+
+    Args:
+        kind (str): "template" or "hashing".
+    """
+    metrics = current_metrics.get()
+    if metrics is None or kind in metrics.running:
+        yield
+        return
+    metrics.running.add(kind)
+    queries = metrics.query_time
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        # queries run by templates, e.g. of lazy querysets, are not
+        # counted as template time
+        elapsed = perf_counter() - start - (metrics.query_time - queries)
+        metrics.running.discard(kind)
+        attribute = f"{kind}_time"
+        setattr(metrics, attribute, getattr(metrics, attribute) + elapsed)
+
+
+def record_cache(cache, hit):
+    """
+    Count a lookup of an application cache in the current request.
+
+    Args:
+        cache (str): The name of the cache, e.g. "schema".
+        hit (bool): Whether the lookup found an entry.
+    """
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.cache[cache, "hit" if hit else "miss"] += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of the request."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Receiver of `connection_created` adding `record_query`."""
+    del sender, kwargs
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_route(request):
+    """Return the route label of a request, the name of its URL pattern."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+def get_labels(**labels):
+    """Build the hashable labels of a series."""
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    The metrics of one worker.
+
+    Histograms are stored as their bucket counts, the last bucket holding
+    the values above the largest bound, followed by the sum of the values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._flusher_pid = None
+
+    def _observe(self, name, labels, value):
+        """Add a value to a histogram, the lock must be held."""
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        histogram = self._values.get(key)
+        if histogram is None:
+            histogram = self._values[key] = [0] * (len(buckets) + 2)
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def record(self, route, method, status, metrics, elapsed):
+        """
+        Record the measurements of a request.
+
+        Args:
+            route (str): The route label.
+            method (str): The request method.
+            status (int): The response status.
+            metrics (RequestMetrics): The measurements.
+            elapsed (float): The wall time in seconds.
+        """
+        labels = get_labels(route=route)
+        with self._lock:
+            self._observe(
+                "request_duration_seconds",
+                get_labels(
+                    route=route,
+                    method=method if method in METHODS else "other",
+                    status=f"{status // 100}xx",
+                ),
+                elapsed,
+            )
+            self._observe("request_queries", labels, metrics.queries)
+            self._observe("request_query_seconds", labels, metrics.query_time)
+            # only requests that rendered or hashed are observed
+            if metrics.template_time:
+                self._observe(
+                    "request_template_seconds", labels, metrics.template_time
+                )
+            if metrics.hashing_time:
+                self._observe(
+                    "request_hashing_seconds", labels, metrics.hashing_time
+                )
+            for (cache, result), count in metrics.cache.items():
+                key = (
+                    "cache_requests_total",
+                    get_labels(route=route, cache=cache, result=result),
+                )
+                self._values[key] = self._values.get(key, 0) + count
+        self.start_flusher()
+
+    def snapshot(self):
+        """Return a copy of the metrics."""
+        with self._lock:
+            return {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self._values.items()
+            }
+
+    def clear(self):
+        """Drop all metrics."""
+        with self._lock:
+            self._values = {}
+
+    def flush(self, directory=None):
+        """
+        Write the metrics of the worker to the metrics directory.
+
+        Args:
+            directory (Path, optional): The directory, defaults to
+                `METRICS_DIR`.
+        """
+        directory = Path(directory or settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_file(directory / f"{os.getpid()}.json", self.snapshot())
+
+    def start_flusher(self):
+        """Start the thread flushing the metrics, once per process."""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            # threads do not survive a fork, so every worker starts one
+            self._flusher_pid = pid
+        threading.Thread(
+            target=self._flush_periodically,
+            name="metrics-flusher",
+            daemon=True,
+        ).start()
+
+    def _flush_periodically(self):
+        """Flush the metrics every `METRICS_FLUSH_INTERVAL` seconds."""
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                # metrics are best effort, the next flush tries again
+                continue
+
+
+registry = MetricsRegistry()
+
+
+def is_running(pid):
+    """Check whether a process is running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # a process of another user
+        return True
+    return True
+
+
+def clear_files(directory=None):
+    """
+    Remove the metrics of all workers, e.g. of a previous server.
+
+    This also resets the metrics of the workers that exited, so it is only
+    called when a server starts.
+
+    Args:
+        directory (Path, optional): The metrics directory, defaults to
+            `METRICS_DIR`.
+    """
+    for path in Path(directory or settings.METRICS_DIR).glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def read_file(path):
+    """
+    Read the metrics of a file.
+
+    Args:
+        path (Path): The file.
+
+    Returns:
+        dict: The metrics, empty if the file was removed or replaced while
+            reading it.
+    """
+    try:
+        values = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {
+        (name, tuple(map(tuple, labels))): value
+        for name, labels, value in values
+    }
+
+
+def write_file(path, values):
+    """
+    Write metrics to a file.
+
+    Args:
+        path (Path): The file.
+        values (dict): The metrics.
+    """
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(
+        json.dumps(
+            [[name, labels, value] for (name, labels), value in values.items()]
+        ),
+        encoding="utf-8",
+    )
+    # readers never see a partially written file
+    os.replace(temporary, path)
+
+
+def add_values(merged, values):
+    """
+    Add metrics to merged metrics, in place.
+
+    Args:
+        merged (dict): The merged metrics.
+        values (dict): The metrics to add.
+    """
+    for key, value in values.items():
+        if isinstance(value, list):
+            previous = merged.get(key) or [0] * len(value)
+            merged[key] = [a + b for a, b in zip(previous, value)]
+        else:
+            merged[key] = merged.get(key, 0) + value
+
+
+def merge_files(directory=None):
+    """
+    Merge the metrics of all workers.
+
+    The file of a worker that is no longer running is folded into the file
+    of exited workers and removed, so that its totals are kept without a
+    file per worker that ever ran. Merging holds a lock on the directory,
+    so that no other merge counts a worker twice while it is folded.
+
+    Args:
+        directory (Path, optional): The metrics directory, defaults to
+            `METRICS_DIR`.
+
+    Returns:
+        dict: The merged metrics.
+    """
+    directory = Path(directory or settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    merged = {}
+    with open(directory / LOCK_FILE, "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = read_file(directory / EXITED_FILE)
+        folded = []
+        for path in directory.glob("*.json"):
+            if not path.stem.isdigit():
+                continue
+            values = read_file(path)
+            if is_running(int(path.stem)):
+                add_values(merged, values)
+            else:
+                add_values(exited, values)
+                folded.append(path)
+        if folded:
+            write_file(directory / EXITED_FILE, exited)
+            for path in folded:
+                path.unlink(missing_ok=True)
+        add_values(merged, exited)
+    return merged
+
+
+def format_labels(labels, **extra):
+    """Format the labels of a sample, e.g. '{route="index"}'."""
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (
+            name,
+            str(value)
+            .replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_bound(bound):
+    """Format a histogram bucket bound."""
+    return f"{bound:g}"
+
+
+def render_prometheus(values):
+    """
+    Render metrics in the Prometheus text exposition format.
+
+    Args:
+        values (dict): The metrics, as returned by `merge_files`.
+
+    Returns:
+        str: The metrics.
+    """
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted(
+            (labels, value)
+            for (metric, labels), value in values.items()
+            if metric == name
+        )
+        if not series:
+            continue
+        full_name = PREFIX + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in series:
+            if kind == "counter":
+                lines.append(f"{full_name}{format_labels(labels)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                le = bound if isinstance(bound, str) else format_bound(bound)
+                lines.append(
+                    f"{full_name}_bucket{format_labels(labels, le=le)} "
+                    f"{cumulative}"
+                )
+            lines.append(f"{full_name}_sum{format_labels(labels)} {value[-1]}")
+            lines.append(
+                f"{full_name}_count{format_labels(labels)} {cumulative}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def collect():
+    """Flush the metrics of this worker and render those of all workers."""
+    registry.flush()
+    return render_prometheus(merge_files())
@@ -0,0 +1,337 @@
+"""
+Module: middleware
+
+Provides the middleware of the core app.
+
+Under ASGI, Django's `MiddlewareMixin` hands every hook of a middleware to a
+worker thread, because it cannot know whether the hook blocks. The Django
+middleware below run their hooks in the event loop instead, and only send a
+hook that is about to do I/O, such as saving the session, to a thread.
+"""
+
+import hashlib
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware import clickjacking, common, csrf, locale, security
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+
+from .metrics import RequestMetrics, current_metrics, get_route, registry
+from .profiling import profiler
+from .routers import get_replicas, routing_state
+from .staticfiles import StaticFileServer
+
+
+class MetricsMiddleware:
+    """
+    Record the metrics of every request, see `core.metrics`, and profile
+    requests if `PROFILE_SLOW_REQUESTS_MS` is set, see `core.profiling`.
+
+    Has to run first, so that the wall time covers the other middleware.
+    Disabled by `METRICS_ENABLED`. Runs natively under WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def start():
+        """Start measuring a request."""
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        samples = None
+        if settings.PROFILE_SLOW_REQUESTS_MS:
+            samples = profiler.start()
+        return metrics, token, samples, perf_counter()
+
+    @staticmethod
+    def finish(request, response, measurement):
+        """Record the metrics of a request and dump its slow profile."""
+        metrics, token, samples, start = measurement
+        elapsed = perf_counter() - start
+        current_metrics.reset(token)
+        route = get_route(request)
+        status = 500 if response is None else response.status_code
+        registry.record(route, request.method, status, metrics, elapsed)
+        if samples is not None:
+            profiler.stop(samples)
+            if elapsed * 1000 >= settings.PROFILE_SLOW_REQUESTS_MS:
+                profiler.dump(samples, route, elapsed)
+
+    def __call__(self, request):
+        """Measure the request."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measurement = self.start()
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(request, response, measurement)
+        return response
+
+    async def __acall__(self, request):
+        """Async version of `__call__`, used under ASGI."""
+        measurement = self.start()
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(request, response, measurement)
+        return response
+
+
+class StaticFilesMiddleware:
+    """
+    Serve the files collected into `STATIC_ROOT` from the application
+    process, see `core.staticfiles.StaticFileServer`, so that no separate
+    web server is needed for them.
+
+    Files are kept in memory once read, so serving them runs natively under
+    WSGI and ASGI without thread hops. Disabled by `STATIC_SERVE` or if no
+    files are collected when the process starts.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.server = StaticFileServer(
+            settings.STATIC_ROOT, settings.STATIC_URL
+        )
+        if not self.server.files:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Serve the request if it is for a static file."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.server.serve(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        """Async version of `__call__`, used under ASGI."""
+        response = self.server.serve(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pin the reads of a session or token to the primary database for
+    `DATABASE_REPLICA_PIN_SECONDS` after it wrote, so that its users never
+    read data older than their own writes from a lagging replica.
+
+    Has to run before the `SessionMiddleware`, so that session writes are
+    seen. Disabled if no replica is configured. Runs natively under WSGI
+    and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def get_pin_key(credential):
+        """Build the cache key pinning a session or token."""
+        if not credential:
+            return None
+        digest = hashlib.sha256(credential.encode()).hexdigest()
+        return f"core:pin-primary:{digest}"
+
+    def get_request_credential(self, request):
+        """Return the token or session key the request is made with."""
+        return request.headers.get("Authorization") or request.COOKIES.get(
+            settings.SESSION_COOKIE_NAME
+        )
+
+    def get_written_pin_key(self, key, response):
+        """Return the key to pin after a request wrote."""
+        # a login starts a new session, which is the one to pin
+        cookie = response.cookies.get(settings.SESSION_COOKIE_NAME)
+        if cookie is not None and cookie.value:
+            return self.get_pin_key(cookie.value)
+        return key
+
+    def __call__(self, request):
+        """Route the reads of the request and pin it after writes."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = self.get_pin_key(self.get_request_credential(request))
+        pinned = key is not None and cache.get(key) is not None
+        with routing_state(pinned=pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            key = self.get_written_pin_key(key, response)
+            if key is not None:
+                cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        """Async version of `__call__`, used under ASGI."""
+        key = self.get_pin_key(self.get_request_credential(request))
+        pinned = key is not None and await cache.aget(key) is not None
+        with routing_state(pinned=pinned) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            key = self.get_written_pin_key(key, response)
+            if key is not None:
+                await cache.aset(
+                    key, True, settings.DATABASE_REPLICA_PIN_SECONDS
+                )
+        return response
+
+
+class InlineHooksMixin:
+    """
+    Run the hooks of a `MiddlewareMixin` middleware in the event loop under
+    ASGI, unless `is_blocking` says that a hook is about to do I/O.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        process_view = getattr(self, "process_view", None)
+        if self.async_mode and process_view is not None:
+
+            async def aprocess_view(request, view, view_args, view_kwargs):
+                """Run the view hook in the event loop."""
+                return process_view(request, view, view_args, view_kwargs)
+
+            # Django runs synchronous view hooks in a thread
+            self.process_view = aprocess_view
+
+    def is_blocking(self, request, response=None):
+        """
+        Check whether a hook is about to do I/O.
+
+        Args:
+            request (HttpRequest): The request.
+            response (HttpResponse, optional): The response, None for the
+                request hook.
+
+        Returns:
+            bool: Whether to run the hook in a worker thread.
+        """
+        del request, response
+        return False
+
+    async def __acall__(self, request):
+        """Run the hooks in the event loop, or in a thread if blocking."""
+        response = None
+        if hasattr(self, "process_request"):
+            if self.is_blocking(request):
+                response = await sync_to_async(
+                    self.process_request, thread_sensitive=True
+                )(request)
+            else:
+                response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, "process_response"):
+            if self.is_blocking(request, response):
+                return await sync_to_async(
+                    self.process_response, thread_sensitive=True
+                )(request, response)
+            response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    """Django's `SecurityMiddleware`, see `InlineHooksMixin`."""
+
+
+class SessionMiddleware(InlineHooksMixin, sessions.SessionMiddleware):
+    """
+    Django's `SessionMiddleware`, see `InlineHooksMixin`. Sessions are
+    loaded lazily and saved in a thread.
+    """
+
+    def is_blocking(self, request, response=None):
+        """Check whether the session is saved."""
+        session = getattr(request, "session", None)
+        return (
+            response is not None
+            and session is not None
+            and (session.modified or settings.SESSION_SAVE_EVERY_REQUEST)
+        )
+
+
+class LocaleMiddleware(InlineHooksMixin, locale.LocaleMiddleware):
+    """Django's `LocaleMiddleware`, see `InlineHooksMixin`."""
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    """Django's `CommonMiddleware`, see `InlineHooksMixin`."""
+
+
+class CsrfViewMiddleware(InlineHooksMixin, csrf.CsrfViewMiddleware):
+    """
+    Django's `CsrfViewMiddleware`, see `InlineHooksMixin`. Tokens stored in
+    the session are read and written in a thread.
+    """
+
+    def is_blocking(self, request, response=None):
+        """Check whether the token is stored in the session."""
+        del request, response
+        return settings.CSRF_USE_SESSIONS
+
+
+class AuthenticationMiddleware(
+    InlineHooksMixin, auth.AuthenticationMiddleware
+):
+    """
+    Django's `AuthenticationMiddleware`, see `InlineHooksMixin`. The user is
+    loaded lazily, by async views with `request.auser()`.
+    """
+
+
+class MessageMiddleware(InlineHooksMixin, messages.MessageMiddleware):
+    """
+    Django's `MessageMiddleware`, see `InlineHooksMixin`. Messages are
+    stored in a thread.
+    """
+
+    def is_blocking(self, request, response=None):
+        """Check whether messages are stored."""
+        storage = getattr(request, "_messages", None)
+        return (
+            response is not None
+            and storage is not None
+            and (storage.used or storage.added_new)
+        )
+
+
+class XFrameOptionsMiddleware(
+    InlineHooksMixin, clickjacking.XFrameOptionsMiddleware
+):
+    """Django's `XFrameOptionsMiddleware`, see `InlineHooksMixin`."""
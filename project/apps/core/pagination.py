@@ -0,0 +1,132 @@
+"""
+Module: pagination
+
+Provides pagination for admin changelists of large tables: a paginator that
+estimates the number of rows instead of counting them, and a changelist that
+pages with a cursor on the ordering field (keyset pagination) instead of an
+OFFSET that has to skip all previous rows.
+"""
+
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# query parameter holding the keyset cursor
+AFTER_VAR = "after"
+# tables or filtered results up to this size are counted exactly
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_row_count(model, using):
+    """
+    Estimate the number of rows in the table of a model without scanning it.
+
+    Args:
+        model (Model): The model whose table is estimated.
+        using (str): The database alias.
+
+    Returns:
+        int: The estimated row count, or None if the database provides no
+        cheap estimate.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+        elif connection.vendor == "sqlite":
+            # the rowid is assigned incrementally, so its maximum is a cheap
+            # upper bound that is only off by the number of deleted rows
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids a full COUNT(*) on large tables.
+
+    Unfiltered querysets are estimated from the database statistics, filtered
+    ones are counted up to `EXACT_COUNT_LIMIT` rows. `count_is_estimate` tells
+    whether the count is exact.
+    """
+
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        """Return the exact or estimated number of objects."""
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                self.count_is_estimate = True
+                return estimate
+            return queryset.count()
+        count = queryset.order_by()[: EXACT_COUNT_LIMIT + 1].count()
+        if count > EXACT_COUNT_LIMIT:
+            self.count_is_estimate = True
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that pages with a cursor on `keyset_field`.
+
+    Keyset pagination is used as long as the changelist is sorted by its
+    default ordering, which has to be `keyset_field` alone and unique. Sorting
+    by another column falls back to numbered pages.
+    """
+
+    keyset_field = "email"
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(AFTER_VAR) or None
+        self.keyset_pagination = False
+        self.first_page_url = None
+        self.next_page_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        """Return the filter params without the keyset cursor."""
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        """Build a query string that starts again at the first page."""
+        return super().get_query_string(
+            new_params, [*(remove or []), AFTER_VAR]
+        )
+
+    def get_results(self, request):
+        """Fetch the page after the cursor if keyset pagination applies."""
+        super().get_results(request)
+        if ORDER_VAR in self.params or (self.show_all and self.can_show_all):
+            return
+        self.keyset_pagination = True
+        queryset = self.queryset
+        if self.cursor:
+            queryset = queryset.filter(
+                **{f"{self.keyset_field}__gt": self.cursor}
+            )
+        self.result_list = queryset[: self.list_per_page]
+        # evaluate now to know whether there is a next page, the template
+        # iterates over the cached rows
+        rows = list(self.result_list)
+        if self.cursor:
+            self.first_page_url = self.get_query_string()
+        if len(rows) == self.list_per_page:
+            self.next_page_url = self.get_query_string(
+                {AFTER_VAR: getattr(rows[-1], self.keyset_field)}
+            )
+        self.multi_page = bool(self.first_page_url or self.next_page_url)
@@ -0,0 +1,152 @@
+"""
+Module: profiling
+
+Provides an opt-in sampling profiler for slow requests.
+
+With `PROFILE_SLOW_REQUESTS_MS` set, a background thread samples the stack
+of every thread serving a request each `PROFILE_INTERVAL_MS` milliseconds.
+When a request took longer than the threshold, its samples are written to
+`PROFILE_DIR` in the folded format, one stack and its sample count per
+line, which flamegraph.pl, speedscope and inferno render as a flame graph:
+
+    flamegraph.pl profiles/20250101T120000-footprint-1234ms.folded > f.svg
+
+Under ASGI, an async request is sampled on the event loop thread, whose
+stack also shows the other coroutines it runs.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+
+def format_frame(frame):
+    """Format a frame as "function (file:line)"."""
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+        f"{code.co_firstlineno})"
+    )
+
+
+def fold_stack(frame):
+    """
+    Fold a stack into one line, outermost frame first.
+
+    Args:
+        frame (frame): The innermost frame.
+
+    Returns:
+        str: The frames separated by ";".
+    """
+    frames = []
+    while frame is not None:
+        frames.append(format_frame(frame))
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads serving profiled requests.
+
+    Usage:
+        samples = profiler.start()
+        ...  # serve the request
+        profiler.stop(samples)
+        profiler.dump(samples, "footprint", elapsed)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # the samples of the profiled requests by their thread id
+        self._active = {}
+        self._sampler_pid = None
+
+    def start(self):
+        """
+        Start sampling the current thread.
+
+        Returns:
+            Counter: The samples, stack counts filled in while sampling.
+        """
+        samples = Counter()
+        with self._lock:
+            self._active.setdefault(threading.get_ident(), []).append(samples)
+            if self._sampler_pid != os.getpid():
+                # threads do not survive a fork, so every worker starts one
+                self._sampler_pid = os.getpid()
+                threading.Thread(
+                    target=self._sample_periodically,
+                    name="request-profiler",
+                    daemon=True,
+                ).start()
+        return samples
+
+    def stop(self, samples):
+        """Stop sampling a request."""
+        with self._lock:
+            for thread_id, active in list(self._active.items()):
+                # the samples of requests are compared by identity, two of
+                # them are equal as long as they are empty
+                position = next(
+                    (i for i, other in enumerate(active) if other is samples),
+                    None,
+                )
+                if position is not None:
+                    del active[position]
+                    if not active:
+                        del self._active[thread_id]
+                    return
+
+    def sample(self):
+        """Add the current stack of every sampled thread to its samples."""
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        with self._lock:
+            for thread_id, active in self._active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = fold_stack(frame)
+                    for samples in active:
+                        samples[stack] += 1
+
+    def _sample_periodically(self):
+        """Sample every `PROFILE_INTERVAL_MS` milliseconds."""
+        while True:
+            time.sleep(settings.PROFILE_INTERVAL_MS / 1000)
+            self.sample()
+
+    @staticmethod
+    def dump(samples, route, elapsed):
+        """
+        Write the samples of a slow request in the folded format.
+
+        Args:
+            samples (Counter): The samples.
+            route (str): The route label of the request.
+            elapsed (float): The wall time of the request in seconds.
+
+        Returns:
+            Path: The written file, or None without samples.
+        """
+        if not samples:
+            return None
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", route)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        path = directory / f"{stamp}-{name}-{elapsed * 1000:.0f}ms.folded"
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in samples.items()),
+            encoding="utf-8",
+        )
+        return path
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,130 @@
+"""
+Module: routers
+
+Provides a database router that sends reads to the read replicas and writes
+to the primary database. Because replicas lag behind the primary, reads are
+pinned to the primary for the rest of a unit of work once it has written,
+and, through the `ReplicaPinningMiddleware`, for a short window after a
+write by the same session or token.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = "default"
+REPLICA_PREFIX = "replica"
+
+_routing_state = ContextVar("routing_state", default=None)
+
+
+class RoutingState:
+    """The routing state of a request or another unit of work."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+    @property
+    def use_primary(self):
+        """Whether reads have to go to the primary."""
+        return self.pinned or self.wrote
+
+
+def get_replicas():
+    """
+    Get the aliases of the configured read replicas.
+
+    Returns:
+        list: The aliases, empty if no replica is configured.
+    """
+    return [
+        alias
+        for alias in settings.DATABASES
+        if alias.startswith(REPLICA_PREFIX)
+    ]
+
+
+def get_routing_state():
+    """
+    Get the routing state of the current unit of work.
+
+    Returns:
+        RoutingState: The state, or None outside of a unit of work.
+    """
+    return _routing_state.get()
+
+
+@contextmanager
+def routing_state(pinned=False):
+    """
+    Run a unit of work with its own routing state.
+
+    Args:
+        pinned (bool): Whether all reads go to the primary.
+
+    Yields:
+        RoutingState: The state, which records whether the work wrote.
+    """
+    state = RoutingState(pinned=pinned)
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+def pin_to_primary():
+    """
+    Read from the primary, e.g. in a management command that reads what it
+    has just written.
+
+    Usage:
+        with pin_to_primary():
+            ...
+    """
+    return routing_state(pinned=True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads of the `DATABASE_REPLICA_APPS` to a random replica and all
+    writes to the primary.
+    """
+
+    def __init__(self, replicas=None):
+        self.replicas = get_replicas() if replicas is None else replicas
+
+    def db_for_read(self, model, **hints):
+        """Return a replica, unless the current work needs the primary."""
+        if (
+            not self.replicas
+            or model._meta.app_label not in settings.DATABASE_REPLICA_APPS
+        ):
+            return None
+        state = get_routing_state()
+        if state is not None and state.use_primary:
+            return PRIMARY
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        """Return the primary and pin the current work to it."""
+        state = get_routing_state()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects of the primary and replicas."""
+        databases = {PRIMARY, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary, the replicas copy its schema."""
+        if db in self.replicas:
+            return False
+        return None
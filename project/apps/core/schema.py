@@ -0,0 +1,153 @@
+"""
+Module: schema
+
+Provides a cached OpenAPI schema. The schema only changes with the code, so
+it is generated once per language and format, kept in memory and served with
+a strong ETag, so that unchanged schemas are answered with a 304.
+"""
+
+import hashlib
+import inspect
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import get_resolver
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.functional import lazy
+
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from .metrics import record_cache
+
+# renderer used to build the cached content of each format
+SCHEMA_RENDERERS = {
+    "yaml": OpenApiYamlRenderer,
+    "json": OpenApiJsonRenderer,
+}
+
+
+@dataclass(frozen=True)
+class CachedSchema:
+    """A rendered schema and its ETag."""
+
+    content: bytes
+    etag: str
+
+
+class SchemaCache:
+    """
+    In-memory cache of rendered schemas, keyed by language and format.
+
+    The cache is dropped when the URLconf is reloaded or `CODE_VERSION`
+    changes. Generation is serialised with a lock, so that concurrent first
+    requests do not all build the schema.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._version = None
+
+    def _get_version(self):
+        """Return the identity of the code the schemas are built from."""
+        return (id(get_resolver()), getattr(settings, "CODE_VERSION", ""))
+
+    def get(self, language, file_format):
+        """
+        Get the rendered schema, building it on the first access.
+
+        Args:
+            language (str): The language code of the schema.
+            file_format (str): Either "yaml" or "json".
+
+        Returns:
+            CachedSchema: The rendered schema.
+        """
+        version = self._get_version()
+        key = (language, file_format)
+        schema = self._schemas.get(key) if self._version == version else None
+        record_cache("schema", schema is not None)
+        if schema is not None:
+            return schema
+        with self._lock:
+            if self._version != version:
+                self._schemas = {}
+                self._version = version
+            if key not in self._schemas:
+                self._schemas[key] = self._build(language, file_format)
+            return self._schemas[key]
+
+    def clear(self):
+        """Drop all cached schemas."""
+        with self._lock:
+            self._schemas = {}
+            self._version = None
+
+    def warm(self):
+        """Build the schemas of all languages and formats."""
+        for language, _name in settings.LANGUAGES:
+            for file_format in SCHEMA_RENDERERS:
+                self.get(language, file_format)
+
+    @staticmethod
+    def _build(language, file_format):
+        """Generate and render a schema, like the `spectacular` command."""
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        with translation.override(language):
+            data = generator.get_schema(
+                request=None, public=spectacular_settings.SERVE_PUBLIC
+            )
+            content = SCHEMA_RENDERERS[file_format]().render(
+                data, renderer_context={}
+            )
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        return CachedSchema(content=content, etag=etag)
+
+
+schema_cache = SchemaCache()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    Schema view serving the schema from the `schema_cache`.
+
+    The format is selected by content negotiation and the language by the
+    `lang` query parameter or the active language, as in
+    `SpectacularAPIView`.
+    """
+
+    @extend_schema(
+        description=lazy(inspect.cleandoc, str)(SpectacularAPIView.__doc__),
+        **SCHEMA_KWARGS,
+    )
+    def get(self, request, *args, **kwargs):
+        """Return the cached schema, or a 304 if the client has it."""
+        language = request.GET.get("lang")
+        if language not in dict(settings.LANGUAGES):
+            language = translation.get_language()
+        renderer = request.accepted_renderer
+        schema = schema_cache.get(language, renderer.format)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(
+            schema.content,
+            content_type=content_type,
+            headers={
+                "Content-Disposition": "inline; filename="
+                f'"{self._get_filename(request, None)}"',
+                "ETag": schema.etag,
+                # clients have to revalidate, which is a cheap 304
+                "Cache-Control": "no-cache",
+            },
+        )
+        patch_vary_headers(response, ["Accept"])
+        return get_conditional_response(
+            request, etag=schema.etag, response=response
+        )
@@ -0,0 +1,61 @@
+"""
+Module: sessions
+
+Provides session engines that coalesce writes: a session whose data is the
+same as when it was loaded is not saved again, even if it was marked as
+modified during the request. Use `core.sessions.db` or
+`core.sessions.cached_db` as `SESSION_ENGINE`.
+"""
+
+import json
+
+
+class CoalescingSessionMixin:
+    """
+    Session store mixin that skips saves of unchanged sessions.
+
+    The data is compared in its serialised form, which also covers the
+    expiry stored in the session.
+    """
+
+    _loaded_state = None
+
+    @staticmethod
+    def _get_state(data):
+        """Return a comparable snapshot of the session data."""
+        return json.dumps(data, sort_keys=True, default=str)
+
+    def _is_unchanged(self, must_create):
+        """Return whether saving would write the data that was loaded."""
+        return (
+            not must_create
+            and self.session_key is not None
+            and self._loaded_state is not None
+            and self._get_state(self._session_cache) == self._loaded_state
+        )
+
+    def load(self):
+        """Load the session data and remember its state."""
+        data = super().load()
+        self._loaded_state = self._get_state(data)
+        return data
+
+    async def aload(self):
+        """See load()."""
+        data = await super().aload()
+        self._loaded_state = self._get_state(data)
+        return data
+
+    def save(self, must_create=False):
+        """Save the session data, unless it did not change."""
+        if self._is_unchanged(must_create):
+            return
+        super().save(must_create=must_create)
+        self._loaded_state = self._get_state(self._session_cache)
+
+    async def asave(self, must_create=False):
+        """See save()."""
+        if self._is_unchanged(must_create):
+            return
+        await super().asave(must_create=must_create)
+        self._loaded_state = self._get_state(self._session_cache)
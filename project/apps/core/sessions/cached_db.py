@@ -0,0 +1,13 @@
+"""
+Module: sessions.cached_db
+
+Cached database session engine with write coalescing.
+"""
+
+from django.contrib.sessions.backends import cached_db
+
+from . import CoalescingSessionMixin
+
+
+class SessionStore(CoalescingSessionMixin, cached_db.SessionStore):
+    """Cached database session store that skips saves of unchanged sessions."""
@@ -0,0 +1,13 @@
+"""
+Module: sessions.db
+
+Database session engine with write coalescing.
+"""
+
+from django.contrib.sessions.backends import db
+
+from . import CoalescingSessionMixin
+
+
+class SessionStore(CoalescingSessionMixin, db.SessionStore):
+    """Database session store that skips saves of unchanged sessions."""
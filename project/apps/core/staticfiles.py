@@ -0,0 +1,320 @@
+"""
+Module: staticfiles
+
+Provides the static files pipeline of the project, so that no separate web
+server is needed for them.
+
+`CompressedManifestStaticFilesStorage` collects files under content hashed
+names, e.g. "admin/css/admin.1a2b3c4d5e6f.css", and writes a gzip and, with
+the `brotli` package installed, a brotli variant of every compressible file
+next to it. `StaticFileServer` serves the collected files from memory: it
+sends the smallest variant the client accepts and lets clients cache
+hashed files forever, since their name changes with their content.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# extensions of files that are worth compressing, other formats such as
+# images and web fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".eot",
+    ".html",
+    ".ico",
+    ".js",
+    ".json",
+    ".map",
+    ".mjs",
+    ".otf",
+    ".svg",
+    ".ttf",
+    ".txt",
+    ".xml",
+}
+# smallest file that is compressed, in bytes
+COMPRESS_MIN_SIZE = 256
+# a variant is only kept if it saves at least this share of the size
+COMPRESS_MIN_SAVING = 0.05
+# extension of the variant of every content coding, preferred first
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+# hashed names as written by the manifest storage
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+# seconds clients cache files whose name does not change with the content
+UNHASHED_MAX_AGE = 60
+# seconds clients cache hashed files
+HASHED_MAX_AGE = 365 * 24 * 60 * 60
+# largest file kept in memory, larger files are streamed from disk
+MAX_MEMORY_SIZE = 2**20
+
+
+def compress(content, encoding):
+    """
+    Compress the content of a file.
+
+    Args:
+        content (bytes): The content.
+        encoding (str): The content coding, "gzip" or "br".
+
+    Returns:
+        bytes: The compressed content.
+    """
+    if encoding == "br":
+        return brotli.compress(content)
+    # no timestamp, so that collecting twice writes the same file
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def get_encodings():
+    """Return the content codings variants are written for."""
+    return [encoding for encoding in ENCODINGS if encoding != "br" or brotli]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage writing content hashed names and precompressed
+    variants of the collected files.
+
+    Until the files are collected for the first time, e.g. in tests, the
+    original names are used, which development serves from the finders.
+    """
+
+    def stored_name(self, name):
+        """Return the hashed name of a file, or its name if not collected."""
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash the files, then compress the original and hashed files."""
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = {*paths, *self.hashed_files.values()}
+        for name in sorted(names):
+            for variant in self.compress_file(name):
+                yield name, variant, True
+
+    def compress_file(self, name):
+        """
+        Write the compressed variants of a file.
+
+        Args:
+            name (str): The name of the file in the storage.
+
+        Returns:
+            list: The names of the written variants.
+        """
+        if Path(name).suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            return []
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return []
+        variants = []
+        for encoding in get_encodings():
+            compressed = compress(content, encoding)
+            if len(compressed) > len(content) * (1 - COMPRESS_MIN_SAVING):
+                continue
+            variant = name + ENCODINGS[encoding]
+            if self.exists(variant):
+                self.delete(variant)
+            self._save(variant, ContentFile(compressed))
+            variants.append(variant)
+        return variants
+
+
+@dataclass
+class StaticFile:
+    """A collected file and its compressed variants."""
+
+    path: Path
+    size: int
+    mtime: float
+    content_type: str
+    immutable: bool
+    variants: dict = field(default_factory=dict)
+    contents: dict = field(default_factory=dict, repr=False)
+
+    def get_path(self, encoding):
+        """Return the path of the variant of a content coding."""
+        return self.variants[encoding] if encoding else self.path
+
+    def get_content(self, encoding):
+        """
+        Get the content of a variant, kept in memory after the first read.
+
+        Returns:
+            bytes: The content, or None if the file is too large to keep.
+        """
+        content = self.contents.get(encoding)
+        if content is None:
+            path = self.get_path(encoding)
+            if path.stat().st_size > MAX_MEMORY_SIZE:
+                return None
+            content = self.contents[encoding] = path.read_bytes()
+        return content
+
+
+def get_accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Args:
+        header (str): The header, e.g. "gzip, deflate, br;q=0.5".
+
+    Returns:
+        set: The accepted content codings.
+    """
+    accepted = set()
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class StaticFileServer:
+    """
+    Serves the files of a static root.
+
+    The root is scanned once, files collected later are served after a
+    restart. Hashed files are cached by clients for a year, others for
+    `UNHASHED_MAX_AGE` seconds, and all are revalidated with a 304.
+
+    Usage:
+        server = StaticFileServer(settings.STATIC_ROOT, settings.STATIC_URL)
+        response = server.serve(request)  # None if not a static file
+    """
+
+    def __init__(self, root, url):
+        self.url = url
+        self.files = self.scan(Path(root)) if root else {}
+
+    @staticmethod
+    def scan(root):
+        """
+        Index the files of a static root.
+
+        Args:
+            root (Path): The static root.
+
+        Returns:
+            dict: The files by their path relative to the root.
+        """
+        files = {}
+        if not root.is_dir():
+            return files
+        suffixes = set(ENCODINGS.values())
+        for directory, _dirs, names in os.walk(root):
+            for name in names:
+                path = Path(directory) / name
+                if path.suffix in suffixes and path.with_suffix("").exists():
+                    continue
+                stat = path.stat()
+                content_type, _encoding = mimetypes.guess_type(name)
+                static_file = StaticFile(
+                    path=path,
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    content_type=content_type or "application/octet-stream",
+                    immutable=HASHED_NAME.search(name) is not None,
+                )
+                for encoding, suffix in ENCODINGS.items():
+                    variant = path.with_name(name + suffix)
+                    if variant.exists():
+                        static_file.variants[encoding] = variant
+                files[path.relative_to(root).as_posix()] = static_file
+        return files
+
+    def find(self, request):
+        """Return the static file a request is for, or None."""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if not request.path_info.startswith(self.url):
+            return None
+        return self.files.get(request.path_info[len(self.url) :])
+
+    @staticmethod
+    def get_encoding(request, static_file):
+        """Return the smallest variant the client accepts, or None."""
+        if not static_file.variants:
+            return None
+        accepted = get_accepted_encodings(
+            request.headers.get("Accept-Encoding", "")
+        )
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in static_file.variants:
+                return encoding
+        return None
+
+    def serve(self, request):
+        """
+        Serve a static file.
+
+        Args:
+            request (HttpRequest): The request.
+
+        Returns:
+            HttpResponse: The file, a 304 if the client has it, or None if
+            the request is not for a static file.
+        """
+        static_file = self.find(request)
+        if static_file is None:
+            return None
+        encoding = self.get_encoding(request, static_file)
+        content = static_file.get_content(encoding)
+        if content is None:
+            response = FileResponse(
+                static_file.get_path(encoding).open("rb"),
+                content_type=static_file.content_type,
+            )
+        else:
+            response = HttpResponse(
+                b"" if request.method == "HEAD" else content,
+                content_type=static_file.content_type,
+            )
+            response["Content-Length"] = len(content)
+        etag = f'"{static_file.size:x}-{int(static_file.mtime * 1e6):x}'
+        if encoding:
+            response["Content-Encoding"] = encoding
+            etag += f"-{encoding}"
+        if static_file.variants:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        response["ETag"] = etag + '"'
+        response["Last-Modified"] = http_date(static_file.mtime)
+        if static_file.immutable:
+            response["Cache-Control"] = (
+                f"public, max-age={HASHED_MAX_AGE}, immutable"
+            )
+        else:
+            response["Cache-Control"] = f"public, max-age={UNHASHED_MAX_AGE}"
+        return get_conditional_response(
+            request,
+            etag=response["ETag"],
+            last_modified=int(static_file.mtime),
+            response=response,
+        )
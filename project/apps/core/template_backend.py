@@ -0,0 +1,31 @@
+"""
+Module: template_backend
+
+Provides the Django template backend of the project, which adds the time
+spent rendering templates to the request metrics (see `core.metrics`).
+"""
+
+from django.template.backends import django
+
+from .metrics import timed
+
+
+class Template(django.Template):
+    """A template whose renders are timed."""
+
+    def render(self, context=None, request=None):
+        """Render the template, timing the outermost render."""
+        with timed("template"):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """The Django template backend, returning timed templates."""
+
+    def from_string(self, template_code):
+        """Compile a timed template from a string."""
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        """Load a timed template."""
+        return Template(super().get_template(template_name).template, self)
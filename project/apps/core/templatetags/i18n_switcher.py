@@ -2,14 +2,78 @@
 Module: i18n_switcher
 
 Provides Django template filters for switching language codes in URL paths.
+
+The supported language codes are precomputed from `settings.LANGUAGES` and
+rewritten paths are kept in an LRU cache, because the admin renders the
+alternates of the same paths on every page.
 """
 
+from functools import lru_cache
+
 from django import template
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.template.defaultfilters import stringfilter
+from django.utils.html import format_html_join
+from django.utils.translation import get_language_info
 
 register = template.Library()
 
+# number of distinct paths whose alternates are cached
+ALTERNATES_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=None)
+def get_language_table():
+    """
+    Returns the supported languages as a precomputed table.
+
+    Returns:
+        dict: The language codes mapped to their local names, in the order
+        of `settings.LANGUAGES`.
+    """
+    return {
+        code: get_language_info(code)["name_local"]
+        for (code, name) in settings.LANGUAGES
+    }
+
+
+@lru_cache(maxsize=ALTERNATES_CACHE_SIZE)
+def strip_lang_code(path):
+    """
+    Removes the language prefix from a URL path.
+
+    Args:
+        path (str): The URL path, starting with "/".
+
+    Returns:
+        str: The path without the language prefix, e.g. "/users/" for
+             "/en/users/". Paths without a prefix are returned unchanged.
+    """
+    prefix, separator, rest = path[1:].partition("/")
+    if prefix in get_language_table():
+        return separator + rest
+    return path
+
+
+def validate_path(path):
+    """
+    Validates a URL path for a language switch.
+
+    Args:
+        path (str): The URL path to validate.
+
+    Raises:
+        ValueError: If the URL path is empty or doesn't start with "/".
+    """
+    if not path:
+        raise ValueError("URL path for language switch is empty")
+    if not path.startswith("/"):
+        raise ValueError(
+            'URL path for language switch does not start with "/"'
+        )
+
 
 def switch_lang_code(path, language):
     """
@@ -26,30 +90,42 @@ def switch_lang_code(path, language):
         Exception: If the URL path is empty, doesn't start with "/",
                    or the language code is not supported.
     """
-    # Get the supported language codes
-    lang_codes = [c for (c, name) in settings.LANGUAGES]
-
-    # Validate the inputs
-    if not path:
-        raise ValueError("URL path for language switch is empty")
-    if not path.startswith("/"):
-        raise ValueError(
-            'URL path for language switch does not start with "/"'
-        )
-    if language not in lang_codes:
+    validate_path(path)
+    if language not in get_language_table():
         raise ValueError(f"{language} is not a supported language code")
 
-    # Split the parts of the path
-    parts = path.split("/")
-
     # Add or substitute the new language prefix
-    if parts[1] in lang_codes:
-        parts[1] = language
-    else:
-        parts[0] = "/" + language
+    return f"/{language}{strip_lang_code(path)}"
+
+
+@lru_cache(maxsize=ALTERNATES_CACHE_SIZE)
+def get_lang_alternates(path):
+    """
+    Returns the URL path in every supported language.
+
+    Args:
+        path (str): The URL path.
+
+    Returns:
+        tuple: One dict per language with the language "code", its
+               "name_local" and the "path" in that language.
+    """
+    validate_path(path)
+    rest = strip_lang_code(path)
+    return tuple(
+        {"code": code, "name_local": name_local, "path": f"/{code}{rest}"}
+        for code, name_local in get_language_table().items()
+    )
 
-    # Return the full new path
-    return "/".join(parts)
+
+@receiver(setting_changed)
+def clear_language_caches(setting, **kwargs):
+    """Clears the precomputed tables when the languages change."""
+    del kwargs
+    if setting == "LANGUAGES":
+        get_language_table.cache_clear()
+        strip_lang_code.cache_clear()
+        get_lang_alternates.cache_clear()
 
 
 @register.filter
@@ -88,3 +164,59 @@ def switch_i18n(request, language):
         str: The modified URL path with the new language code.
     """
     return switch_lang_code(request.get_full_path(), language)
+
+
+@register.filter
+def i18n_alternates(request):
+    """
+    Django template filter: Returns the URL path of a request in every
+    supported language in one call.
+
+    Usage:
+        {% for alternate in request|i18n_alternates %}
+            <a href="{{ alternate.path }}">{{ alternate.name_local }}</a>
+        {% endfor %}
+
+    Args:
+        request (HttpRequest): The request object.
+
+    Returns:
+        tuple: One dict per language with "code", "name_local" and "path".
+    """
+    return get_lang_alternates(request.get_full_path())
+
+
+@register.simple_tag(takes_context=True)
+def i18n_hreflang_links(context):
+    """
+    Django template tag: Emits the `<link rel="alternate" hreflang>` tags of
+    the current page for every supported language, plus an "x-default"
+    link to the default language.
+
+    Usage:
+        {% i18n_hreflang_links %}
+
+    Args:
+        context (Context): The template context, holding the request.
+
+    Returns:
+        str: The link tags, or an empty string without a request.
+    """
+    request = context.get("request")
+    if request is None:
+        return ""
+    alternates = get_lang_alternates(request.get_full_path())
+    links = [
+        (alternate["code"], request.build_absolute_uri(alternate["path"]))
+        for alternate in alternates
+    ]
+    links += [
+        ("x-default", url)
+        for code, url in links
+        if code == settings.LANGUAGE_CODE
+    ]
+    return format_html_join(
+        "\n",
+        '<link rel="alternate" hreflang="{}" href="{}">',
+        links,
+    )
@@ -0,0 +1,36 @@
+"""
+Module: testing
+
+Provides the test runner of the project, see `TEST_RUNNER`.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Run the tests with the files the workers of a deployment share in a
+    temporary directory, so that the tests neither read nor change them.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        """Point the shared files to a temporary directory."""
+        super().setup_test_environment(**kwargs)
+        self.directory = Path(tempfile.mkdtemp(prefix="eco-track-tests-"))
+        self.files_override = override_settings(
+            METRICS_DIR=self.directory / "metrics",
+            PROFILE_DIR=self.directory / "profiles",
+            EMISSION_FACTOR_CATALOGUE=self.directory / "emission_factors.bin",
+        )
+        self.files_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        """Remove the temporary directory."""
+        self.files_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
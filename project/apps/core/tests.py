@@ -0,0 +1,1345 @@
+"""
+Module: core tests
+
+This module contains test cases for the core app. The test cases cover the
+cached API schema, the i18n_switcher template filters, the session engines,
+the database and cache configuration, the read replica router, the async
+request path, the response cache, the static files, the template
+profiles, the request metrics, the benchmark suite and the startup
+profiles.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from uuid import RFC_4122
+
+from django.conf import settings
+from django.contrib.admin import site
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import translation
+from django.utils.module_loading import import_string
+
+from asgiref.sync import async_to_sync
+from config.caches import cache_config
+from config.database import database_config, replica_configs
+from config.decorators import admin_or_superuser_required, lazy_view
+from config.startup import startup_config
+from config.templates import template_config
+
+from users.models import CustomUser
+
+from .apps import check_admin
+from .benchmark import compare, load_baseline, save_baseline, summarize
+from .checks import check_async_middleware, check_shared_cache
+from .fields import UUID7Field, uuid7
+from .http_cache import cache_response, invalidate_responses, user_tag
+from .management.commands.startup_report import (
+    group_by_package,
+    parse_importtime,
+)
+from .metrics import (
+    MetricsRegistry,
+    RequestMetrics,
+    clear_files,
+    current_metrics,
+    merge_files,
+    registry,
+    render_prometheus,
+    timed,
+)
+from .middleware import (
+    MetricsMiddleware,
+    ReplicaPinningMiddleware,
+    StaticFilesMiddleware,
+)
+from .profiling import profiler
+from .routers import (
+    PRIMARY,
+    PrimaryReplicaRouter,
+    get_routing_state,
+    pin_to_primary,
+    routing_state,
+)
+from .schema import SchemaCache, schema_cache
+from .sessions.db import SessionStore
+from .staticfiles import CompressedManifestStaticFilesStorage, StaticFileServer
+from .templatetags.i18n_switcher import get_lang_alternates, switch_lang_code
+
+
+def sync_only_middleware(get_response):
+    """
+    A middleware without async support.
+    """
+    return get_response
+
+
+class CachedSchemaTests(TestCase):
+    """
+    Test suite for the cached OpenAPI schema view.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by logging in an admin.
+        """
+        cache.clear()
+        schema_cache.clear()
+        self.client.force_login(
+            CustomUser.objects.create_superuser(
+                email="admin@example.com", password=None
+            )
+        )
+        self.url = reverse("schema")
+
+    def test_schema_is_built_once(self):
+        """
+        Test that the schema is generated once per language and format.
+        """
+        with mock.patch.object(
+            SchemaCache, "_build", wraps=SchemaCache._build
+        ) as build:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            self.client.get(self.url, {"format": "json"})
+            self.client.get(self.url, {"lang": "de"})
+        self.assertEqual(build.call_count, 3)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(
+            first["Content-Type"], "application/vnd.oai.openapi; charset=utf-8"
+        )
+        self.assertIn(b"/en/documentation/schema/", first.content)
+
+    def test_swagger_ui_is_not_cached(self):
+        """
+        Test that the Swagger UI page is rendered with the CSRF token of
+        every request, which is masked anew each time.
+        """
+        first = self.client.get(reverse("swagger-ui"))
+        second = self.client.get(reverse("swagger-ui"))
+        self.assertIn(b"X-CSRFTOKEN", first.content)
+        self.assertNotEqual(first.content, second.content)
+
+    def test_schema_not_modified(self):
+        """
+        Test that a matching ETag is answered with a 304.
+        """
+        response = self.client.get(self.url, {"format": "json"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Type"], "application/vnd.oai.openapi+json"
+        )
+        etag = response["ETag"]
+        response = self.client.get(
+            self.url, {"format": "json"}, headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_schema_rebuilt_on_code_version_change(self):
+        """
+        Test that the cache is dropped when the code version changes.
+        """
+        with mock.patch.object(
+            SchemaCache, "_build", wraps=SchemaCache._build
+        ) as build:
+            self.client.get(self.url)
+            with override_settings(CODE_VERSION="next"):
+                self.client.get(self.url)
+        self.assertEqual(build.call_count, 2)
+
+
+class I18nSwitcherTests(SimpleTestCase):
+    """
+    Test suite for the i18n_switcher template filters.
+    """
+
+    def test_switch_lang_code(self):
+        """
+        Test adding and substituting language prefixes.
+        """
+        self.assertEqual(switch_lang_code("/en/users/", "de"), "/de/users/")
+        self.assertEqual(switch_lang_code("/users/", "de"), "/de/users/")
+        self.assertEqual(switch_lang_code("/en", "de"), "/de")
+        self.assertEqual(switch_lang_code("/", "en"), "/en/")
+        self.assertEqual(switch_lang_code("/en/?q=a", "de"), "/de/?q=a")
+        for path, language in (("", "en"), ("users/", "en"), ("/", "fr")):
+            with self.assertRaises(ValueError):
+                switch_lang_code(path, language)
+
+    def test_get_lang_alternates(self):
+        """
+        Test that all alternates are returned in the order of LANGUAGES.
+        """
+        self.assertEqual(
+            [
+                (alternate["code"], alternate["path"])
+                for alternate in get_lang_alternates("/de/users/")
+            ],
+            [("de", "/de/users/"), ("en", "/en/users/")],
+        )
+
+    @override_settings(LANGUAGES=[("en", "English"), ("fr", "French")])
+    def test_languages_changed(self):
+        """
+        Test that the precomputed table follows the LANGUAGES setting.
+        """
+        self.assertEqual(switch_lang_code("/fr/users/", "en"), "/en/users/")
+
+    def test_hreflang_links(self):
+        """
+        Test that hreflang links are emitted for all languages.
+        """
+        request = RequestFactory().get("/de/users/")
+        html = Template(
+            "{% load i18n_switcher %}{% i18n_hreflang_links %}"
+        ).render(Context({"request": request}))
+        self.assertInHTML(
+            '<link rel="alternate" hreflang="de" '
+            'href="http://testserver/de/users/">',
+            html,
+        )
+        self.assertInHTML(
+            '<link rel="alternate" hreflang="x-default" '
+            'href="http://testserver/en/users/">',
+            html,
+        )
+
+
+class CoalescingSessionTests(TestCase):
+    """
+    Test suite for the write coalescing session engines.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by storing a session.
+        """
+        session = SessionStore()
+        session["language"] = "en"
+        session.create()
+        self.session_key = session.session_key
+
+    def test_unchanged_session_is_not_saved(self):
+        """
+        Test that a session holding the loaded data is not written.
+        """
+        session = SessionStore(self.session_key)
+        session["language"] = "en"
+        self.assertTrue(session.modified)
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_changed_session_is_saved(self):
+        """
+        Test that changed data is written and becomes the new baseline.
+        """
+        session = SessionStore(self.session_key)
+        session["language"] = "de"
+        session.save()
+        self.assertEqual(SessionStore(self.session_key)["language"], "de")
+        with self.assertNumQueries(0):
+            session.save()
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    """
+    Test suite for building the database settings from the environment.
+    """
+
+    def test_default_sqlite(self):
+        """
+        Test that SQLite is tuned for concurrent access by default.
+        """
+        config = database_config({}, "db.sqlite3")
+        self.assertEqual(config["NAME"], "db.sqlite3")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertIn("journal_mode = WAL", config["OPTIONS"]["init_command"])
+        self.assertEqual(config["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        config = database_config({"SQLITE_TUNING": "0"}, "db.sqlite3")
+        self.assertNotIn("OPTIONS", config)
+
+    def test_sqlite_url(self):
+        """
+        Test that SQLite URLs select the database file.
+        """
+        config = database_config(
+            {"DATABASE_URL": "sqlite:////tmp/eco.db"}, "db.sqlite3"
+        )
+        self.assertEqual(config["NAME"], "/tmp/eco.db")
+
+    def test_postgresql_url(self):
+        """
+        Test that PostgreSQL URLs configure a connection pool.
+        """
+        config = database_config(
+            {
+                "DATABASE_URL": "postgres://eco:p%40ss@db:5433/track"
+                "?sslmode=require",
+                "DATABASE_POOL_MAX_SIZE": "20",
+            },
+            "db.sqlite3",
+        )
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(
+            (config["USER"], config["PASSWORD"], config["HOST"]),
+            ("eco", "p@ss", "db"),
+        )
+        self.assertEqual((config["PORT"], config["NAME"]), ("5433", "track"))
+        self.assertEqual(config["OPTIONS"]["sslmode"], "require")
+        self.assertEqual(config["OPTIONS"]["pool"]["max_size"], 20)
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+
+    def test_unsupported_url(self):
+        """
+        Test that unsupported databases are rejected.
+        """
+        with self.assertRaises(ValueError):
+            database_config({"DATABASE_URL": "mysql://db/eco"}, "db.sqlite3")
+
+    def test_replica_urls(self):
+        """
+        Test that every replica URL adds a replica mirrored in tests.
+        """
+        replicas = replica_configs(
+            {
+                "DATABASE_URL": "postgres://eco@primary/track",
+                "DATABASE_REPLICA_URLS": "sqlite:////tmp/r1.db, "
+                "postgres://eco@replica/track",
+            }
+        )
+        self.assertEqual(list(replicas), ["replica_1", "replica_2"])
+        self.assertEqual(replicas["replica_1"]["NAME"], "/tmp/r1.db")
+        self.assertEqual(replicas["replica_2"]["HOST"], "replica")
+        self.assertEqual(replicas["replica_2"]["TEST"], {"MIRROR": "default"})
+        self.assertEqual(replica_configs({}), {})
+
+
+class CacheConfigTests(SimpleTestCase):
+    """
+    Test suite for building the cache settings from the environment.
+    """
+
+    def test_cache_urls(self):
+        """
+        Test the supported cache URLs.
+        """
+        self.assertEqual(
+            cache_config({})["BACKEND"],
+            "django.core.cache.backends.locmem.LocMemCache",
+        )
+        redis = cache_config({"CACHE_URL": "redis://cache:6379/1"})
+        self.assertEqual(redis["LOCATION"], "redis://cache:6379/1")
+        memcached = cache_config({"CACHE_URL": "memcached://a:11211,b:11211"})
+        self.assertEqual(memcached["LOCATION"], ["a:11211", "b:11211"])
+        files = cache_config(
+            {"CACHE_URL": "file:///tmp/cache", "CACHE_MAX_ENTRIES": "5"}
+        )
+        self.assertEqual(files["LOCATION"], "/tmp/cache")
+        self.assertEqual(files["OPTIONS"], {"MAX_ENTRIES": 5})
+        with self.assertRaises(ValueError):
+            cache_config({"CACHE_URL": "mysql://cache"})
+
+    def test_check_shared_cache(self):
+        """
+        Test that a process-local default cache fails the check outside of
+        DEBUG.
+        """
+        self.assertEqual(check_shared_cache(None), [])
+        with self.settings(CACHE_SHARED_REQUIRED=True):
+            errors = check_shared_cache(None)
+            self.assertEqual(
+                [error.id for error in errors], ["core.E001", "core.E003"]
+            )
+            with self.settings(
+                CACHES={
+                    **settings.CACHES,
+                    "default": cache_config(
+                        {"CACHE_URL": "redis://cache:6379/1"}
+                    ),
+                }
+            ):
+                self.assertEqual(check_shared_cache(None), [])
+
+    def test_check_shared_cache_with_replicas(self):
+        """
+        Test that a process-local default cache fails the check with read
+        replicas, even in DEBUG.
+        """
+        with mock.patch("core.checks.get_replicas", return_value=["r"]):
+            errors = check_shared_cache(None)
+            self.assertEqual([error.id for error in errors], ["core.E002"])
+            with self.settings(
+                CACHES={
+                    **settings.CACHES,
+                    "default": cache_config(
+                        {"CACHE_URL": "redis://cache:6379/1"}
+                    ),
+                }
+            ):
+                self.assertEqual(check_shared_cache(None), [])
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Test suite for the read replica router and its pinning middleware.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a router for a single replica.
+        """
+        self.router = PrimaryReplicaRouter(replicas=["replica_1"])
+        self.factory = RequestFactory()
+
+    def test_reads_go_to_replicas(self):
+        """
+        Test that reads of replica apps go to a replica, writes to the
+        primary.
+        """
+        self.assertEqual(self.router.db_for_read(CustomUser), "replica_1")
+        self.assertEqual(self.router.db_for_write(CustomUser), PRIMARY)
+        self.assertIsNone(
+            self.router.db_for_read(SessionStore.get_model_class())
+        )
+
+    def test_reads_after_write_go_to_primary(self):
+        """
+        Test that reads of a unit of work that wrote go to the primary.
+        """
+        with routing_state():
+            self.assertEqual(self.router.db_for_read(CustomUser), "replica_1")
+            self.router.db_for_write(CustomUser)
+            self.assertEqual(self.router.db_for_read(CustomUser), PRIMARY)
+        with pin_to_primary():
+            self.assertEqual(self.router.db_for_read(CustomUser), PRIMARY)
+
+    def test_replicas_are_not_migrated(self):
+        """
+        Test that migrations only run on the primary.
+        """
+        self.assertFalse(self.router.allow_migrate("replica_1", "users"))
+        self.assertIsNone(self.router.allow_migrate(PRIMARY, "users"))
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_writes_pin_the_token(self):
+        """
+        Test that the middleware pins a token to the primary after a write.
+        """
+
+        def view(request):
+            state = get_routing_state()
+            if request.method == "POST":
+                self.router.db_for_write(CustomUser)
+            return HttpResponse(str(state.pinned))
+
+        with mock.patch("core.middleware.get_replicas", return_value=["r"]):
+            middleware = ReplicaPinningMiddleware(view)
+        token = {"HTTP_AUTHORIZATION": "Bearer token"}
+        other = {"HTTP_AUTHORIZATION": "Bearer other"}
+        self.assertEqual(
+            middleware(self.factory.get("/", **token)).content, b"False"
+        )
+        middleware(self.factory.post("/", **token))
+        self.assertEqual(
+            middleware(self.factory.get("/", **token)).content, b"True"
+        )
+        self.assertEqual(
+            middleware(self.factory.get("/", **other)).content, b"False"
+        )
+
+
+@override_settings(
+    DATABASE_ROUTERS=[PrimaryReplicaRouter(replicas=["replica_1"])]
+)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    Test suite for the routing between the test database and a replica in
+    its own SQLite file, which is a copy of the primary that never catches
+    up.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up the replica connection to a file of a temporary directory.
+
+        The connection is added once the test databases exist, so that no
+        test database is created for it.
+        """
+        super().setUpClass()
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory)
+        cls.replica = Path(directory) / "replica.sqlite3"
+        connections.settings["replica_1"] = {
+            **connections.settings[PRIMARY],
+            "NAME": str(cls.replica),
+        }
+        cls.addClassCleanup(cls.remove_replica)
+        cls.databases = cls.databases | {"replica_1"}
+
+    @classmethod
+    def remove_replica(cls):
+        """
+        Close and remove the replica connection.
+        """
+        connections["replica_1"].close()
+        del connections["replica_1"]
+        del connections.settings["replica_1"]
+
+    def setUp(self):
+        """
+        Set up test environment with a replica of the empty primary and no
+        pinned tokens.
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.copy_to_replica()
+
+    def copy_to_replica(self):
+        """
+        Copy the primary database into the replica file.
+        """
+        connections["replica_1"].close()
+        primary = connections[PRIMARY]
+        primary.ensure_connection()
+        with closing(sqlite3.connect(self.replica)) as replica:
+            primary.connection.backup(replica)
+
+    def emails(self):
+        """
+        Read the emails of all users.
+        """
+        return sorted(CustomUser.objects.values_list("email", flat=True))
+
+    def test_reads_go_to_the_replica(self):
+        """
+        Test that reads miss the writes the replica has not copied, unless
+        they are pinned to the primary.
+        """
+        CustomUser.objects.create_user("copied@example.com", None)
+        self.copy_to_replica()
+        CustomUser.objects.create_user("lagging@example.com", None)
+        self.assertEqual(self.emails(), ["copied@example.com"])
+        with pin_to_primary():
+            self.assertEqual(
+                self.emails(), ["copied@example.com", "lagging@example.com"]
+            )
+
+    def test_writes_pin_the_token(self):
+        """
+        Test that the reads of a token that wrote go to the primary, in the
+        same and in the next request.
+        """
+
+        def view(request):
+            if request.method == "POST":
+                CustomUser.objects.create_user(request.POST["email"], None)
+            return HttpResponse(",".join(self.emails()))
+
+        with mock.patch(
+            "core.middleware.get_replicas", return_value=["replica_1"]
+        ):
+            middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        token = {"HTTP_AUTHORIZATION": "Bearer token"}
+        other = {"HTTP_AUTHORIZATION": "Bearer other"}
+        response = middleware(
+            factory.post("/", {"email": "new@example.com"}, **token)
+        )
+        self.assertEqual(response.content, b"new@example.com")
+        self.assertEqual(
+            middleware(factory.get("/", **token)).content, b"new@example.com"
+        )
+        self.assertEqual(middleware(factory.get("/", **other)).content, b"")
+
+    def test_bulk_create_users_counts_on_the_primary(self):
+        """
+        Test that the users inserted with ignored conflicts are counted
+        although the replica has not copied them.
+        """
+        CustomUser.objects.create_user("taken@example.com", None)
+        total = CustomUser.objects.bulk_create_users(
+            [
+                {"email": "taken@example.com", "password": ""},
+                {"email": "new@example.com", "password": ""},
+            ],
+            workers=1,
+            ignore_conflicts=True,
+        )
+        self.assertEqual(total, 1)
+        self.assertEqual(self.emails(), [])
+
+
+class AsyncRequestTests(SimpleTestCase):
+    """
+    Test suite for the async request path.
+    """
+
+    def test_middleware_check(self):
+        """
+        Test that middleware hopping threads under ASGI are reported.
+        """
+        self.assertEqual(check_async_middleware(None), [])
+        middleware = [
+            "django.middleware.common.CommonMiddleware",
+            "core.tests.sync_only_middleware",
+        ]
+        with self.settings(MIDDLEWARE=middleware):
+            self.assertEqual(
+                [warning.id for warning in check_async_middleware(None)],
+                ["core.W002", "core.W001"],
+            )
+
+    def test_middleware_run_inline(self):
+        """
+        Test that the middleware stack runs without thread hops.
+        """
+
+        async def view(request):
+            return HttpResponse(request.LANGUAGE_CODE)
+
+        handler = view
+        for path in reversed(settings.MIDDLEWARE):
+            try:
+                handler = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                pass
+        with mock.patch(
+            "core.middleware.sync_to_async", side_effect=AssertionError
+        ):
+            response = async_to_sync(handler)(AsyncRequestFactory().get("/"))
+        self.assertEqual(response.content, settings.LANGUAGE_CODE.encode())
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+
+    def test_admin_or_superuser_required_async(self):
+        """
+        Test that the decorator keeps async views async.
+        """
+
+        @admin_or_superuser_required
+        async def view(request):
+            return HttpResponse("ok")
+
+        async def get_response(user):
+            request = AsyncRequestFactory().get("/")
+
+            async def auser():
+                return user
+
+            request.auser = auser
+            return await view(request)
+
+        with self.assertRaises(PermissionDenied):
+            async_to_sync(get_response)(AnonymousUser())
+        user = CustomUser(email="admin@example.com", is_superuser=True)
+        self.assertEqual(async_to_sync(get_response)(user).content, b"ok")
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_async_pinning(self):
+        """
+        Test that the pinning middleware runs in async mode.
+        """
+        router = PrimaryReplicaRouter(replicas=["replica_1"])
+
+        async def view(request):
+            state = get_routing_state()
+            if request.method == "POST":
+                router.db_for_write(CustomUser)
+            return HttpResponse(str(state.pinned))
+
+        with mock.patch("core.middleware.get_replicas", return_value=["r"]):
+            middleware = ReplicaPinningMiddleware(view)
+        factory = AsyncRequestFactory()
+        token = {"headers": {"authorization": "Bearer async"}}
+        call = async_to_sync(middleware)
+        self.assertEqual(call(factory.get("/", **token)).content, b"False")
+        call(factory.post("/", **token))
+        self.assertEqual(call(factory.get("/", **token)).content, b"True")
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class ResponseCacheTests(SimpleTestCase):
+    """
+    Test suite for the response cache.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a cached view counting its calls.
+        """
+        cache.clear()
+        self.calls = 0
+
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f"{translation.get_language()} {self.calls}")
+
+        self.view = cache_response("docs")(view)
+        self.factory = RequestFactory()
+
+    def get(self, user=None, **headers):
+        """
+        Send a GET request to the cached view.
+        """
+        request = self.factory.get("/docs/", headers=headers)
+        request.user = user or AnonymousUser()
+        return self.view(request)
+
+    def test_conditional_get(self):
+        """
+        Test that cached responses have validators and answer 304s without
+        calling the view.
+        """
+        response = self.get()
+        self.assertEqual(response.content, b"en 1")
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Authorization", response["Vary"])
+        self.assertEqual(self.get().content, b"en 1")
+        etag = response["ETag"]
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+        self.assertEqual(
+            self.get(if_modified_since=response["Last-Modified"]).status_code,
+            304,
+        )
+        self.assertEqual(self.calls, 1)
+
+    def test_varies_on_language_and_principal(self):
+        """
+        Test that languages and users get their own responses.
+        """
+        self.get()
+        with translation.override("de"):
+            self.assertEqual(self.get().content, b"de 2")
+        user = CustomUser(email="cached@example.com")
+        self.assertEqual(self.get(user).content, b"en 3")
+        self.assertEqual(self.get(user).content, b"en 3")
+        self.assertEqual(self.get().content, b"en 1")
+
+    def test_invalidation(self):
+        """
+        Test that invalidated tags invalidate their responses.
+        """
+        user = CustomUser(email="cached@example.com")
+        self.get()
+        self.get(user)
+        invalidate_responses(user_tag(user.pk))
+        self.assertEqual(self.get().content, b"en 1")
+        self.assertEqual(self.get(user).content, b"en 3")
+        invalidate_responses("docs")
+        self.assertEqual(self.get().content, b"en 4")
+        with self.settings(CODE_VERSION="next"):
+            self.assertEqual(self.get().content, b"en 5")
+
+
+class StaticFilesTests(SimpleTestCase):
+    """
+    Test suite for the static files storage and server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Set up test environment with the static files collected.
+        """
+        super().setUpClass()
+        cls.root = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        with override_settings(STATIC_ROOT=cls.root):
+            storage = CompressedManifestStaticFilesStorage()
+            with mock.patch(
+                "django.contrib.staticfiles.management.commands."
+                "collectstatic.staticfiles_storage",
+                storage,
+            ):
+                call_command("collectstatic", interactive=False, verbosity=0)
+        cls.hashed_name = storage.stored_name("admin/css/admin.css")
+        cls.server = StaticFileServer(cls.root, "/static/")
+
+    def get(self, name, **headers):
+        """
+        Request a static file from the server.
+        """
+        request = RequestFactory().get(f"/static/{name}", headers=headers)
+        return self.server.serve(request)
+
+    def test_collect_hashed_and_compressed(self):
+        """
+        Test that files are collected under hashed names with compressed
+        variants.
+        """
+        self.assertRegex(self.hashed_name, r"^admin/css/admin\.\w{12}\.css$")
+        content = (self.root / self.hashed_name).read_bytes()
+        compressed = self.root / (self.hashed_name + ".gz")
+        self.assertEqual(gzip.decompress(compressed.read_bytes()), content)
+        png = self.root / "rest_framework/img/grid.png"
+        self.assertTrue(png.exists())
+        self.assertFalse(png.with_name("grid.png.gz").exists())
+
+    def test_uncollected_names(self):
+        """
+        Test that the original names are used before collecting.
+        """
+        storage = CompressedManifestStaticFilesStorage(
+            location=self.root / "missing"
+        )
+        self.assertEqual(
+            storage.url("admin/css/admin.css"), "/static/admin/css/admin.css"
+        )
+
+    def test_serve_compressed(self):
+        """
+        Test that the variant the client accepts is served, with hashed files
+        cached forever.
+        """
+        content = (self.root / self.hashed_name).read_bytes()
+        response = self.get(self.hashed_name, accept_encoding="gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        response = self.get(self.hashed_name)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response.content, content)
+        response = self.get("admin/css/admin.css")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+
+    def test_conditional_get(self):
+        """
+        Test that revalidating clients get a 304.
+        """
+        etag = self.get(self.hashed_name, accept_encoding="gzip")["ETag"]
+        response = self.get(
+            self.hashed_name, accept_encoding="gzip", if_none_match=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.get(self.hashed_name, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_middleware(self):
+        """
+        Test that the middleware serves collected files and passes other
+        requests on.
+        """
+        with override_settings(STATIC_ROOT=self.root):
+            response = self.client.get(
+                f"/static/{self.hashed_name}",
+                headers={"accept-encoding": "gzip"},
+            )
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            # passed on to the urls, which redirect to a language prefix
+            self.assertEqual(
+                self.client.get("/static/missing.css").status_code, 302
+            )
+        with override_settings(STATIC_ROOT=self.root, STATIC_SERVE=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                StaticFilesMiddleware(HttpResponse)
+
+
+class TemplateRenderTests(TestCase):
+    """
+    Test suite for the template profiles and the cached admin fragments.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a logged in superuser.
+        """
+        caches["template_fragments"].clear()
+        user = CustomUser.objects.create_superuser(
+            email="render@example.com", password=None
+        )
+        self.client.force_login(user)
+
+    def test_template_profiles(self):
+        """
+        Test that the production profile uses the cached loader without
+        debug information.
+        """
+        development = template_config("development", [])
+        self.assertTrue(development["APP_DIRS"])
+        self.assertNotIn("loaders", development["OPTIONS"])
+        production = template_config("production", [])
+        self.assertNotIn("APP_DIRS", production)
+        [(loader, loaders)] = production["OPTIONS"]["loaders"]
+        self.assertEqual(loader, "django.template.loaders.cached.Loader")
+        self.assertEqual(len(loaders), 2)
+        self.assertFalse(production["OPTIONS"]["debug"])
+        with self.assertRaises(ValueError):
+            template_config("fast", [])
+
+    def test_language_switcher_fragment(self):
+        """
+        Test that the language switcher is rendered once per path and
+        language.
+        """
+        # the LocaleMiddleware leaves the language of the last request active
+        with translation.override("en"), mock.patch(
+            "core.templatetags.i18n_switcher.get_lang_alternates",
+            wraps=get_lang_alternates,
+        ) as alternates:
+            for _ in range(2):
+                response = self.client.get("/en/")
+                self.assertContains(response, 'href="/de/"')
+            self.assertEqual(alternates.call_count, 1)
+            self.assertContains(self.client.get("/de/"), 'href="/en/"')
+            self.assertEqual(alternates.call_count, 2)
+
+
+class MetricsTests(TestCase):
+    """
+    Test suite for the request metrics and the slow request profiler.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with empty metrics in a temporary directory.
+        """
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.metrics_dir = directory / "metrics"
+        self.profile_dir = directory / "profiles"
+        settings_override = override_settings(
+            METRICS_DIR=self.metrics_dir, PROFILE_DIR=self.profile_dir
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.user = CustomUser.objects.create_superuser(
+            email="metrics@example.com", password=None
+        )
+
+    def get_series(self, name):
+        """
+        Return the series of a metric by their labels.
+        """
+        return {
+            labels: value
+            for (metric, labels), value in registry.snapshot().items()
+            if metric == name
+        }
+
+    def test_record_request(self):
+        """
+        Test that the time, queries, templates and cache lookups of a request
+        are recorded by route.
+        """
+        self.client.force_login(self.user)
+        # the LocaleMiddleware leaves the language of the last request active
+        with translation.override("en"):
+            self.client.get("/en/")
+        labels = (("route", "admin:index"),)
+        duration = self.get_series("request_duration_seconds")[
+            (("method", "GET"), ("route", "admin:index"), ("status", "2xx"))
+        ]
+        self.assertEqual(sum(duration[:-1]), 1)
+        queries = self.get_series("request_queries")[labels]
+        self.assertEqual(sum(queries[:-1]), 1)
+        self.assertGreater(queries[-1], 0)
+        templates = self.get_series("request_template_seconds")[labels]
+        self.assertGreater(templates[-1], 0)
+        self.assertNotIn(labels, self.get_series("request_hashing_seconds"))
+
+    def test_timed(self):
+        """
+        Test that nested timers are counted once and nothing is recorded
+        outside requests.
+        """
+        with timed("hashing"):
+            pass
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with timed("hashing"), timed("hashing"):
+                self.user.set_password("a long password")
+        finally:
+            current_metrics.reset(token)
+        self.assertGreater(metrics.hashing_time, 0)
+        self.assertEqual(metrics.template_time, 0)
+
+    def test_cache_lookups(self):
+        """
+        Test that the lookups of the application caches are counted.
+        """
+        schema_cache.clear()
+        self.client.force_login(self.user)
+        with translation.override("en"):
+            for _ in range(2):
+                self.client.get(reverse("schema"))
+        series = self.get_series("cache_requests_total")
+        self.assertEqual(
+            series[
+                (("cache", "schema"), ("result", "miss"), ("route", "schema"))
+            ],
+            1,
+        )
+        self.assertEqual(
+            series[
+                (("cache", "schema"), ("result", "hit"), ("route", "schema"))
+            ],
+            1,
+        )
+
+    def test_merge_keeps_exited_workers(self):
+        """
+        Test that the totals of workers that exited are kept in one file
+        until the files are cleared.
+        """
+        labels = (("route", "index"),)
+        worker = MetricsRegistry()
+        worker.record("index", "GET", 200, RequestMetrics(), 0.03)
+        for _ in range(2):
+            process = subprocess.Popen([sys.executable, "-c", ""])
+            process.wait()
+            with mock.patch(
+                "core.metrics.os.getpid", return_value=process.pid
+            ):
+                worker.flush(self.metrics_dir)
+            merge_files(self.metrics_dir)
+            self.assertEqual(
+                sorted(path.name for path in self.metrics_dir.glob("*.json")),
+                ["exited.json"],
+            )
+        worker.flush(self.metrics_dir)
+        merged = merge_files(self.metrics_dir)
+        self.assertEqual(sum(merged["request_queries", labels][:-1]), 3)
+        self.assertEqual(merged, merge_files(self.metrics_dir))
+        clear_files(self.metrics_dir)
+        self.assertEqual(list(self.metrics_dir.glob("*.json")), [])
+        self.assertEqual(merge_files(self.metrics_dir), {})
+
+    def test_merge_and_render(self):
+        """
+        Test that the files of all workers are merged into one exposition.
+        """
+        labels = (("route", "index"),)
+        metrics = RequestMetrics(queries=3, query_time=0.002)
+        metrics.cache["schema", "hit"] = 2
+        # the files of running processes
+        for pid in (os.getpid(), os.getppid()):
+            worker = MetricsRegistry()
+            worker.record("index", "GET", 200, metrics, 0.03)
+            with mock.patch("core.metrics.os.getpid", return_value=pid):
+                worker.flush(self.metrics_dir)
+        merged = merge_files(self.metrics_dir)
+        self.assertEqual(sum(merged["request_queries", labels][:-1]), 2)
+        text = render_prometheus(merged)
+        self.assertIn(
+            "# TYPE eco_track_request_duration_seconds histogram", text
+        )
+        self.assertIn(
+            'eco_track_request_duration_seconds_bucket{method="GET",'
+            'route="index",status="2xx",le="0.025"} 0',
+            text,
+        )
+        self.assertIn(
+            'eco_track_request_duration_seconds_bucket{method="GET",'
+            'route="index",status="2xx",le="0.05"} 2',
+            text,
+        )
+        self.assertIn('eco_track_request_queries_sum{route="index"} 6', text)
+        self.assertIn(
+            'eco_track_cache_requests_total{cache="schema",result="hit",'
+            'route="index"} 4',
+            text,
+        )
+
+    def test_metrics_view(self):
+        """
+        Test that the metrics are served to admins only.
+        """
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.client.force_login(self.user)
+        with translation.override("en"):
+            self.client.get(reverse("schema"))
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertContains(response, 'route="schema"')
+        self.assertTrue(any(self.metrics_dir.glob("*.json")))
+
+    def test_profile_slow_requests(self):
+        """
+        Test that the stacks of slow requests are written as folded stacks.
+        """
+
+        def view(request):
+            profiler.sample()
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(view)
+        request = RequestFactory().get("/")
+        with self.settings(PROFILE_SLOW_REQUESTS_MS=1000):
+            middleware(request)
+        self.assertFalse(self.profile_dir.exists())
+        with self.settings(PROFILE_SLOW_REQUESTS_MS=1e-6):
+            middleware(request)
+        [path] = self.profile_dir.glob("*-unmatched-*.folded")
+        self.assertIn(";view (tests.py:", path.read_text())
+        with self.settings(METRICS_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                MetricsMiddleware(view)
+
+    def test_profiler_stops_its_own_samples(self):
+        """
+        Test that stopping a request removes its samples, not equal ones of
+        another request of the thread.
+        """
+        # pylint: disable=protected-access
+        first = profiler.start()
+        second = profiler.start()
+        profiler.stop(second)
+        [active] = profiler._active[threading.get_ident()]
+        self.assertIs(active, first)
+        profiler.stop(first)
+        self.assertNotIn(threading.get_ident(), profiler._active)
+
+
+class BenchmarkSuiteTests(TestCase):
+    """
+    Test suite for the benchmark suite and its baseline.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a temporary baseline file.
+        """
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.baseline = directory / "baseline.json"
+
+    def test_summarize(self):
+        """
+        Test that the throughput, percentiles and queries are summarized.
+        """
+        result = summarize(2.0, [0.01] * 99 + [1.0], 300)
+        self.assertEqual(result["requests"], 100)
+        self.assertEqual(result["requests_per_second"], 50)
+        self.assertEqual(result["p50_ms"], 10)
+        self.assertGreater(result["p99_ms"], 10)
+        self.assertEqual(result["queries_per_request"], 3)
+
+    def test_compare(self):
+        """
+        Test that slowdowns beyond the threshold and any additional query
+        are regressions.
+        """
+        baseline = {
+            "wsgi schema": summarize(1.0, [0.01, 0.01, 0.01, 0.01], 8),
+        }
+        save_baseline(self.baseline, baseline)
+        baseline = load_baseline(self.baseline)
+        self.assertIsNone(load_baseline(self.baseline.with_name("missing")))
+        same = {"wsgi schema": dict(baseline["wsgi schema"])}
+        self.assertEqual(compare(baseline, same, 0.2), [])
+        slower = {
+            "wsgi schema": summarize(1.1, [0.011, 0.011, 0.011, 0.011], 8),
+            "wsgi new": summarize(1.0, [1.0, 1.0], 100),
+        }
+        self.assertEqual(compare(baseline, slower, 0.2), [])
+        slower = {"wsgi schema": summarize(2.0, [0.02] * 4, 12)}
+        regressions = compare(baseline, slower, 0.2)
+        self.assertEqual(len(regressions), 4)
+        self.assertIn("wsgi schema: queries_per_request 3 > 2", regressions)
+
+    def test_run_suite(self):
+        """
+        Test that the scenarios run through both interfaces and fail against
+        a faster baseline.
+        """
+        options = {
+            "requests": 3,
+            "users": [5],
+            "scenario": ["i18n redirect", "changelist (5"],
+            "baseline": self.baseline,
+            "stdout": StringIO(),
+        }
+        call_command("benchmark_suite", save_baseline=True, **options)
+        baseline = load_baseline(self.baseline)
+        self.assertEqual(
+            sorted(baseline),
+            [
+                "asgi admin changelist (5 users)",
+                "asgi i18n redirect",
+                "asgi i18n redirect (accept-language)",
+                "wsgi admin changelist (5 users)",
+                "wsgi i18n redirect",
+                "wsgi i18n redirect (accept-language)",
+            ],
+        )
+        self.assertEqual(baseline["wsgi i18n redirect"]["requests"], 3)
+        self.assertFalse(
+            CustomUser.objects.filter(email__endswith=".invalid").exists()
+        )
+        for result in baseline.values():
+            result["queries_per_request"] = -1
+        save_baseline(self.baseline, baseline)
+        with self.assertRaisesMessage(CommandError, "queries_per_request"):
+            call_command("benchmark_suite", **options)
+
+
+class StartupTests(SimpleTestCase):
+    """
+    Test suite for the startup profiles and the startup report.
+    """
+
+    def test_startup_config(self):
+        """
+        Test that the lazy profile defers the admin modules and the schema.
+        """
+        self.assertEqual(
+            startup_config("eager"), ("django.contrib.admin", True)
+        )
+        self.assertEqual(
+            startup_config("lazy"), ("core.apps.LazyAdminConfig", False)
+        )
+        with self.assertRaises(ValueError):
+            startup_config("instant")
+
+    def test_check_admin(self):
+        """
+        Test that the admin checks discover the admin modules first.
+        """
+        self.assertEqual(check_admin(None), [])
+        self.assertTrue(site.is_registered(CustomUser))
+
+    def test_lazy_view(self):
+        """
+        Test that a lazy view is built once, on its first request.
+        """
+        built = []
+
+        @lazy_view
+        def view():
+            built.append(True)
+            return lambda request: HttpResponse(request.path)
+
+        self.assertEqual(built, [])
+        request = RequestFactory().get("/lazy/")
+        self.assertEqual(view(request).content, b"/lazy/")
+        self.assertEqual(view(request).content, b"/lazy/")
+        self.assertEqual(built, [True])
+
+    def test_parse_importtime(self):
+        """
+        Test that the import times are parsed and summed by package.
+        """
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     django.utils\n"
+            "import time:       300 |        420 |   django.conf\n"
+            "import time:        80 |        500 | django\n"
+            "Unauthorized: /en/api/v1/leaderboard/users/\n"
+        )
+        modules = parse_importtime(output)
+        self.assertEqual(modules["django.conf"], (300, 420))
+        self.assertEqual(group_by_package(modules), {"django": 500})
+
+    def test_startup_report(self):
+        """
+        Test that every profile and a forked worker are measured.
+        """
+        stdout = StringIO()
+        call_command("startup_report", runs=1, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines],
+            ["profile", "eager", "lazy", "forked"],
+        )
+
+
+class UUID7Tests(TestCase):
+    """
+    Test suite for the time-ordered UUIDs and their benchmark.
+    """
+
+    def test_uuid7(self):
+        """
+        Test that the UUIDs are version 7, increasing and carry the time.
+        """
+        start = int(time.time() * 1000)
+        ids = [uuid7() for _ in range(5000)]
+        self.assertEqual({uuid.version for uuid in ids}, {7})
+        self.assertEqual({uuid.variant for uuid in ids}, {RFC_4122})
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertLessEqual(start, ids[0].int >> 80)
+        self.assertLessEqual(ids[-1].int >> 80, time.time() * 1000 + 1)
+        joined = uuid7(1_700_000_000.5)
+        self.assertEqual(joined.int >> 80, 1_700_000_000_500)
+        self.assertEqual(joined.version, 7)
+
+    def test_uuid7_field(self):
+        """
+        Test that the field defaults to uuid7 and deconstructs without it.
+        """
+        field = UUID7Field(primary_key=True)
+        self.assertEqual(field.get_default().version, 7)
+        self.assertFalse(field.editable)
+        _name, path, _args, kwargs = field.deconstruct()
+        self.assertEqual(path, "core.fields.UUID7Field")
+        self.assertEqual(kwargs, {"primary_key": True})
+        self.assertEqual(CustomUser._meta.pk.get_default().version, 7)
+
+    def test_benchmark_uuid_keys(self):
+        """
+        Test that both generators are measured.
+        """
+        stdout = StringIO()
+        call_command(
+            "benchmark_uuid_keys",
+            rows=100,
+            batch_size=10,
+            lookups=10,
+            stdout=stdout,
+        )
+        lines = stdout.getvalue().splitlines()[1:]
+        self.assertEqual(
+            {line.split()[0] for line in lines}, {"uuid4", "uuid7"}
+        )
+        self.assertEqual(len(lines) % 2, 0)
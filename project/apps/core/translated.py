@@ -0,0 +1,96 @@
+"""
+Module: translated
+
+Provides querysets loading only the columns of the active language of the
+fields translated with modeltranslation.
+
+modeltranslation stores every translated field in its original column plus
+one column per entry of `LANGUAGES`, and loads all of them with every row,
+although a request only shows one language. `ActiveLanguageQuerySet`
+defers the original column and the columns of the other languages, but
+keeps the fallback languages (`MODELTRANSLATION_DEFAULT_LANGUAGE` unless
+configured otherwise), which the translated fields read when the active
+language is empty:
+
+    EmissionFactor.objects.active_language()
+
+Instances loaded this way are meant to be read. Saving one only writes its
+loaded columns, like any instance with deferred fields.
+"""
+
+from django.db import models
+
+from modeltranslation import settings as mt_settings
+from modeltranslation.translator import NotRegistered, translator
+from modeltranslation.utils import build_localized_fieldname, get_language
+
+
+def get_loaded_languages(opts, language):
+    """
+    Return the languages a translated field may read, in order.
+
+    Args:
+        opts (TranslationOptions): The translation options of the model.
+        language (str): The active language.
+
+    Returns:
+        tuple: The language and its fallback languages.
+    """
+    # as resolved by modeltranslation.utils.resolution_order
+    override = getattr(opts, "fallback_languages", None) or {}
+    fallbacks = mt_settings.FALLBACK_LANGUAGES
+    languages = [
+        language,
+        *override.get(language, fallbacks.get(language, ())),
+        *override.get("default", fallbacks["default"]),
+    ]
+    return tuple(dict.fromkeys(languages))
+
+
+def get_deferred_columns(model, language=None):
+    """
+    Return the translation fields a request in a language does not read.
+
+    Args:
+        model (Model): The model.
+        language (str, optional): The language, defaults to the active
+            language or `MODELTRANSLATION_DEFAULT_LANGUAGE` if it is not
+            supported.
+
+    Returns:
+        list: The names of the original fields and of the translation fields
+        of the other languages, empty if the model is not translated.
+    """
+    try:
+        opts = translator.get_options_for_model(model)
+    except NotRegistered:
+        return []
+    loaded = get_loaded_languages(opts, language or get_language())
+    deferred = []
+    for name in opts.get_field_names():
+        deferred.append(name)
+        deferred += [
+            build_localized_fieldname(name, code)
+            for code in mt_settings.AVAILABLE_LANGUAGES
+            if code not in loaded
+        ]
+    return deferred
+
+
+class ActiveLanguageQuerySet(models.QuerySet):
+    """A queryset of a model with fields translated by modeltranslation."""
+
+    def active_language(self, language=None):
+        """
+        Defer the columns of the translated fields that a language does not
+        read, see `get_deferred_columns`.
+        """
+        clone = self._chain()
+        # QuerySet.defer of modeltranslation would defer every language
+        clone.query.add_deferred_loading(
+            get_deferred_columns(self.model, language)
+        )
+        return clone
+
+
+ActiveLanguageManager = models.Manager.from_queryset(ActiveLanguageQuerySet)
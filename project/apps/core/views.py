@@ -0,0 +1,133 @@
+"""
+Module: views
+
+Provides base classes for API views with async handlers.
+
+Django REST framework dispatches synchronously, so under ASGI every API
+request is handed to a worker thread. `AsyncAPIView` dispatches in the
+event loop instead: handlers are coroutines using the async ORM interfaces
+and authenticators with an `aauthenticate` method authenticate without
+leaving the event loop. Other authenticators run in a worker thread.
+Permissions and throttles are checked in the event loop and must not query
+the database.
+
+With a `response_cache` (see `core.http_cache`), GET responses are served
+from the cache once the request is authenticated and permitted.
+
+`metrics_view` serves the request metrics (see `core.metrics`).
+"""
+
+from inspect import isawaitable
+
+from django.http import HttpResponse
+
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions
+from rest_framework.generics import GenericAPIView
+from rest_framework.views import APIView
+
+from .metrics import collect
+
+# content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class AsyncAPIView(APIView):
+    """
+    An API view whose handlers are coroutines.
+
+    Usage:
+        class ExampleView(AsyncAPIView):
+            async def get(self, request):
+                ...
+    """
+
+    # a core.http_cache.ResponseCache for the GET responses of the view
+    response_cache = None
+
+    async def aperform_authentication(self, request):
+        """
+        Authenticate the request like `Request.user` would, awaiting the
+        authenticators that support it.
+        """
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, "aauthenticate", None)
+            if authenticate is None:
+                authenticate = sync_to_async(authenticator.authenticate)
+            try:
+                user_auth = await authenticate(request)
+            except exceptions.APIException:
+                # pylint: disable=protected-access
+                request._not_authenticated()
+                raise
+            if user_auth is not None:
+                # pylint: disable=protected-access
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+        # pylint: disable=protected-access
+        request._not_authenticated()
+
+    async def ainitial(self, request, *args, **kwargs):
+        """Run `initial` with the request already authenticated."""
+        await self.aperform_authentication(request)
+        self.initial(request, *args, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Dispatch like `APIView.dispatch`, awaiting the handler."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        lookup = None
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            lookup = await self.alookup_response(request)
+            if lookup is not None and lookup.response is not None:
+                response = lookup.response
+            else:
+                response = await self.ahandle(request, *args, **kwargs)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        if lookup is not None and lookup.response is None:
+            self.response = await self.response_cache.astore(
+                lookup, request, self.response
+            )
+        return self.response
+
+    async def ahandle(self, request, *args, **kwargs):
+        """Call the handler of the request method."""
+        method = request.method.lower()
+        if method in self.http_method_names:
+            handler = getattr(self, method, self.http_method_not_allowed)
+        else:
+            handler = self.http_method_not_allowed
+        response = handler(request, *args, **kwargs)
+        # OPTIONS and rejected methods are handled synchronously
+        if isawaitable(response):
+            response = await response
+        return response
+
+    async def alookup_response(self, request):
+        """Look up the request in the response cache, if the view has one."""
+        if self.response_cache is None or not (
+            self.response_cache.is_cacheable(request)
+        ):
+            return None
+        return await self.response_cache.alookup(request, request.user)
+
+
+class AsyncGenericAPIView(AsyncAPIView, GenericAPIView):
+    """A generic API view whose handlers are coroutines."""
+
+
+def metrics_view(request):
+    """Serve the request metrics of all workers in Prometheus format."""
+    del request
+    return HttpResponse(collect(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,69 @@
+"""
+Module: admin
+
+Provides admin configuration for the tracking app.
+"""
+
+from django.contrib import admin
+from django.db import router
+
+from modeltranslation.admin import TranslationAdmin
+
+from core.pagination import EstimatedCountPaginator
+
+from .factors import compute_emissions
+from .models import Activity, EmissionFactor
+from .rollups import update_rollups
+
+
+@admin.register(Activity)
+class ActivityAdmin(admin.ModelAdmin):
+    """Admin configuration for the Activity model."""
+
+    list_display = ("__str__", "user", "occurred_at", "received_at")
+    list_filter = ("category",)
+    list_select_related = ("user",)
+    search_fields = ("=key",)
+    raw_id_fields = ("user",)
+    readonly_fields = ("co2e", "received_at")
+    # activities are the largest table, so their count is estimated
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        """
+        Save the activity with the footprint of its emission factor and
+        update the footprint rollups.
+        """
+        previous = []
+        if change:
+            # the previous state is read from the primary, not a replica
+            using = router.db_for_write(Activity)
+            previous = [Activity.objects.using(using).get(pk=obj.pk)]
+        compute_emissions([obj])
+        super().save_model(request, obj, form, change)
+        update_rollups(added=[obj], removed=previous)
+
+    def delete_model(self, request, obj):
+        """Delete the activity and update the footprint rollups."""
+        super().delete_model(request, obj)
+        update_rollups(removed=[obj])
+
+    def delete_queryset(self, request, queryset):
+        """Delete the activities and update the footprint rollups."""
+        activities = list(queryset.only("user", "occurred_at", "co2e"))
+        super().delete_queryset(request, queryset)
+        update_rollups(removed=activities)
+
+
+@admin.register(EmissionFactor)
+class EmissionFactorAdmin(TranslationAdmin):
+    """
+    Admin configuration for the EmissionFactor model. Saved changes are
+    picked up by the running workers, see tracking.factors.
+    """
+
+    list_display = ("name", "category", "region", "unit", "co2e_per_unit")
+    list_filter = ("category", "region")
+    search_fields = ("name", "description")
+    readonly_fields = ("updated_at",)
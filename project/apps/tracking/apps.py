@@ -0,0 +1,20 @@
+"""
+Module: tracking apps
+
+This module defines the configuration class for the tracking app.
+"""
+
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class TrackingConfig(AppConfig):
+    """Configuration class for the tracking app."""
+
+    name = "tracking"
+    verbose_name = _("Tracking")
+
+    def ready(self):
+        """Connect the signal receivers of the app."""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa: F401
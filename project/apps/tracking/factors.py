@@ -0,0 +1,306 @@
+"""
+Module: factors
+
+Provides the emission factor catalogue that computes the footprint of
+activities.
+
+The factors are written to a compact binary file, an array of doubles
+followed by the keys of the factors, which every worker memory maps. The
+operating system keeps a single copy of the file for all workers of a host,
+instead of every worker loading the factors through the ORM. The file is
+rewritten when a factor is changed and the workers map the new file on their
+next lookup. The file records the database it was written from and the
+version of its factors, both are checked whenever a worker maps a file.
+With NumPy installed, the footprint of a batch of activities is computed in
+a single vectorised operation.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, router
+from django.db.models import Count, Max
+from django.dispatch import receiver
+
+from .models import EmissionFactor
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+MAGIC = b"ECOF"
+# magic, number of factors and size of the encoded keys in bytes
+HEADER = struct.Struct("<4sQQ")
+# separators of the fields of a key and of the keys
+FIELD_SEPARATOR = "\t"
+KEY_SEPARATOR = "\n"
+
+
+def get_key(category, region, unit):
+    """
+    Build the key of an emission factor.
+
+    Args:
+        category (str): The activity category.
+        region (str): The region code, empty for every region.
+        unit (str): The unit of the activity quantity.
+
+    Returns:
+        str: The key.
+    """
+    return FIELD_SEPARATOR.join((category, region.upper(), unit))
+
+
+def get_database_identity(using=None):
+    """
+    Identify the database the emission factors are read from.
+
+    Args:
+        using (str, optional): The database alias.
+
+    Returns:
+        str: The vendor, host, port and name of the database.
+    """
+    using = using or router.db_for_write(EmissionFactor)
+    connection = connections[using]
+    config = connection.settings_dict
+    return (
+        f"{connection.vendor}://{config['HOST']}:{config['PORT']}/"
+        f"{config['NAME']}"
+    )
+
+
+def get_database_version(using=None):
+    """
+    Get the version of the emission factors in the database.
+
+    Args:
+        using (str, optional): The database alias.
+
+    Returns:
+        str: A version that changes whenever a factor is changed.
+    """
+    using = using or router.db_for_write(EmissionFactor)
+    state = EmissionFactor.objects.using(using).aggregate(
+        count=Count("pk"), updated=Max("updated_at")
+    )
+    updated = state["updated"].isoformat() if state["updated"] else ""
+    return f"{state['count']}:{updated}"
+
+
+def write_catalogue(path, using=None):
+    """
+    Write the emission factors to a catalogue file.
+
+    The file is replaced atomically, workers that mapped the previous file
+    keep reading it until they reload.
+
+    Args:
+        path (Path): The catalogue file.
+        using (str, optional): The database alias.
+    """
+    using = using or router.db_for_write(EmissionFactor)
+    version = get_database_version(using)
+    factors = EmissionFactor.objects.using(using).values_list(
+        "category", "region", "unit", "co2e_per_unit"
+    )
+    keys = [get_database_identity(using), version]
+    values = array("d")
+    for category, region, unit, co2e_per_unit in factors.order_by():
+        keys.append(get_key(category, region, unit))
+        values.append(co2e_per_unit)
+    encoded = KEY_SEPARATOR.join(keys).encode()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=path.name, delete=False
+    ) as file:
+        file.write(HEADER.pack(MAGIC, len(values), len(encoded)))
+        file.write(values.tobytes())
+        file.write(encoded)
+    os.replace(file.name, path)
+
+
+class EmissionFactorCatalogue:
+    """
+    The emission factors of a memory mapped catalogue file.
+
+    Only the index from keys to positions is held by the worker, the factors
+    are read from the shared mapping.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, size = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an emission factor catalogue.")
+        offset = HEADER.size + count * 8
+        self.factors = memoryview(self.buffer)[HEADER.size : offset].cast("d")
+        self.database, self.version, *keys = (
+            self.buffer[offset : offset + size].decode().split(KEY_SEPARATOR)
+        )
+        self.index = {key: position for position, key in enumerate(keys)}
+        if numpy is not None:
+            self.array = numpy.frombuffer(
+                self.buffer,
+                dtype=numpy.float64,
+                count=count,
+                offset=HEADER.size,
+            )
+
+    def __len__(self):
+        return len(self.factors)
+
+    def is_valid(self):
+        """Check whether the catalogue was written from the database now."""
+        return (self.database, self.version) == (
+            get_database_identity(),
+            get_database_version(),
+        )
+
+    def is_current(self, path):
+        """Check whether the catalogue file was not replaced."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (
+            self.stat.st_ino,
+            self.stat.st_mtime_ns,
+        )
+
+    def get_position(self, category, region, unit):
+        """
+        Find the factor of an activity.
+
+        Args:
+            category (str): The activity category.
+            region (str): The region of the activity, the factor of every
+                region applies if it has none.
+            unit (str): The unit of the activity quantity.
+
+        Returns:
+            int: The position of the factor, -1 if there is none.
+        """
+        position = self.index.get(get_key(category, region, unit))
+        if position is None and region:
+            position = self.index.get(get_key(category, "", unit))
+        return -1 if position is None else position
+
+    def get_factor(self, category, region, unit):
+        """
+        Get the CO2e per unit of an activity.
+
+        Returns:
+            float: The kg CO2e per unit, or None without a factor.
+        """
+        position = self.get_position(category, region, unit)
+        return None if position < 0 else self.factors[position]
+
+    def compute(self, activities):
+        """
+        Compute the footprint of a batch of activities.
+
+        Args:
+            activities (list): The activities, as objects with a category,
+                region, unit and quantity.
+
+        Returns:
+            list: The kg CO2e of every activity, 0 without a factor.
+        """
+        if not self.factors:
+            return [0.0] * len(activities)
+        positions = [
+            self.get_position(
+                activity.category, activity.region, activity.unit
+            )
+            for activity in activities
+        ]
+        quantities = [activity.quantity for activity in activities]
+        if numpy is not None:
+            positions = numpy.array(positions, dtype=numpy.intp)
+            co2e = self.array.take(positions, mode="clip") * quantities
+            return numpy.where(positions < 0, 0.0, co2e).tolist()
+        factors = self.factors
+        return [
+            factors[position] * quantity if position >= 0 else 0.0
+            for position, quantity in zip(positions, quantities)
+        ]
+
+
+_lock = threading.Lock()
+_catalogue = None
+
+
+def get_catalogue_path():
+    """Return the path of the catalogue file."""
+    return Path(settings.EMISSION_FACTOR_CATALOGUE)
+
+
+def get_catalogue():
+    """
+    Get the emission factor catalogue of the worker.
+
+    The catalogue file is mapped again after it was replaced. Every file a
+    worker maps is checked against the database and rewritten if it is
+    missing, stale or was written from another database, e.g. of another
+    project sharing the path.
+
+    Returns:
+        EmissionFactorCatalogue: The catalogue.
+    """
+    global _catalogue  # pylint: disable=global-statement
+    path = get_catalogue_path()
+    catalogue = _catalogue
+    if catalogue is not None and catalogue.is_current(path):
+        return catalogue
+    with _lock:
+        if _catalogue is not None and _catalogue.is_current(path):
+            return _catalogue
+        try:
+            catalogue = EmissionFactorCatalogue(path)
+        except (OSError, ValueError):
+            catalogue = None
+        if catalogue is None or not catalogue.is_valid():
+            write_catalogue(path)
+            catalogue = EmissionFactorCatalogue(path)
+        _catalogue = catalogue
+        return _catalogue
+
+
+def reload_catalogue():
+    """Rewrite the catalogue file, so that every worker maps the change."""
+    global _catalogue  # pylint: disable=global-statement
+    with _lock:
+        write_catalogue(get_catalogue_path())
+        _catalogue = None
+
+
+def compute_emissions(activities):
+    """
+    Set the footprint of a batch of activities from their emission factors.
+
+    Args:
+        activities (list): The activities.
+    """
+    activities = list(activities)
+    for activity, co2e in zip(activities, get_catalogue().compute(activities)):
+        activity.co2e = co2e
+
+
+@receiver(setting_changed)
+def reset_catalogue(setting, **kwargs):
+    """Forget the catalogue when its path changes."""
+    global _catalogue  # pylint: disable=global-statement
+    del kwargs
+    if setting == "EMISSION_FACTOR_CATALOGUE":
+        _catalogue = None
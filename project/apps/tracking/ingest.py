@@ -0,0 +1,251 @@
+"""
+Module: ingest
+
+Provides the bulk ingestion of activity events. Events are read lazily from
+the request body, validated and inserted in batches of
+`TRACKING_INGEST_BATCH_SIZE`, so the memory used by an ingestion does not
+grow with the number of events.
+"""
+
+import codecs
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from rest_framework.exceptions import ValidationError
+
+from .factors import compute_emissions
+from .models import Activity
+from .rollups import update_rollups
+from .serializers import ActivityEventSerializer
+
+# bytes read from the request body at once
+READ_CHUNK_SIZE = 64 * 1024
+# characters a single event may have
+MAX_EVENT_SIZE = 64 * 1024
+# fields an event with a recorded key may correct
+CORRECTABLE_FIELDS = ("category", "quantity", "unit", "region", "occurred_at")
+# number of rejected events whose errors are reported back
+MAX_REPORTED_ERRORS = 100
+
+_decoder = json.JSONDecoder()
+
+
+def read_ndjson(stream):
+    """
+    Lazily read newline delimited JSON.
+
+    Args:
+        stream (file): The binary stream, e.g. the request.
+
+    Yields:
+        object: The decoded value of every non-empty line.
+
+    Raises:
+        ValueError: If a line is not valid JSON.
+    """
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_array(stream, chunk_size=READ_CHUNK_SIZE):
+    """
+    Lazily read the objects of a JSON array, without holding the whole
+    document in memory.
+
+    Args:
+        stream (file): The binary stream, e.g. the request.
+        chunk_size (int): The bytes read at once.
+
+    Yields:
+        dict: The objects of the array.
+
+    Raises:
+        ValueError: If the document is not a JSON array of objects or an
+            object is larger than `MAX_EVENT_SIZE`.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    # what may come next: "[", an "event" or "]", an "event" after a comma,
+    # a "separator" after an event, or the "end" of the document
+    state = "["
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = buffer[position:] + decoder.decode(chunk, final=not chunk)
+        position = 0
+        while position < len(buffer):
+            char = buffer[position]
+            if char.isspace():
+                position += 1
+            elif state == "[":
+                if char != "[":
+                    raise ValueError("Expected a JSON array of events.")
+                position += 1
+                state = "event or ]"
+            elif char == "]" and state in ("event or ]", "separator"):
+                position += 1
+                state = "end"
+            elif char == "," and state == "separator":
+                position += 1
+                state = "event"
+            elif char == "{" and state in ("event or ]", "event"):
+                try:
+                    value, position = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk or len(buffer) - position > MAX_EVENT_SIZE:
+                        raise
+                    # the object continues in the next chunk
+                    break
+                state = "separator"
+                yield value
+            else:
+                raise ValueError(
+                    f"Invalid JSON array of events at {char!r}, expected "
+                    f"{state}."
+                )
+        if not chunk:
+            break
+    if state != "end":
+        raise ValueError("The JSON array of events is incomplete.")
+
+
+@dataclass
+class IngestResult:
+    """The outcome of an ingestion."""
+
+    received: int = 0
+    created: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, index, errors):
+        """Count a rejected event and report its errors."""
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "errors": errors})
+
+
+def ingest_events(user, events, batch_size=None):
+    """
+    Validate activity events and insert them in batches.
+
+    Invalid events are rejected without stopping the ingestion. Events whose
+    key was already ingested for the user are counted as duplicates and
+    skipped, so that a client can resend a batch after a failure, unless
+    they differ from the recorded activity, which they then correct. The
+    footprint of the activities is computed from the emission factors and
+    the rollups are updated with every batch.
+
+    Args:
+        user (CustomUser): The user the activities belong to.
+        events (iterable): The raw events, consumed lazily.
+        batch_size (int, optional): The events validated and inserted at
+            once. Defaults to `settings.TRACKING_INGEST_BATCH_SIZE`.
+
+    Returns:
+        IngestResult: The counts and the errors of the rejected events.
+
+    Raises:
+        ValueError: If reading the events fails. The batches before the
+            failure have been inserted.
+    """
+    batch_size = batch_size or settings.TRACKING_INGEST_BATCH_SIZE
+    # a single serializer validates every event, binding its fields once
+    serializer = ActivityEventSerializer()
+    result = IngestResult()
+    events = iter(events)
+    while batch := list(islice(events, batch_size)):
+        activities = {}
+        for index, event in enumerate(batch, result.received):
+            try:
+                data = serializer.run_validation(event)
+            except ValidationError as exc:
+                result.reject(index, exc.detail)
+                continue
+            if data["key"] in activities:
+                # the later event of a key corrects the earlier one
+                result.duplicates += 1
+            activities[data["key"]] = Activity(user=user, **data)
+        result.received += len(batch)
+        insert_activities(user, activities, result)
+    return result
+
+
+def has_changed(recorded, activity):
+    """
+    Check whether an event corrects a recorded activity.
+
+    Args:
+        recorded (Activity): The recorded activity.
+        activity (Activity): The activity of the event with the same key.
+
+    Returns:
+        bool: Whether any of the `CORRECTABLE_FIELDS` differ.
+    """
+    return any(
+        getattr(recorded, name) != getattr(activity, name)
+        for name in CORRECTABLE_FIELDS
+    )
+
+
+def insert_activities(user, activities, result):
+    """
+    Insert the activities of a batch whose keys are new, correct the
+    recorded ones that changed and update the rollups.
+
+    Args:
+        user (CustomUser): The user the activities belong to.
+        activities (dict): The activities by their key.
+        result (IngestResult): The result that counts the insertions.
+    """
+    if not activities:
+        return
+    using = router.db_for_write(Activity)
+    with transaction.atomic(using=using):
+        # serialise the ingestions of a user, so that a concurrent retry
+        # cannot insert the same keys or count them twice in the rollups
+        list(
+            get_user_model()
+            .objects.using(using)
+            .select_for_update()
+            .filter(pk=user.pk)
+            .values_list("pk")
+        )
+        recorded = Activity.objects.using(using).filter(
+            user=user, key__in=list(activities)
+        )
+        recorded = {
+            activity.key: activity
+            for activity in recorded.only(
+                "user", "key", "co2e", *CORRECTABLE_FIELDS
+            )
+        }
+        compute_emissions(activities.values())
+        new = []
+        corrected = []
+        for key, activity in activities.items():
+            if key not in recorded:
+                new.append(activity)
+            elif has_changed(recorded[key], activity):
+                activity.pk = recorded[key].pk
+                corrected.append(activity)
+        Activity.objects.using(using).bulk_create(new)
+        Activity.objects.using(using).bulk_update(
+            corrected, [*CORRECTABLE_FIELDS, "co2e"]
+        )
+        update_rollups(
+            added=[*new, *corrected],
+            removed=[recorded[activity.key] for activity in corrected],
+            using=using,
+        )
+    result.created += len(new)
+    result.updated += len(corrected)
+    result.duplicates += len(recorded) - len(corrected)
@@ -0,0 +1,126 @@
+"""
+Module: benchmark_ingestion
+
+Provides a management command that measures the throughput of the activity
+ingestion endpoint for JSON arrays and NDJSON, compared to saving one
+activity per request.
+"""
+
+import json
+import tracemalloc
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tracking.serializers import ActivityEventSerializer
+from tracking.views import ActivityIngestView
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """Benchmark the activity ingestion."""
+
+    help = (
+        "Report events/second of the activity ingestion endpoint. All "
+        "activities are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=20000,
+            help="The number of events per request.",
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Also report the peak memory, which slows the runs down.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        count = options["count"]
+        events = [
+            {
+                "key": f"bench-{i}",
+                "category": "transport",
+                "quantity": i % 50,
+                "unit": "km",
+                "occurred_at": "2024-11-28T17:40:00Z",
+            }
+            for i in range(count)
+        ]
+        bodies = {
+            "application/json": json.dumps(events).encode(),
+            "application/x-ndjson": "\n".join(
+                map(json.dumps, events)
+            ).encode(),
+        }
+        self.factory = APIRequestFactory()
+        self.view = ActivityIngestView.as_view()
+        self.url = reverse("activity_ingest")
+        # with DEBUG every query is logged, which grows the memory
+        with override_settings(DEBUG=False), transaction.atomic():
+            self.user = CustomUser.objects.create_user(
+                email="bench@example.com", password=None
+            )
+            single = self._measure(lambda: self._save_each(events[:1000]))
+            self.stdout.write(
+                f"one per request: {1000 / single:10.1f} events/s"
+            )
+            for content_type, body in bodies.items():
+                elapsed = self._measure(
+                    lambda: self._ingest(body, content_type)
+                )
+                self.stdout.write(
+                    f"{content_type:<22} {count / elapsed:10.1f} events/s"
+                )
+                if options["memory"]:
+                    tracemalloc.start()
+                    self._measure(lambda: self._ingest(body, content_type))
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self.stdout.write(
+                        f"{'':<22} {peak / 2**20:10.1f} MiB peak, "
+                        f"{len(body) / 2**20:.1f} MiB body"
+                    )
+            transaction.set_rollback(True)
+
+    def _ingest(self, body, content_type):
+        """Send a batch of events to the endpoint."""
+        request = self.factory.post(self.url, body, content_type=content_type)
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        assert response.data["created"], response.data
+
+    def _save_each(self, events):
+        """Save the events one at a time, as a single event endpoint would."""
+        for event in events:
+            serializer = ActivityEventSerializer(data=event)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=self.user)
+
+    @staticmethod
+    def _measure(func):
+        """
+        Time a function inside a rolled back savepoint.
+
+        Args:
+            func (callable): The function to time.
+
+        Returns:
+            float: The elapsed time in seconds.
+        """
+        with transaction.atomic():
+            start = perf_counter()
+            func()
+            elapsed = perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
@@ -0,0 +1,95 @@
+"""
+Module: benchmark_rankings
+
+Provides a management command that compares the rank lookups of the ranking
+index with counting the entries with a higher score.
+"""
+
+import random
+from time import perf_counter
+from uuid import UUID
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from tracking.models import RankingEntry
+from tracking.ranking import RankingIndex
+
+
+class Command(BaseCommand):
+    """Benchmark the leaderboards."""
+
+    help = (
+        "Rebuild a leaderboard of synthetic users and report the time of "
+        "rank, top-k and update operations. Everything is created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1_000_000,
+            help="The number of ranked users.",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=200,
+            help="The number of rank lookups and updates measured.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        count = options["users"]
+        rng = random.Random(0)
+        # savings spread over a few orders of magnitude, as in practice
+        scores = {
+            str(UUID(int=rng.getrandbits(128), version=4)): round(
+                rng.lognormvariate(3, 1.5), 2
+            )
+            for _ in range(count)
+        }
+        sample = rng.sample(list(scores), options["lookups"])
+        index = RankingIndex(RankingEntry.Board.USERS)
+        # with DEBUG every query is logged, which grows the memory
+        with override_settings(DEBUG=False), transaction.atomic():
+            elapsed = self._time(lambda: index.rebuild(scores.items()))
+            self._report("rebuild", count / elapsed, "entries/s")
+            elapsed = self._time(lambda: [index.get_rank(e) for e in sample])
+            self._report("rank (index)", elapsed / len(sample) * 1000, "ms")
+            elapsed = self._time(
+                lambda: [self._count_rank(index, e) for e in sample]
+            )
+            self._report("rank (count)", elapsed / len(sample) * 1000, "ms")
+            elapsed = self._time(lambda: index.get_top(10))
+            self._report("top 10", elapsed * 1000, "ms")
+            elapsed = self._time(lambda: index.get_top(10, offset=count // 2))
+            self._report("median (OFFSET)", elapsed * 1000, "ms")
+            elapsed = self._time(
+                lambda: [
+                    index.update({entry: rng.uniform(-5, 50)})
+                    for entry in sample
+                ]
+            )
+            self._report("update", len(sample) / elapsed, "updates/s")
+            transaction.set_rollback(True)
+
+    def _report(self, label, value, unit):
+        """Write a measurement."""
+        self.stdout.write(f"{label:<18} {value:12.2f} {unit}")
+
+    @staticmethod
+    def _time(func):
+        """Return the seconds a function takes."""
+        start = perf_counter()
+        func()
+        return perf_counter() - start
+
+    @staticmethod
+    def _count_rank(index, entry):
+        """Rank an entry by counting the entries with a higher score."""
+        score = index.get_score(entry)
+        return index.entries.filter(score__gt=score).count() + 1
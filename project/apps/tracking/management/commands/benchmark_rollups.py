@@ -0,0 +1,164 @@
+"""
+Module: benchmark_rollups
+
+Provides a management command that compares reading the monthly footprint
+of a user from the rollups with aggregating the activities, and measures
+rebuilding and incrementally updating the rollups.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.test import override_settings
+
+from tracking.ingest import ingest_events
+from tracking.models import Activity, FootprintRollup
+from tracking.rollups import rebuild_rollups
+from users.models import CustomUser
+
+# number of activities inserted at once
+INSERT_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Benchmark the footprint rollups."""
+
+    help = (
+        "Insert synthetic activities, rebuild their rollups and report the "
+        "time of a dashboard read from the rollups and from the activities. "
+        "Everything is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=10_000_000,
+            help="The number of synthetic activities.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="The number of users the activities are spread over.",
+        )
+        parser.add_argument(
+            "--reads",
+            type=int,
+            default=50,
+            help="The number of dashboard reads measured.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        count = options["events"]
+        # with DEBUG every query is logged, which grows the memory
+        with override_settings(DEBUG=False), transaction.atomic():
+            CustomUser.objects.bulk_create_users(
+                (
+                    {"email": f"rollup{i}@example.com", "password": None}
+                    for i in range(options["users"])
+                ),
+                workers=1,
+            )
+            users = list(
+                CustomUser.objects.filter(
+                    email__startswith="rollup"
+                ).values_list("pk", flat=True)
+            )
+            elapsed = self._time(lambda: self._insert(users, count))
+            self._report("insert activities", count / elapsed, "events/s")
+            elapsed = self._time(lambda: rebuild_rollups(users))
+            self._report("rebuild rollups", count / elapsed, "events/s")
+
+            sample = random.sample(users, min(options["reads"], len(users)))
+            raw = self._time(lambda: [self._aggregate(pk) for pk in sample])
+            rollups = self._time(lambda: [self._read(pk) for pk in sample])
+            self._report(
+                "read from activities", raw / len(sample) * 1000, "ms"
+            )
+            self._report(
+                "read from rollups", rollups / len(sample) * 1000, "ms"
+            )
+
+            user = CustomUser.objects.get(pk=sample[0])
+            events = [
+                {
+                    "key": f"late-{i}",
+                    "category": "food",
+                    "quantity": 1,
+                    "unit": "kg",
+                    "occurred_at": (
+                        datetime(2024, 1, 1, tzinfo=timezone.utc)
+                        + timedelta(hours=i)
+                    ).isoformat(),
+                }
+                for i in range(10000)
+            ]
+            elapsed = self._time(lambda: ingest_events(user, events))
+            self._report(
+                "ingest with rollups", len(events) / elapsed, "events/s"
+            )
+            transaction.set_rollback(True)
+
+    def _report(self, label, value, unit):
+        """Write a measurement."""
+        self.stdout.write(f"{label:<22} {value:12.2f} {unit}")
+
+    @staticmethod
+    def _time(func):
+        """Return the seconds a function takes."""
+        start = perf_counter()
+        func()
+        return perf_counter() - start
+
+    @staticmethod
+    def _insert(users, count):
+        """Insert synthetic activities over a year without rollups."""
+        rng = random.Random(0)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        activities = (
+            Activity(
+                user_id=rng.choice(users),
+                key=f"bench-{i}",
+                category=Activity.Category.TRANSPORT,
+                quantity=1,
+                unit="km",
+                occurred_at=start + timedelta(minutes=rng.randrange(525600)),
+                co2e=rng.random(),
+            )
+            for i in range(count)
+        )
+        while batch := list(islice(activities, INSERT_BATCH_SIZE)):
+            Activity.objects.bulk_create(batch)
+
+    @staticmethod
+    def _aggregate(user_id):
+        """Aggregate the monthly footprint of a user from the activities."""
+        return list(
+            Activity.objects.filter(user_id=user_id)
+            .annotate(
+                start=Trunc("occurred_at", "month", output_field=DateField())
+            )
+            .values("start")
+            .annotate(co2e=Sum("co2e"))
+            .order_by("start")
+        )
+
+    @staticmethod
+    def _read(user_id):
+        """Read the monthly footprint of a user from the rollups."""
+        return list(
+            FootprintRollup.objects.filter(
+                user_id=user_id, period=FootprintRollup.Period.MONTH
+            )
+            .order_by("start")
+            .values("start", "co2e")
+        )
@@ -0,0 +1,120 @@
+"""
+Module: benchmark_translations
+
+Provides a management command that compares loading a large catalogue of
+emission factors with all translation columns and with the columns of the
+active language only.
+"""
+
+import tracemalloc
+from itertools import cycle
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import translation
+
+from tracking.models import Activity, EmissionFactor
+
+# number of factors inserted at once
+INSERT_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """Benchmark loading translated emission factors."""
+
+    help = (
+        "Insert synthetic emission factors and report the columns, bytes "
+        "and memory per row and the load time of every language, with all "
+        "translation columns and with active_language(). Everything is "
+        "created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--factors",
+            type=int,
+            default=20000,
+            help="The number of synthetic emission factors.",
+        )
+        parser.add_argument(
+            "--text-length",
+            type=int,
+            default=200,
+            help="The characters of every description translation.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        self.stdout.write(
+            f"{'language':10}{'mode':17}{'columns':>9}{'bytes/row':>11}"
+            f"{'memory/row':>12}{'load ms':>10}"
+        )
+        # with DEBUG every query is logged, which grows the memory
+        with override_settings(DEBUG=False), transaction.atomic():
+            self._insert(options["factors"], options["text_length"])
+            for language in ("en", "de"):
+                with translation.override(language):
+                    for mode, queryset in (
+                        ("all columns", EmissionFactor.objects.all()),
+                        (
+                            "active language",
+                            EmissionFactor.objects.active_language(),
+                        ),
+                    ):
+                        self._report(language, mode, queryset)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _insert(count, text_length):
+        """Insert factors with a name and description in every language."""
+        categories = cycle(Activity.Category.values)
+        factors = []
+        for i in range(count):
+            text = {
+                code: (f"{code} {i} " * text_length)[:text_length]
+                for code in ("en", "de")
+            }
+            factors.append(
+                EmissionFactor(
+                    category=next(categories),
+                    unit=f"unit{i}",
+                    co2e_per_unit=0.1,
+                    name=f"Factor {i}",
+                    name_en=f"Factor {i}",
+                    name_de=f"Faktor {i}",
+                    description=text["en"],
+                    description_en=text["en"],
+                    description_de=text["de"],
+                )
+            )
+        EmissionFactor.objects.bulk_create(
+            factors, batch_size=INSERT_BATCH_SIZE
+        )
+
+    def _report(self, language, mode, queryset):
+        """Load the factors and write the width, memory and time per row."""
+        start = perf_counter()
+        list(queryset.all())
+        elapsed = perf_counter() - start
+        # tracing slows the load down, so it is measured separately
+        tracemalloc.start()
+        factors = list(queryset.all())
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        deferred = factors[0].get_deferred_fields()
+        columns = len(EmissionFactor._meta.concrete_fields) - len(deferred)
+        width = sum(
+            len(str(value).encode())
+            for factor in factors
+            for field, value in vars(factor).items()
+            if not field.startswith("_")
+        )
+        self.stdout.write(
+            f"{language:10}{mode:17}{columns:9d}"
+            f"{width / len(factors):11.0f}"
+            f"{peak / len(factors):12.0f}"
+            f"{elapsed * 1000:10.1f}"
+        )
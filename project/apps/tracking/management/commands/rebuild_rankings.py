@@ -0,0 +1,33 @@
+"""
+Module: rebuild_rankings
+
+Provides a management command that recomputes the leaderboards from the
+activities.
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from tracking.ranking import rebuild_rankings
+
+
+class Command(BaseCommand):
+    """Recompute the leaderboards."""
+
+    help = (
+        "Recompute the leaderboards of users and groups from the savings of "
+        "their activities, e.g. after activities were changed in bulk."
+    )
+
+    def handle(self, *args, **options):
+        """Rebuild the leaderboards."""
+        start = perf_counter()
+        counts = rebuild_rankings()
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ranked {counts['users']} users and {counts['groups']} "
+                f"groups in {elapsed:.1f}s."
+            )
+        )
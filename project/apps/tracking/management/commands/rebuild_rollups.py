@@ -0,0 +1,48 @@
+"""
+Module: rebuild_rollups
+
+Provides a management command that recomputes the footprint rollups from
+the activities.
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from tracking.rollups import REBUILD_BATCH_SIZE, rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Recompute the footprint rollups."""
+
+    help = (
+        "Recompute the footprint rollups of all or some users from their "
+        "activities, e.g. after activities were changed in bulk."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "users",
+            nargs="*",
+            help="The ids of the users to rebuild, all users by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help="The number of users rebuilt at once.",
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild the rollups."""
+        start = perf_counter()
+        total = rebuild_rollups(
+            options["users"] or None, batch_size=options["batch_size"]
+        )
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {total} activities in {elapsed:.1f}s."
+            )
+        )
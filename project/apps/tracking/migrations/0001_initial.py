@@ -0,0 +1,95 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Activity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Assigned by the client, unique per user.",
+                        max_length=64,
+                        verbose_name="idempotency key",
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        choices=[
+                            ("transport", "Transport"),
+                            ("food", "Food"),
+                            ("energy", "Energy"),
+                            ("waste", "Waste"),
+                            ("other", "Other"),
+                        ],
+                        max_length=16,
+                        verbose_name="category",
+                    ),
+                ),
+                ("quantity", models.FloatField(verbose_name="quantity")),
+                ("unit", models.CharField(max_length=16, verbose_name="unit")),
+                (
+                    "region",
+                    models.CharField(
+                        blank=True, max_length=8, verbose_name="region"
+                    ),
+                ),
+                (
+                    "occurred_at",
+                    models.DateTimeField(verbose_name="occurred at"),
+                ),
+                (
+                    "received_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="received at"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activities",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "activity",
+                "verbose_name_plural": "activities",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "occurred_at"],
+                        name="activity_user_occurred_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "key"), name="unique_activity_key"
+                    )
+                ],
+            },
+        ),
+    ]
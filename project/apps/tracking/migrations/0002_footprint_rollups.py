@@ -0,0 +1,85 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activity",
+            name="co2e",
+            field=models.FloatField(
+                default=0,
+                help_text="The emissions of the activity in kg CO2 equivalent.",
+                verbose_name="CO2e (kg)",
+            ),
+        ),
+        migrations.CreateModel(
+            name="FootprintRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[
+                            ("day", "Day"),
+                            ("week", "Week"),
+                            ("month", "Month"),
+                        ],
+                        max_length=8,
+                        verbose_name="period",
+                    ),
+                ),
+                (
+                    "start",
+                    models.DateField(
+                        help_text="The first day of the period, weeks start on Monday.",
+                        verbose_name="start",
+                    ),
+                ),
+                (
+                    "co2e",
+                    models.FloatField(default=0, verbose_name="CO2e (kg)"),
+                ),
+                (
+                    "activities",
+                    models.IntegerField(default=0, verbose_name="activities"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="footprint_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "footprint rollup",
+                "verbose_name_plural": "footprint rollups",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "period", "start"),
+                        name="unique_footprint_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
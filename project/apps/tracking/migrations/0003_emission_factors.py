@@ -0,0 +1,104 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0002_footprint_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmissionFactor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        choices=[
+                            ("transport", "Transport"),
+                            ("food", "Food"),
+                            ("energy", "Energy"),
+                            ("waste", "Waste"),
+                            ("other", "Other"),
+                        ],
+                        max_length=16,
+                        verbose_name="category",
+                    ),
+                ),
+                (
+                    "region",
+                    models.CharField(
+                        blank=True,
+                        help_text="Empty if the factor applies to every region.",
+                        max_length=8,
+                        verbose_name="region",
+                    ),
+                ),
+                ("unit", models.CharField(max_length=16, verbose_name="unit")),
+                (
+                    "co2e_per_unit",
+                    models.FloatField(verbose_name="CO2e per unit (kg)"),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=255, verbose_name="name"),
+                ),
+                (
+                    "name_de",
+                    models.CharField(
+                        max_length=255, null=True, verbose_name="name"
+                    ),
+                ),
+                (
+                    "name_en",
+                    models.CharField(
+                        max_length=255, null=True, verbose_name="name"
+                    ),
+                ),
+                (
+                    "description",
+                    models.TextField(blank=True, verbose_name="description"),
+                ),
+                (
+                    "description_de",
+                    models.TextField(
+                        blank=True, null=True, verbose_name="description"
+                    ),
+                ),
+                (
+                    "description_en",
+                    models.TextField(
+                        blank=True, null=True, verbose_name="description"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="updated at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "emission factor",
+                "verbose_name_plural": "emission factors",
+                "ordering": ["category", "region", "unit"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("category", "region", "unit"),
+                        name="unique_emission_factor",
+                    )
+                ],
+            },
+        ),
+    ]
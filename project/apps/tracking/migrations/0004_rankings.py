@@ -0,0 +1,108 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0003_emission_factors"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="emissionfactor",
+            name="co2e_per_unit",
+            field=models.FloatField(
+                help_text="Negative for activities that avoid emissions, e.g. a km by bike instead of by car.",
+                verbose_name="CO2e per unit (kg)",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RankingEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[("users", "Users"), ("groups", "Groups")],
+                        max_length=8,
+                        verbose_name="board",
+                    ),
+                ),
+                (
+                    "entry",
+                    models.CharField(
+                        help_text="The id of the user or group.",
+                        max_length=36,
+                        verbose_name="entry",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="saved CO2e (kg)")),
+                ("bucket", models.PositiveIntegerField(verbose_name="bucket")),
+            ],
+            options={
+                "verbose_name": "ranking entry",
+                "verbose_name_plural": "ranking entries",
+                "indexes": [
+                    models.Index(
+                        fields=["board", "-score"],
+                        name="ranking_board_score_idx",
+                    ),
+                    models.Index(
+                        fields=["board", "bucket", "score"],
+                        name="ranking_board_bucket_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("board", "entry"), name="unique_ranking_entry"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RankingNode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[("users", "Users"), ("groups", "Groups")],
+                        max_length=8,
+                        verbose_name="board",
+                    ),
+                ),
+                ("node", models.PositiveIntegerField(verbose_name="node")),
+                (
+                    "count",
+                    models.IntegerField(default=0, verbose_name="count"),
+                ),
+            ],
+            options={
+                "verbose_name": "ranking node",
+                "verbose_name_plural": "ranking nodes",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("board", "node"), name="unique_ranking_node"
+                    )
+                ],
+            },
+        ),
+    ]
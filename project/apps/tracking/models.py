@@ -0,0 +1,243 @@
+"""
+Module: tracking models
+
+This module defines the eco activities the users track with the mobile app,
+the emission factors their footprint is computed with and the rollups of
+their footprint over days, weeks and months, and the ranking of users and
+groups by their savings.
+"""
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from core.translated import ActiveLanguageManager
+
+
+class Activity(models.Model):
+    """
+    An eco activity of a user, e.g. 12 km travelled by bus.
+
+    Activities are sent by the mobile app, which may retry a batch after it
+    was offline. The `key` the app assigns to every activity makes the retry
+    safe, it is unique per user.
+    """
+
+    class Category(models.TextChoices):
+        """The categories of activities."""
+
+        TRANSPORT = "transport", _("Transport")
+        FOOD = "food", _("Food")
+        ENERGY = "energy", _("Energy")
+        WASTE = "waste", _("Waste")
+        OTHER = "other", _("Other")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="activities",
+        verbose_name=_("user"),
+    )
+    key = models.CharField(
+        _("idempotency key"),
+        max_length=64,
+        help_text=_("Assigned by the client, unique per user."),
+    )
+    category = models.CharField(
+        _("category"), max_length=16, choices=Category.choices
+    )
+    quantity = models.FloatField(_("quantity"))
+    unit = models.CharField(_("unit"), max_length=16)
+    region = models.CharField(_("region"), max_length=8, blank=True)
+    occurred_at = models.DateTimeField(_("occurred at"))
+    co2e = models.FloatField(
+        _("CO2e (kg)"),
+        default=0,
+        help_text=_("The emissions of the activity in kg CO2 equivalent."),
+    )
+    received_at = models.DateTimeField(_("received at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("activity")
+        verbose_name_plural = _("activities")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_activity_key"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "occurred_at"],
+                name="activity_user_occurred_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity:g} {self.unit} {self.get_category_display()}"
+
+
+class EmissionFactor(models.Model):
+    """
+    The emissions of one unit of an activity, e.g. of a km by bus.
+
+    A factor applies to a region, or to every region without a more specific
+    factor if its region is empty. The name and description are translated.
+    """
+
+    category = models.CharField(
+        _("category"), max_length=16, choices=Activity.Category.choices
+    )
+    region = models.CharField(
+        _("region"),
+        max_length=8,
+        blank=True,
+        help_text=_("Empty if the factor applies to every region."),
+    )
+    unit = models.CharField(_("unit"), max_length=16)
+    co2e_per_unit = models.FloatField(
+        _("CO2e per unit (kg)"),
+        help_text=_(
+            "Negative for activities that avoid emissions, e.g. a km by "
+            "bike instead of by car."
+        ),
+    )
+    name = models.CharField(_("name"), max_length=255)
+    description = models.TextField(_("description"), blank=True)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    # objects.active_language() loads the translations of one language
+    objects = ActiveLanguageManager()
+
+    class Meta:
+        verbose_name = _("emission factor")
+        verbose_name_plural = _("emission factors")
+        ordering = ["category", "region", "unit"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "region", "unit"],
+                name="unique_emission_factor",
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        """Save the factor with an upper case region code."""
+        self.region = self.region.upper()
+        super().save(*args, **kwargs)
+
+
+class FootprintRollup(models.Model):
+    """
+    The footprint of a user over a day, a week or a month.
+
+    Rollups are kept up to date by `tracking.rollups.update_rollups` as
+    activities are recorded, corrected or deleted, so that the footprint
+    over time is read without aggregating the activities.
+    """
+
+    class Period(models.TextChoices):
+        """The periods of rollups."""
+
+        DAY = "day", _("Day")
+        WEEK = "week", _("Week")
+        MONTH = "month", _("Month")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="footprint_rollups",
+        verbose_name=_("user"),
+    )
+    period = models.CharField(
+        _("period"), max_length=8, choices=Period.choices
+    )
+    start = models.DateField(
+        _("start"),
+        help_text=_("The first day of the period, weeks start on Monday."),
+    )
+    co2e = models.FloatField(_("CO2e (kg)"), default=0)
+    # not a PositiveIntegerField: deleting an activity, or moving it to
+    # another day, upserts -1 activities for its old day, week and month,
+    # and the check constraint of a positive field would reject these
+    # values before the conflict turns the insert into an update
+    activities = models.IntegerField(_("activities"), default=0)
+
+    class Meta:
+        verbose_name = _("footprint rollup")
+        verbose_name_plural = _("footprint rollups")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "period", "start"],
+                name="unique_footprint_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_period_display()} {self.start}: {self.co2e:g} kg"
+
+
+class RankingEntry(models.Model):
+    """
+    The savings of a user or a group on a leaderboard.
+
+    Only entries with savings are stored. The entries are counted per score
+    bucket in `RankingNode`, see `tracking.ranking`.
+    """
+
+    class Board(models.TextChoices):
+        """The leaderboards."""
+
+        USERS = "users", _("Users")
+        GROUPS = "groups", _("Groups")
+
+    board = models.CharField(_("board"), max_length=8, choices=Board.choices)
+    entry = models.CharField(
+        _("entry"), max_length=36, help_text=_("The id of the user or group.")
+    )
+    score = models.FloatField(_("saved CO2e (kg)"))
+    bucket = models.PositiveIntegerField(_("bucket"))
+
+    class Meta:
+        verbose_name = _("ranking entry")
+        verbose_name_plural = _("ranking entries")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["board", "entry"], name="unique_ranking_entry"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["board", "-score"], name="ranking_board_score_idx"
+            ),
+            models.Index(
+                fields=["board", "bucket", "score"],
+                name="ranking_board_bucket_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.board} {self.entry}: {self.score:g} kg"
+
+
+class RankingNode(models.Model):
+    """A node of the Fenwick tree counting the entries per score bucket."""
+
+    board = models.CharField(
+        _("board"), max_length=8, choices=RankingEntry.Board.choices
+    )
+    node = models.PositiveIntegerField(_("node"))
+    # signed, since an entry that leaves a bucket, by a new score or its
+    # removal, upserts a count of -1 for every node covering the bucket,
+    # which is checked against the constraints as an inserted row first
+    count = models.IntegerField(_("count"), default=0)
+
+    class Meta:
+        verbose_name = _("ranking node")
+        verbose_name_plural = _("ranking nodes")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["board", "node"], name="unique_ranking_node"
+            ),
+        ]
@@ -0,0 +1,38 @@
+"""
+Module: tracking parsers
+
+Provides parsers that read the activity events of a request lazily, so that
+large batches are streamed into the database instead of being loaded into
+memory first. `request.data` is an iterator over the events.
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .ingest import read_json_array, read_ndjson
+
+
+class StreamingParser(BaseParser):
+    """Base class of the streaming event parsers."""
+
+    reader = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Return an iterator over the events of the stream."""
+        if stream is None:
+            raise ParseError("The request has no events.")
+        return self.reader(stream)
+
+
+class JSONArrayParser(StreamingParser):
+    """Parse a JSON array of events."""
+
+    media_type = "application/json"
+    reader = staticmethod(read_json_array)
+
+
+class NDJSONParser(StreamingParser):
+    """Parse newline delimited JSON events."""
+
+    media_type = "application/x-ndjson"
+    reader = staticmethod(read_ndjson)
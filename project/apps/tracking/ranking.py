@@ -0,0 +1,506 @@
+"""
+Module: ranking
+
+Maintains the leaderboards of users and groups by their savings, the CO2e
+their activities avoided (activities with a negative footprint). The
+savings of a group are the sum of the savings of its members.
+
+Ranking by `ORDER BY ... OFFSET` or counting the entries with a higher score
+takes time linear in the rank. Instead, the entries are counted per score
+bucket in a Fenwick tree stored in `RankingNode`, so that the number of
+entries above a bucket is the sum of at most `log2(BUCKETS) + 1` nodes. The
+rank of an entry adds the entries with a higher score in its own bucket,
+which are found through an index. Top-k queries read the score index.
+
+Changes of the leaderboards invalidate the cached leaderboard responses
+(`LEADERBOARD_TAG`, see `core.http_cache`) once they are committed.
+"""
+
+from collections import defaultdict
+from itertools import islice
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import Sum
+
+from core.http_cache import invalidate_responses
+
+from .models import Activity, RankingEntry, RankingNode
+
+Board = RankingEntry.Board
+
+# kg CO2e per score bucket and number of buckets, higher scores share the
+# last bucket
+RESOLUTION = 0.1
+BUCKETS = 2**20
+# scores closer to zero are treated as no savings
+EPSILON = 1e-9
+# number of entries written at once by a rebuild
+REBUILD_BATCH_SIZE = 10000
+# tag of the cached leaderboard responses
+LEADERBOARD_TAG = "leaderboard"
+
+
+def get_bucket(score):
+    """
+    Get the bucket of a score.
+
+    Args:
+        score (float): The score, greater than zero.
+
+    Returns:
+        int: The bucket, from 0 to `BUCKETS - 1`.
+    """
+    return min(int(score / RESOLUTION), BUCKETS - 1)
+
+
+def get_update_nodes(bucket):
+    """
+    Get the Fenwick tree nodes that count a bucket.
+
+    Args:
+        bucket (int): The bucket.
+
+    Yields:
+        int: The nodes.
+    """
+    node = bucket + 1
+    while node <= BUCKETS:
+        yield node
+        node += node & -node
+
+
+def get_prefix_nodes(bucket):
+    """
+    Get the Fenwick tree nodes whose sum counts the entries up to a bucket.
+
+    Args:
+        bucket (int): The last bucket counted.
+
+    Yields:
+        int: The nodes.
+    """
+    node = bucket + 1
+    while node > 0:
+        yield node
+        node -= node & -node
+
+
+def get_saved(activity):
+    """Return the CO2e an activity avoided."""
+    return max(0.0, -activity.co2e)
+
+
+def invalidate_leaderboards(using=None):
+    """Invalidate the cached leaderboards once the change is committed."""
+    transaction.on_commit(
+        lambda: invalidate_responses(LEADERBOARD_TAG), using=using
+    )
+
+
+class RankingIndex:
+    """
+    A leaderboard of users or groups.
+
+    Usage:
+        index = RankingIndex(RankingEntry.Board.USERS)
+        index.get_rank(str(user.pk))
+        index.get_top(10)
+    """
+
+    def __init__(self, board, using=None):
+        self.board = board
+        self.using = using or router.db_for_write(RankingEntry)
+        self.entries = RankingEntry.objects.using(self.using).filter(
+            board=board
+        )
+        self.nodes = RankingNode.objects.using(self.using).filter(board=board)
+
+    def get_model(self):
+        """Return the model of the ranked entries."""
+        if self.board == Board.USERS:
+            return get_user_model()
+        return apps.get_model("auth", "Group")
+
+    def __len__(self):
+        """Return the number of entries with savings."""
+        return (
+            self.nodes.filter(node=BUCKETS)
+            .values_list("count", flat=True)
+            .first()
+            or 0
+        )
+
+    async def alen(self):
+        """Async version of `len(index)`."""
+        return (
+            await self.nodes.filter(node=BUCKETS)
+            .values_list("count", flat=True)
+            .afirst()
+            or 0
+        )
+
+    def get_score(self, entry):
+        """
+        Get the score of an entry.
+
+        Args:
+            entry (str): The id of the user or group.
+
+        Returns:
+            float: The score, 0 without savings.
+        """
+        return (
+            self.entries.filter(entry=entry)
+            .values_list("score", flat=True)
+            .first()
+            or 0.0
+        )
+
+    def get_entry_queryset(self, entry):
+        """Return the score and bucket of an entry."""
+        return self.entries.filter(entry=entry).values_list("score", "bucket")
+
+    def get_node_queryset(self, bucket):
+        """Return the nodes counting the entries above a bucket."""
+        nodes = {*get_prefix_nodes(bucket), BUCKETS}
+        return self.nodes.filter(node__in=nodes).values_list("node", "count")
+
+    def get_bucket_queryset(self, bucket, score):
+        """Return the entries of a bucket with a higher score."""
+        return self.entries.filter(bucket=bucket, score__gt=score)
+
+    @staticmethod
+    def count_above(bucket, counts):
+        """Count the entries in the buckets above a bucket."""
+        return counts.get(BUCKETS, 0) - sum(
+            counts.get(node, 0) for node in get_prefix_nodes(bucket)
+        )
+
+    def get_rank(self, entry):
+        """
+        Get the rank of an entry. Entries with the same score share a rank,
+        entries without savings rank after all others.
+
+        Args:
+            entry (str): The id of the user or group.
+
+        Returns:
+            tuple: The rank and the score of the entry.
+        """
+        score, bucket = self.get_entry_queryset(entry).first() or (0.0, None)
+        if bucket is None:
+            return len(self) + 1, score
+        counts = dict(self.get_node_queryset(bucket))
+        above = self.count_above(bucket, counts)
+        above += self.get_bucket_queryset(bucket, score).count()
+        return above + 1, score
+
+    async def aget_rank(self, entry):
+        """Async version of `get_rank`."""
+        score, bucket = await self.get_entry_queryset(entry).afirst() or (
+            0.0,
+            None,
+        )
+        if bucket is None:
+            return await self.alen() + 1, score
+        counts = {
+            node: count async for node, count in self.get_node_queryset(bucket)
+        }
+        above = self.count_above(bucket, counts)
+        above += await self.get_bucket_queryset(bucket, score).acount()
+        return above + 1, score
+
+    def get_top_queryset(self, count, offset):
+        """Return the id and score of the entries with the highest scores."""
+        return self.entries.order_by("-score", "entry").values_list(
+            "entry", "score"
+        )[offset : offset + count]
+
+    @staticmethod
+    def rank_top(top, offset, first):
+        """
+        Rank the entries with the highest scores.
+
+        Args:
+            top (list): The id and score of the entries, in order.
+            offset (int): The number of entries skipped.
+            first (int): The rank of the first entry.
+
+        Returns:
+            list: The rank, id and score of the entries.
+        """
+        ranked = []
+        for position, (entry, score) in enumerate(top, offset + 1):
+            if ranked and ranked[-1][2] == score:
+                rank = ranked[-1][0]
+            elif not ranked:
+                rank = first
+            else:
+                rank = position
+            ranked.append((rank, entry, score))
+        return ranked
+
+    def get_top(self, count, offset=0):
+        """
+        Get the entries with the highest scores.
+
+        Args:
+            count (int): The number of entries.
+            offset (int): The number of entries to skip.
+
+        Returns:
+            list: The rank, id and score of the entries.
+        """
+        top = list(self.get_top_queryset(count, offset))
+        # the first entry may share its score with skipped entries
+        first = self.get_rank(top[0][0])[0] if top and offset else 1
+        return self.rank_top(top, offset, first)
+
+    async def aget_top(self, count, offset=0):
+        """Async version of `get_top`."""
+        top = [row async for row in self.get_top_queryset(count, offset)]
+        first = (await self.aget_rank(top[0][0]))[0] if top and offset else 1
+        return self.rank_top(top, offset, first)
+
+    def update(self, deltas):
+        """
+        Add score changes to the entries.
+
+        The ranked users or groups are locked, so that concurrent updates
+        of an entry are applied one after the other.
+
+        Args:
+            deltas (dict): The score changes by entry id.
+        """
+        deltas = {
+            str(entry): delta for entry, delta in deltas.items() if delta
+        }
+        if not deltas:
+            return
+        with transaction.atomic(using=self.using):
+            list(
+                self.get_model()
+                .objects.using(self.using)
+                .select_for_update()
+                .filter(pk__in=list(deltas))
+                .order_by("pk")
+                .values_list("pk")
+            )
+            entries = {
+                entry.entry: entry
+                for entry in self.entries.filter(entry__in=list(deltas))
+            }
+            node_deltas = defaultdict(int)
+            changed = []
+            removed = []
+            for key, delta in deltas.items():
+                entry = entries.get(key)
+                if entry is None:
+                    entry = RankingEntry(
+                        board=self.board, entry=key, score=0.0, bucket=None
+                    )
+                old_bucket = entry.bucket
+                entry.score += delta
+                entry.bucket = (
+                    get_bucket(entry.score) if entry.score > EPSILON else None
+                )
+                if entry.bucket == old_bucket:
+                    if entry.bucket is not None:
+                        changed.append(entry)
+                    continue
+                if old_bucket is not None:
+                    for node in get_update_nodes(old_bucket):
+                        node_deltas[node] -= 1
+                if entry.bucket is None:
+                    if entry.pk is not None:
+                        removed.append(entry.pk)
+                    continue
+                for node in get_update_nodes(entry.bucket):
+                    node_deltas[node] += 1
+                changed.append(entry)
+            self.save_entries(changed, removed)
+            self.apply_node_deltas(node_deltas)
+            invalidate_leaderboards(self.using)
+
+    def save_entries(self, changed, removed):
+        """Write changed entries and delete the ones without savings."""
+        entries = RankingEntry.objects.using(self.using)
+        entries.bulk_create([entry for entry in changed if entry.pk is None])
+        entries.bulk_update(
+            [entry for entry in changed if entry.pk is not None],
+            ["score", "bucket"],
+        )
+        if removed:
+            entries.filter(pk__in=removed).delete()
+
+    def apply_node_deltas(self, node_deltas):
+        """
+        Add count changes to the Fenwick tree nodes.
+
+        The nodes are upserted in their order, so that concurrent updates
+        lock the rows they share in the same order instead of deadlocking.
+        """
+        rows = [
+            (self.board, node, delta)
+            for node, delta in sorted(node_deltas.items())
+            if delta
+        ]
+        if not rows:
+            return
+        connection = connections[self.using]
+        table = connection.ops.quote_name(RankingNode._meta.db_table)
+        # SQLite and PostgreSQL share the upsert syntax
+        sql = (
+            f"INSERT INTO {table} (board, node, count) VALUES (%s, %s, %s) "
+            "ON CONFLICT (board, node) DO UPDATE SET "
+            f"count = {table}.count + excluded.count"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def rebuild(self, scores):
+        """
+        Replace the entries and the Fenwick tree.
+
+        Args:
+            scores (iterable): The id and score of every entry, consumed in
+                batches of `REBUILD_BATCH_SIZE`.
+
+        Returns:
+            int: The number of entries with savings.
+        """
+        counts = [0] * (BUCKETS + 1)
+        total = 0
+        scores = iter(scores)
+        with transaction.atomic(using=self.using):
+            self.entries.delete()
+            self.nodes.delete()
+            while batch := list(islice(scores, REBUILD_BATCH_SIZE)):
+                entries = []
+                for entry, score in batch:
+                    if score <= EPSILON:
+                        continue
+                    bucket = get_bucket(score)
+                    counts[bucket + 1] += 1
+                    entries.append(
+                        RankingEntry(
+                            board=self.board,
+                            entry=str(entry),
+                            score=score,
+                            bucket=bucket,
+                        )
+                    )
+                RankingEntry.objects.using(self.using).bulk_create(entries)
+                total += len(entries)
+            # build the tree in place: every node adds itself to its parent
+            for node in range(1, BUCKETS + 1):
+                parent = node + (node & -node)
+                if parent <= BUCKETS:
+                    counts[parent] += counts[node]
+            RankingNode.objects.using(self.using).bulk_create(
+                (
+                    RankingNode(board=self.board, node=node, count=count)
+                    for node, count in enumerate(counts)
+                    if count
+                ),
+                batch_size=REBUILD_BATCH_SIZE,
+            )
+            invalidate_leaderboards(self.using)
+        return total
+
+
+def collect_savings(added=(), removed=()):
+    """
+    Sum up the changes of the savings of users.
+
+    Args:
+        added (iterable): The activities recorded, or their new state.
+        removed (iterable): The activities deleted, or their old state.
+
+    Returns:
+        dict: The changes of the savings by user id.
+    """
+    savings = defaultdict(float)
+    for activity in added:
+        savings[activity.user_id] += get_saved(activity)
+    for activity in removed:
+        savings[activity.user_id] -= get_saved(activity)
+    return savings
+
+
+def update_savings(savings, using=None):
+    """
+    Add changes of the savings of users to the user and group leaderboards.
+
+    Args:
+        savings (dict): The changes of the savings by user id.
+        using (str, optional): The database alias.
+    """
+    savings = {user: saved for user, saved in savings.items() if saved}
+    if not savings:
+        return
+    using = using or router.db_for_write(RankingEntry)
+    RankingIndex(Board.USERS, using).update(savings)
+    memberships = (
+        get_user_model()
+        .groups.through.objects.using(using)
+        .filter(customuser_id__in=list(savings))
+        .values_list("customuser_id", "group_id")
+    )
+    groups = defaultdict(float)
+    for user_id, group_id in memberships:
+        groups[group_id] += savings[user_id]
+    RankingIndex(Board.GROUPS, using).update(groups)
+
+
+def get_savings(user_ids, using=None):
+    """
+    Get the savings of users from the leaderboard.
+
+    Args:
+        user_ids (iterable): The ids of the users.
+        using (str, optional): The database alias.
+
+    Returns:
+        dict: The kg CO2e saved by user id, for the users with savings.
+    """
+    using = using or router.db_for_write(RankingEntry)
+    ids = {str(user_id): user_id for user_id in user_ids}
+    entries = RankingEntry.objects.using(using).filter(
+        board=Board.USERS, entry__in=list(ids)
+    )
+    return {
+        ids[entry]: score
+        for entry, score in entries.values_list("entry", "score")
+    }
+
+
+def rebuild_rankings(using=None):
+    """
+    Recompute both leaderboards from the activities.
+
+    Args:
+        using (str, optional): The database alias.
+
+    Returns:
+        dict: The number of entries by board.
+    """
+    using = using or router.db_for_write(RankingEntry)
+    saved = Activity.objects.using(using).filter(co2e__lt=0)
+    users = saved.values_list("user_id").annotate(saved=-Sum("co2e"))
+    memberships = get_user_model().groups.through.objects.using(using)
+    groups = (
+        memberships.filter(customuser__activities__co2e__lt=0)
+        .values_list("group_id")
+        .annotate(saved=-Sum("customuser__activities__co2e"))
+    )
+    return {
+        Board.USERS: RankingIndex(Board.USERS, using).rebuild(
+            users.order_by().iterator()
+        ),
+        Board.GROUPS: RankingIndex(Board.GROUPS, using).rebuild(
+            groups.order_by().iterator()
+        ),
+    }
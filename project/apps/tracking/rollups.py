@@ -0,0 +1,239 @@
+"""
+Module: rollups
+
+Maintains the footprint rollups of the users. Recording, correcting or
+deleting activities adds the difference to the day, week and month of every
+changed activity with an upsert, so late activities simply update an older
+rollup. `rebuild_rollups` recomputes the rollups from the activities, one
+aggregate query per batch of users.
+
+The periods are days in the default time zone, weeks starting on Monday and
+calendar months. Changed rollups invalidate the cached responses of their
+users (see `core.http_cache`) once they are committed.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from core.http_cache import invalidate_user_responses
+
+from .models import Activity, FootprintRollup
+from .ranking import collect_savings, update_savings
+
+Period = FootprintRollup.Period
+
+# number of users whose rollups are rebuilt at once
+REBUILD_BATCH_SIZE = 500
+
+
+def get_period_starts(day):
+    """
+    Get the start of the periods a day belongs to.
+
+    Args:
+        day (date): The day.
+
+    Returns:
+        dict: The first day of the day, week and month by period.
+    """
+    return {
+        Period.DAY: day,
+        Period.WEEK: day - timedelta(days=day.weekday()),
+        Period.MONTH: day.replace(day=1),
+    }
+
+
+def get_local_day(moment):
+    """
+    Get the day of a moment in the default time zone.
+
+    Args:
+        moment (datetime): The aware moment.
+
+    Returns:
+        date: The day.
+    """
+    return timezone.localtime(moment, timezone.get_default_timezone()).date()
+
+
+def collect_deltas(added=(), removed=()):
+    """
+    Sum up the changes of the rollups for added and removed activities.
+
+    Args:
+        added (iterable): The activities recorded, or their new state.
+        removed (iterable): The activities deleted, or their old state.
+
+    Returns:
+        dict: The changes of co2e and activities by (user id, period, start).
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for activities, sign in ((added, 1), (removed, -1)):
+        for activity in activities:
+            day = get_local_day(activity.occurred_at)
+            for period, start in get_period_starts(day).items():
+                delta = deltas[activity.user_id, period, start]
+                delta[0] += sign * activity.co2e
+                delta[1] += sign
+    return deltas
+
+
+def apply_deltas(deltas, using):
+    """
+    Add changes to the rollups, creating the missing ones.
+
+    Args:
+        deltas (dict): The changes as returned by `collect_deltas`.
+        using (str): The database alias.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(FootprintRollup._meta.db_table)
+    user_field = FootprintRollup._meta.get_field("user")
+    start_field = FootprintRollup._meta.get_field("start")
+    # SQLite and PostgreSQL share the upsert syntax
+    sql = (
+        f"INSERT INTO {table} (user_id, period, start, co2e, activities) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON CONFLICT (user_id, period, start) DO UPDATE SET "
+        f"co2e = {table}.co2e + excluded.co2e, "
+        f"activities = {table}.activities + excluded.activities"
+    )
+    rows = [
+        (
+            user_field.get_db_prep_value(user_id, connection),
+            period,
+            start_field.get_db_prep_value(start, connection),
+            co2e,
+            count,
+        )
+        for (user_id, period, start), (co2e, count) in deltas.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    invalidate_rollups({user_id for user_id, period, start in deltas}, using)
+    if any(count < 0 for co2e, count in deltas.values()):
+        FootprintRollup.objects.using(using).filter(
+            user__in={user_id for user_id, period, start in deltas},
+            activities=0,
+        ).delete()
+
+
+def invalidate_rollups(user_ids, using):
+    """Invalidate the cached responses of users once committed."""
+    transaction.on_commit(
+        lambda: invalidate_user_responses(user_ids), using=using
+    )
+
+
+def update_rollups(added=(), removed=(), using=None):
+    """
+    Update the rollups and the leaderboards (see `tracking.ranking`) after
+    activities were recorded, corrected or deleted.
+
+    Bulk operations on activities bypass the model signals, so every code
+    path that changes activities calls this function. A correction passes
+    the old state as removed and the new state as added.
+
+    Args:
+        added (iterable): The activities recorded, or their new state.
+        removed (iterable): The activities deleted, or their old state.
+        using (str, optional): The database alias, defaults to the one the
+            activities are written to.
+    """
+    using = using or router.db_for_write(FootprintRollup)
+    added, removed = list(added), list(removed)
+    apply_deltas(collect_deltas(added, removed), using)
+    update_savings(collect_savings(added, removed), using)
+
+
+def rebuild_rollups(user_ids=None, batch_size=REBUILD_BATCH_SIZE, using=None):
+    """
+    Recompute the rollups from the activities.
+
+    The day rollups of a batch of users are aggregated by the database in a
+    single query, the weeks and months are summed up from the days.
+
+    Args:
+        user_ids (list, optional): The users to rebuild, defaults to all.
+        batch_size (int): The number of users rebuilt at once.
+        using (str, optional): The database alias.
+
+    Returns:
+        int: The number of activities rolled up.
+    """
+    using = using or router.db_for_write(FootprintRollup)
+    users = get_user_model().objects.using(using).order_by("pk")
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    total = 0
+    last = None
+    while True:
+        batch = users if last is None else users.filter(pk__gt=last)
+        batch = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return total
+        last = batch[-1]
+        with transaction.atomic(using=using):
+            total += rebuild_batch(batch, using)
+
+
+def rebuild_batch(user_ids, using):
+    """
+    Recompute the rollups of a batch of users.
+
+    Args:
+        user_ids (list): The users.
+        using (str): The database alias.
+
+    Returns:
+        int: The number of activities rolled up.
+    """
+    days = (
+        Activity.objects.using(using)
+        .filter(user__in=user_ids)
+        .annotate(
+            day=Trunc(
+                "occurred_at",
+                "day",
+                output_field=DateField(),
+                tzinfo=timezone.get_default_timezone(),
+            )
+        )
+        .values_list("user_id", "day")
+        .annotate(co2e=Sum("co2e"), activities=Count("pk"))
+        .order_by()
+    )
+    rollups = defaultdict(lambda: [0.0, 0])
+    total = 0
+    for user_id, day, co2e, count in days:
+        total += count
+        for period, start in get_period_starts(day).items():
+            rollup = rollups[user_id, period, start]
+            rollup[0] += co2e
+            rollup[1] += count
+    FootprintRollup.objects.using(using).filter(user__in=user_ids).delete()
+    FootprintRollup.objects.using(using).bulk_create(
+        (
+            FootprintRollup(
+                user_id=user_id,
+                period=period,
+                start=start,
+                co2e=co2e,
+                activities=count,
+            )
+            for (user_id, period, start), (co2e, count) in rollups.items()
+        ),
+        batch_size=1000,
+    )
+    invalidate_rollups(user_ids, using)
+    return total
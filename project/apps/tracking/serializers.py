@@ -0,0 +1,119 @@
+"""
+Module: tracking serializers
+
+This module provides the serializers of the tracking API.
+"""
+
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+
+from .models import Activity, FootprintRollup
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    """An activity event sent by the mobile app."""
+
+    class Meta:
+        model = Activity
+        fields = (
+            "key",
+            "category",
+            "quantity",
+            "unit",
+            "region",
+            "occurred_at",
+        )
+        extra_kwargs = {"quantity": {"min_value": 0}}
+
+
+class IngestErrorSerializer(serializers.Serializer):
+    """The errors of a rejected event."""
+
+    index = serializers.IntegerField(
+        help_text=_("The position of the event in the request.")
+    )
+    errors = serializers.DictField(
+        help_text=_("The errors by field, as for a single activity.")
+    )
+
+
+class IngestResultSerializer(serializers.Serializer):
+    """The outcome of an ingestion."""
+
+    received = serializers.IntegerField()
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField(
+        help_text=_("Events that corrected a recorded activity.")
+    )
+    duplicates = serializers.IntegerField(
+        help_text=_("Events whose key was already ingested.")
+    )
+    rejected = serializers.IntegerField()
+    errors = IngestErrorSerializer(
+        many=True,
+        help_text=_("The errors of the first rejected events."),
+    )
+
+
+class EmissionEstimateSerializer(serializers.Serializer):
+    """An activity whose footprint is estimated."""
+
+    category = serializers.ChoiceField(choices=Activity.Category.choices)
+    quantity = serializers.FloatField(min_value=0)
+    unit = serializers.CharField(max_length=16)
+    region = serializers.CharField(
+        max_length=8, required=False, default="", allow_blank=True
+    )
+    co2e = serializers.FloatField(
+        read_only=True,
+        help_text=_("The emissions in kg CO2 equivalent, 0 without factor."),
+    )
+
+
+class FootprintQuerySerializer(serializers.Serializer):
+    """The rollups of the footprint to read."""
+
+    period = serializers.ChoiceField(
+        choices=FootprintRollup.Period.choices,
+        default=FootprintRollup.Period.DAY,
+    )
+    since = serializers.DateField(
+        required=False, help_text=_("The first day to include.")
+    )
+    until = serializers.DateField(
+        required=False, help_text=_("The last day to include.")
+    )
+    limit = serializers.IntegerField(
+        default=31,
+        min_value=1,
+        max_value=366,
+        help_text=_("The maximum number of the latest periods to return."),
+    )
+
+
+class FootprintRollupSerializer(serializers.ModelSerializer):
+    """The footprint of a day, week or month."""
+
+    class Meta:
+        model = FootprintRollup
+        fields = ("period", "start", "co2e", "activities")
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """The page of a leaderboard to read."""
+
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+    # deep pages are read with OFFSET, the rank of a user is looked up
+    # through the index instead
+    offset = serializers.IntegerField(default=0, min_value=0, max_value=1000)
+
+
+class RankSerializer(serializers.Serializer):
+    """The rank of a user or group on a leaderboard."""
+
+    rank = serializers.IntegerField()
+    name = serializers.CharField()
+    score = serializers.FloatField(
+        help_text=_("The CO2e saved in kg, by avoiding emissions.")
+    )
@@ -0,0 +1,109 @@
+"""
+Module: tracking signals
+
+This module reloads the emission factor catalogue when a factor changes and
+keeps the leaderboards in sync with users, groups and memberships, and with
+the reissued ids of users.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import router, transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from users.ids import user_ids_reissued
+
+from .factors import reload_catalogue
+from .models import EmissionFactor, RankingEntry
+from .ranking import (
+    RankingIndex,
+    get_savings,
+    invalidate_leaderboards,
+    update_savings,
+)
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=EmissionFactor)
+@receiver(post_delete, sender=EmissionFactor)
+def reload_emission_factors(sender, **kwargs):
+    """Rewrite the catalogue once the change is committed."""
+    del kwargs
+    transaction.on_commit(reload_catalogue, using=router.db_for_write(sender))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def memberships_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Add the savings of members to the groups they join and subtract them
+    from the groups they leave.
+
+    The relation can be changed from both sides: `user.groups` (forward)
+    and `group.user_set` (reverse). Cleared memberships are only known
+    before they are removed.
+    """
+    del sender, kwargs
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    sign = 1 if action == "post_add" else -1
+    groups = {}
+    if not reverse:
+        if action == "pre_clear":
+            pk_set = instance.groups.values_list("pk", flat=True)
+        saved = get_savings([instance.pk]).get(instance.pk, 0.0)
+        groups = {group_id: sign * saved for group_id in pk_set}
+    else:
+        if action == "pre_clear":
+            pk_set = instance.user_set.values_list("pk", flat=True)
+        saved = sum(get_savings(pk_set).values())
+        groups = {instance.pk: sign * saved}
+    RankingIndex(RankingEntry.Board.GROUPS).update(groups)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Remove a deleted user and their savings from the leaderboards."""
+    del sender, kwargs
+    saved = get_savings([instance.pk]).get(instance.pk)
+    if saved:
+        update_savings({instance.pk: -saved})
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    """Remove a deleted group from the leaderboard."""
+    del sender, kwargs
+    index = RankingIndex(RankingEntry.Board.GROUPS)
+    score = index.get_score(instance.pk)
+    if score:
+        index.update({instance.pk: -score})
+
+
+@receiver(user_ids_reissued)
+def leaders_reissued(sender, ids, using, **kwargs):
+    """Move the leaderboard entries of users to their reissued ids."""
+    del sender, kwargs
+    entries = RankingEntry.objects.using(using).filter(
+        board=RankingEntry.Board.USERS
+    )
+    for old, new in ids.items():
+        entries.filter(entry=str(old)).update(entry=str(new))
+    invalidate_leaderboards(using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+def leader_renamed(sender, instance, update_fields=None, **kwargs):
+    """Invalidate the cached leaderboards, which show names."""
+    del instance, kwargs
+    if update_fields is None or {"first_name", "last_name", "name"} & set(
+        update_fields
+    ):
+        invalidate_leaderboards(router.db_for_write(sender))
@@ -0,0 +1,684 @@
+"""
+Module: tracking tests
+
+This module contains test cases for the tracking app. The test cases cover
+the ingestion of activity events as JSON arrays and NDJSON, including the
+validation, idempotency keys and the streaming readers, the emission factor
+catalogue and its active language columns, the footprint rollups and the
+leaderboards.
+"""
+
+import json
+import random
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from users.caches import api_user_cache
+from users.models import CustomUser
+from users.tokens import ACCESS, create_token
+
+from . import factors
+from .admin import ActivityAdmin
+from .ingest import ingest_events, read_json_array
+from .models import Activity, EmissionFactor, FootprintRollup, RankingEntry
+from .ranking import RankingIndex, rebuild_rankings
+from .rollups import rebuild_rollups
+
+
+def override_catalogue(test):
+    """
+    Write the emission factor catalogue of a test to a temporary directory.
+    """
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    path = Path(directory.name) / "factors.bin"
+    settings = test.settings(EMISSION_FACTOR_CATALOGUE=path)
+    settings.enable()
+    test.addCleanup(settings.disable)
+    return path
+
+
+def make_event(index, **fields):
+    """
+    Build a valid activity event.
+    """
+    return {
+        "key": f"event-{index}",
+        "category": "transport",
+        "quantity": 12.5,
+        "unit": "km",
+        "occurred_at": "2024-11-28T17:40:00+01:00",
+        **fields,
+    }
+
+
+class ActivityIngestTests(TestCase):
+    """
+    Test suite for the activity ingestion endpoint.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a user with an access token.
+        """
+        override_catalogue(self)
+        cache.clear()
+        api_user_cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="mobile@example.com", password=None
+        )
+        self.headers = {
+            "authorization": f"Bearer {create_token(self.user, ACCESS)}"
+        }
+        self.url = reverse("activity_ingest")
+
+    def post(self, body, content_type="application/json"):
+        """
+        Send events to the ingestion endpoint.
+        """
+        return self.client.post(
+            self.url, body, content_type=content_type, headers=self.headers
+        )
+
+    def test_ingest_json_array(self):
+        """
+        Test that a JSON array of events is recorded for the user.
+        """
+        response = self.post(json.dumps([make_event(i) for i in range(3)]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "received": 3,
+                "created": 3,
+                "updated": 0,
+                "duplicates": 0,
+                "rejected": 0,
+                "errors": [],
+            },
+        )
+        activity = self.user.activities.get(key="event-0")
+        self.assertEqual((activity.quantity, activity.unit), (12.5, "km"))
+
+    def test_ingest_ndjson_retry(self):
+        """
+        Test that NDJSON events sent again are skipped as duplicates.
+        """
+        body = "\n".join(json.dumps(make_event(i)) for i in range(4))
+        self.post(body, "application/x-ndjson")
+        body += "\n" + json.dumps(make_event(4))
+        response = self.post(body, "application/x-ndjson").json()
+        self.assertEqual((response["created"], response["duplicates"]), (1, 4))
+        self.assertEqual(self.user.activities.count(), 5)
+
+    def test_invalid_events_are_rejected(self):
+        """
+        Test that invalid events are reported and the others recorded.
+        """
+        events = [
+            make_event(0),
+            make_event(1, category="flying"),
+            make_event(2, quantity=-1),
+            "event",
+            make_event(0),
+        ]
+        response = self.post(
+            "\n".join(map(json.dumps, events)), "application/x-ndjson"
+        ).json()
+        self.assertEqual((response["created"], response["rejected"]), (1, 3))
+        self.assertEqual(response["duplicates"], 1)
+        self.assertEqual(
+            [error["index"] for error in response["errors"]], [1, 2, 3]
+        )
+        self.assertIn("category", response["errors"][0]["errors"])
+
+    def test_malformed_body(self):
+        """
+        Test that a body that is not an array of events is rejected.
+        """
+        self.assertEqual(self.post('{"key": "event-0"}').status_code, 400)
+        self.assertEqual(self.post("[{").status_code, 400)
+
+    def test_requires_authentication(self):
+        """
+        Test that anonymous requests are refused.
+        """
+        response = self.client.post(
+            self.url, "[]", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Activity.objects.exists())
+
+    def test_batches(self):
+        """
+        Test that events are inserted with one query per batch.
+        """
+        events = [make_event(i) for i in range(10)]
+        factors.get_catalogue()
+        # every batch locks the user, looks up the existing keys, inserts
+        # the new events and updates the rollups in a savepoint
+        with self.assertNumQueries(4 * 6):
+            result = ingest_events(self.user, iter(events), batch_size=3)
+        self.assertEqual(result.created, 10)
+
+
+class FootprintRollupTests(TestCase):
+    """
+    Test suite for the footprint rollups.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a user.
+        """
+        override_catalogue(self)
+        self.user = CustomUser.objects.create_user(
+            email="rollup@example.com", password=None
+        )
+
+    def ingest(self, *events):
+        """
+        Ingest events with a footprint.
+        """
+        return ingest_events(
+            self.user,
+            [
+                make_event(index, occurred_at=occurred_at)
+                for index, occurred_at in events
+            ],
+        )
+
+    def get_rollups(self):
+        """
+        Return the rollups of the user by period and start.
+        """
+        return {
+            (rollup.period, str(rollup.start)): (
+                rollup.co2e,
+                rollup.activities,
+            )
+            for rollup in self.user.footprint_rollups.all()
+        }
+
+    def test_incremental_rollups(self):
+        """
+        Test that days, weeks and months are rolled up in the local time
+        zone, including late events.
+        """
+        self.ingest(
+            (0, "2024-11-28T10:00:00+01:00"),
+            # Friday night in UTC, but Saturday in Berlin
+            (1, "2024-11-29T23:30:00Z"),
+        )
+        self.ingest((2, "2024-10-31T12:00:00+01:00"))
+        rollups = self.get_rollups()
+        self.assertEqual(rollups["day", "2024-11-28"][1], 1)
+        self.assertEqual(rollups["day", "2024-11-30"][1], 1)
+        self.assertEqual(rollups["week", "2024-11-25"][1], 2)
+        self.assertEqual(rollups["week", "2024-10-28"][1], 1)
+        self.assertEqual(rollups["month", "2024-11-01"][1], 2)
+        self.assertEqual(rollups["month", "2024-10-01"][1], 1)
+
+    def test_corrections(self):
+        """
+        Test that corrected events move their footprint between rollups.
+        """
+        self.ingest((0, "2024-11-28T10:00:00+01:00"))
+        result = self.ingest((0, "2024-12-02T10:00:00+01:00"))
+        self.assertEqual((result.updated, result.duplicates), (1, 0))
+        rollups = self.get_rollups()
+        self.assertNotIn(("month", "2024-11-01"), rollups)
+        self.assertEqual(rollups["month", "2024-12-01"], (0, 1))
+        result = self.ingest((0, "2024-12-02T10:00:00+01:00"))
+        self.assertEqual((result.updated, result.duplicates), (0, 1))
+
+    def test_rebuild_matches_incremental(self):
+        """
+        Test that rebuilding the rollups gives the incremental result.
+        """
+        self.ingest(
+            (0, "2024-11-28T10:00:00+01:00"),
+            (1, "2024-11-29T23:30:00Z"),
+            (2, "2024-12-31T23:30:00+01:00"),
+        )
+        rollups = self.get_rollups()
+        FootprintRollup.objects.all().delete()
+        self.assertEqual(rebuild_rollups(), 3)
+        self.assertEqual(self.get_rollups(), rollups)
+        Activity.objects.update(co2e=F("quantity") * 2)
+        rebuild_rollups([self.user.pk])
+        self.assertEqual(self.get_rollups()["month", "2024-11-01"], (50.0, 2))
+
+    def test_admin_delete(self):
+        """
+        Test that deleting activities in the admin updates the rollups.
+        """
+        self.ingest((0, "2024-11-28T10:00:00+01:00"))
+        self.ingest((1, "2024-11-28T11:00:00+01:00"))
+        ActivityAdmin(Activity, site).delete_queryset(
+            None, Activity.objects.filter(key="event-0")
+        )
+        self.assertEqual(self.get_rollups()["day", "2024-11-28"], (0, 1))
+
+    def test_footprint_api(self):
+        """
+        Test that the latest rollups are listed in chronological order.
+        """
+        self.ingest(
+            (0, "2024-10-28T10:00:00+01:00"),
+            (1, "2024-11-28T10:00:00+01:00"),
+            (2, "2024-12-28T10:00:00+01:00"),
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("footprint"), {"period": "month", "limit": 2}
+        )
+        self.assertEqual(
+            [rollup["start"] for rollup in response.json()],
+            ["2024-11-01", "2024-12-01"],
+        )
+        response = self.client.get(reverse("footprint"), {"period": "year"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_footprint_api_token(self):
+        """
+        Test that the async footprint endpoint authenticates tokens.
+        """
+        api_user_cache.clear()
+        self.ingest((0, "2024-10-28T10:00:00+01:00"))
+        headers = {
+            "authorization": f"Bearer {create_token(self.user, ACCESS)}"
+        }
+        response = self.client.get(
+            reverse("footprint"), {"period": "day"}, headers=headers
+        )
+        self.assertEqual(response.json()[0]["start"], "2024-10-28")
+        response = self.client.get(
+            reverse("footprint"), headers={"authorization": "Bearer invalid"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_footprint_api_cached(self):
+        """
+        Test that footprint responses are cached until activities change.
+        """
+        cache.clear()
+        self.client.force_login(self.user)
+        url = reverse("footprint")
+        response = self.client.get(url, {"period": "day"})
+        self.assertEqual(response.json(), [])
+        headers = {"if_none_match": response["ETag"]}
+        response = self.client.get(url, {"period": "day"}, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingest((0, "2024-10-28T10:00:00+01:00"))
+        response = self.client.get(url, {"period": "day"}, headers=headers)
+        self.assertEqual(len(response.json()), 1)
+
+
+class EmissionFactorCatalogueTests(TestCase):
+    """
+    Test suite for the memory mapped emission factor catalogue.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a catalogue file in a temporary
+        directory and two factors.
+        """
+        self.path = override_catalogue(self)
+        self.add_factor("transport", "", "km", 0.1)
+        self.add_factor("transport", "de", "km", 0.08)
+
+    def add_factor(self, category, region, unit, co2e_per_unit):
+        """
+        Create an emission factor and run the reload it triggers.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmissionFactor.objects.create(
+                category=category,
+                region=region,
+                unit=unit,
+                co2e_per_unit=co2e_per_unit,
+                name_en=f"{category} per {unit}",
+            )
+
+    def test_compute(self):
+        """
+        Test that the factor of the region or of every region applies.
+        """
+        activities = [
+            Activity(
+                category="transport", region="DE", unit="km", quantity=10
+            ),
+            Activity(
+                category="transport", region="FR", unit="km", quantity=10
+            ),
+            Activity(category="transport", region="", unit="mi", quantity=10),
+        ]
+        factors.compute_emissions(activities)
+        self.assertEqual(
+            [activity.co2e for activity in activities], [0.8, 1.0, 0.0]
+        )
+
+    def test_hot_reload(self):
+        """
+        Test that a changed factor replaces the file every worker maps.
+        """
+        catalogue = factors.get_catalogue()
+        other_worker = factors.EmissionFactorCatalogue(self.path)
+        factor = self.add_factor("food", "", "kg", 2.5)
+        self.assertFalse(other_worker.is_current(self.path))
+        self.assertIsNot(factors.get_catalogue(), catalogue)
+        self.assertEqual(
+            factors.get_catalogue().get_factor("food", "", "kg"), 2.5
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            factor.delete()
+        self.assertIsNone(factors.get_catalogue().get_factor("food", "", "kg"))
+
+    def test_stale_file_is_rewritten(self):
+        """
+        Test that the first lookup of a worker rewrites a stale file.
+        """
+        factors.get_catalogue()
+        EmissionFactor.objects.filter(region="DE").update(
+            co2e_per_unit=1, updated_at=timezone.now()
+        )
+        factors.reset_catalogue("EMISSION_FACTOR_CATALOGUE")
+        self.assertEqual(
+            factors.get_catalogue().get_factor("transport", "DE", "km"), 1
+        )
+
+    def test_other_database_is_rewritten(self):
+        """
+        Test that a file written from another database is rewritten.
+        """
+        factors.get_catalogue()
+        with mock.patch.object(
+            factors, "get_database_identity", return_value="sqlite:///other"
+        ):
+            factors.reload_catalogue()
+        self.assertEqual(
+            factors.EmissionFactorCatalogue(self.path).database,
+            "sqlite:///other",
+        )
+        self.assertEqual(
+            factors.get_catalogue().database, factors.get_database_identity()
+        )
+
+    def test_admin_save(self):
+        """
+        Test that the admin computes the footprint of a saved activity.
+        """
+        user = CustomUser.objects.create_user(
+            email="admin@example.com", password=None
+        )
+        activity = Activity(
+            user=user,
+            key="admin",
+            category="transport",
+            region="DE",
+            unit="km",
+            quantity=10,
+            occurred_at=timezone.now(),
+        )
+        admin = ActivityAdmin(Activity, site)
+        admin.save_model(None, activity, None, False)
+        activity.refresh_from_db()
+        self.assertAlmostEqual(activity.co2e, 0.8)
+        activity.region = ""
+        admin.save_model(None, activity, None, True)
+        self.assertAlmostEqual(activity.co2e, 1)
+        self.assertAlmostEqual(user.footprint_rollups.first().co2e, 1)
+        self.assertIn("co2e", admin.get_readonly_fields(None))
+
+    def test_ingest_and_estimate(self):
+        """
+        Test that ingested and estimated activities get their footprint.
+        """
+        user = CustomUser.objects.create_user(
+            email="factor@example.com", password=None
+        )
+        ingest_events(user, [make_event(0, region="de", quantity=100)])
+        self.assertAlmostEqual(user.activities.get().co2e, 8)
+        self.assertAlmostEqual(user.footprint_rollups.first().co2e, 8)
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("emission_estimate"),
+            [{"category": "transport", "quantity": 5, "unit": "km"}],
+            content_type="application/json",
+        )
+        self.assertAlmostEqual(response.json()[0]["co2e"], 0.5)
+
+
+class ActiveLanguageTests(TestCase):
+    """
+    Test suite for loading the translations of the active language only.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a factor translated to English only.
+        """
+        override_catalogue(self)
+        EmissionFactor.objects.create(
+            category="food",
+            unit="kg",
+            co2e_per_unit=2.5,
+            name_en="Beef",
+            description_en="Per kg of beef.",
+        )
+
+    def test_inactive_languages_are_deferred(self):
+        """
+        Test that the columns of other languages are not loaded.
+        """
+        with translation.override("en"):
+            factor = EmissionFactor.objects.active_language().get()
+        self.assertEqual(
+            factor.get_deferred_fields(),
+            {"name", "name_de", "description", "description_de"},
+        )
+        with translation.override("en"), self.assertNumQueries(0):
+            self.assertEqual(str(factor), "Beef")
+
+    def test_default_language_fallback(self):
+        """
+        Test that the default language is loaded as the fallback of other
+        languages.
+        """
+        with translation.override("de"):
+            factor = EmissionFactor.objects.active_language().get()
+            self.assertEqual(
+                factor.get_deferred_fields(), {"name", "description"}
+            )
+            with self.assertNumQueries(0):
+                self.assertEqual(factor.name, "Beef")
+                self.assertEqual(factor.description, "Per kg of beef.")
+        with translation.override("fr"):
+            factor = EmissionFactor.objects.active_language().get()
+        self.assertIn("name_de", factor.get_deferred_fields())
+
+
+class RankingTests(TestCase):
+    """
+    Test suite for the leaderboards.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with a factor that avoids emissions.
+        """
+        override_catalogue(self)
+        EmissionFactor.objects.create(
+            category="transport", unit="km", co2e_per_unit=-0.1, name="Bike"
+        )
+        self.index = RankingIndex(RankingEntry.Board.GROUPS)
+
+    def ranks_by_brute_force(self, scores):
+        """
+        Rank scores by counting the higher ones.
+        """
+        return {
+            entry: 1 + sum(other > score for other in scores.values())
+            for entry, score in scores.items()
+        }
+
+    def test_ranks_match_brute_force(self):
+        """
+        Test ranks, ties, top-k and removal against counting the scores.
+        """
+        rng = random.Random(0)
+        scores = {}
+        for step in range(300):
+            entry = str(rng.randrange(60))
+            delta = rng.choice([0.05, 0.3, 7.0, 2e5, -0.3, -7.0])
+            if scores.get(entry, 0) + delta <= 0:
+                delta = -scores.get(entry, 0)
+            self.index.update({entry: delta})
+            scores[entry] = scores.get(entry, 0) + delta
+        scores = {entry: score for entry, score in scores.items() if score}
+        ranks = self.ranks_by_brute_force(scores)
+        self.assertEqual(len(self.index), len(scores))
+        for entry, rank in ranks.items():
+            self.assertEqual(self.index.get_rank(entry)[0], rank)
+        self.assertEqual(self.index.get_rank("999"), (len(scores) + 1, 0.0))
+        top = self.index.get_top(10, offset=5)
+        expected = sorted(scores.items(), key=lambda item: -item[1])[5:15]
+        self.assertEqual(
+            [(rank, score) for rank, entry, score in top],
+            [(ranks[entry], score) for entry, score in expected],
+        )
+        self.index.rebuild(scores.items())
+        for entry, rank in ranks.items():
+            self.assertEqual(self.index.get_rank(entry)[0], rank)
+
+    def test_savings_of_users_and_groups(self):
+        """
+        Test that the savings of activities rank users and their groups.
+        """
+        alice, bob = (
+            CustomUser.objects.create_user(email=email, password=None)
+            for email in ("alice@example.com", "bob@example.com")
+        )
+        group = Group.objects.create(name="Cyclists")
+        alice.groups.add(group)
+        ingest_events(alice, [make_event(0, quantity=100)])
+        ingest_events(bob, [make_event(0, quantity=300)])
+        users = RankingIndex(RankingEntry.Board.USERS)
+        self.assertEqual(users.get_rank(bob.pk), (1, 30.0))
+        self.assertEqual(users.get_rank(alice.pk), (2, 10.0))
+        self.assertAlmostEqual(self.index.get_score(group.pk), 10)
+        group.user_set.add(bob)
+        self.assertAlmostEqual(self.index.get_score(group.pk), 40)
+        bob.groups.clear()
+        self.assertAlmostEqual(self.index.get_score(group.pk), 10)
+        alice.delete()
+        self.assertEqual(len(users), 1)
+        self.assertEqual(len(self.index), 0)
+        bob.groups.add(group)
+        RankingEntry.objects.all().delete()
+        self.assertEqual(rebuild_rankings(), {"users": 1, "groups": 1})
+        self.assertAlmostEqual(self.index.get_score(group.pk), 30)
+
+    def test_reissued_user_ids(self):
+        """
+        Test that the activities and rank of a user follow a reissued id.
+        """
+        user = CustomUser.objects.create_user(
+            id=uuid4(), email="random@example.com", password=None
+        )
+        ingest_events(user, [make_event(0, quantity=100)])
+        call_command("reissue_user_ids", stdout=StringIO())
+        reissued = CustomUser.objects.get(email=user.email)
+        self.assertEqual(reissued.pk.version, 7)
+        self.assertEqual(Activity.objects.get().user, reissued)
+        self.assertTrue(FootprintRollup.objects.filter(user=reissued).exists())
+        users = RankingIndex(RankingEntry.Board.USERS)
+        self.assertEqual(users.get_rank(reissued.pk), (1, 10.0))
+        self.assertEqual(users.get_rank(user.pk), (2, 0.0))
+
+    def test_leaderboard_api(self):
+        """
+        Test the leaderboard and rank endpoints.
+        """
+        user = CustomUser.objects.create_user(
+            email="leader@example.com", password=None
+        )
+        group = Group.objects.create(name="Cyclists")
+        user.groups.add(group)
+        ingest_events(user, [make_event(0, quantity=100)])
+        self.client.force_login(user)
+        response = self.client.get(reverse("leaderboard_users"))
+        self.assertEqual(
+            response.json(), [{"rank": 1, "name": "L E", "score": 10.0}]
+        )
+        response = self.client.get(reverse("leaderboard_user_rank"))
+        self.assertEqual(response.json()["rank"], 1)
+        response = self.client.get(reverse("leaderboard_group_ranks"))
+        self.assertEqual(response.json()[0]["name"], "Cyclists")
+        response = self.client.get(reverse("leaderboard_groups"), {"limit": 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_leaderboard_cache_invalidation(self):
+        """
+        Test that cached leaderboards are invalidated by savings and names.
+        """
+        cache.clear()
+        user = CustomUser.objects.create_user(
+            email="cached@example.com", password=None
+        )
+        self.client.force_login(user)
+        url = reverse("leaderboard_users")
+        self.assertEqual(self.client.get(url).json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_events(user, [make_event(0, quantity=100)])
+        self.assertEqual(self.client.get(url).json()[0]["score"], 10.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = "Cached"
+            user.save(update_fields=["first_name"])
+        name = self.client.get(url).json()[0]["name"]
+        self.assertTrue(name.startswith("Cached"))
+
+
+class ReadJSONArrayTests(SimpleTestCase):
+    """
+    Test suite for the streaming JSON array reader.
+    """
+
+    def read(self, text, chunk_size=7):
+        """
+        Read a JSON array in small chunks.
+        """
+        return list(read_json_array(BytesIO(text.encode()), chunk_size))
+
+    def test_read_in_chunks(self):
+        """
+        Test that objects spanning chunks and multibyte characters are read.
+        """
+        events = [{"unit": "Δkm", "quantity": i} for i in range(20)]
+        self.assertEqual(
+            self.read(json.dumps(events, ensure_ascii=False)), events
+        )
+        self.assertEqual(self.read(" [ ] "), [])
+
+    def test_invalid_arrays(self):
+        """
+        Test that documents other than an array of objects are rejected.
+        """
+        for text in ("", "{}", "[1]", '[{"a": 1} {"b": 2}]', "[{}]]", "[{}"):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.read(text)
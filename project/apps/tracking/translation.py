@@ -0,0 +1,16 @@
+"""
+Module: tracking translation
+
+Registers the translated fields of the tracking models with modeltranslation.
+"""
+
+from modeltranslation.translator import TranslationOptions, register
+
+from .models import EmissionFactor
+
+
+@register(EmissionFactor)
+class EmissionFactorTranslationOptions(TranslationOptions):
+    """Translated fields of the EmissionFactor model."""
+
+    fields = ("name", "description")
@@ -0,0 +1,51 @@
+"""
+Module: tracking urls
+
+This module defines the URL patterns of the tracking API.
+"""
+
+from django.urls import path
+
+from .models import RankingEntry
+from .views import (
+    ActivityIngestView,
+    EmissionEstimateView,
+    FootprintView,
+    GroupRankView,
+    LeaderboardView,
+    UserRankView,
+)
+
+urlpatterns = [
+    path(
+        "activities/",
+        ActivityIngestView.as_view(),
+        name="activity_ingest",
+    ),
+    path(
+        "emissions/estimate/",
+        EmissionEstimateView.as_view(),
+        name="emission_estimate",
+    ),
+    path("footprint/", FootprintView.as_view(), name="footprint"),
+    path(
+        "leaderboard/users/",
+        LeaderboardView.as_view(board=RankingEntry.Board.USERS),
+        name="leaderboard_users",
+    ),
+    path(
+        "leaderboard/users/me/",
+        UserRankView.as_view(),
+        name="leaderboard_user_rank",
+    ),
+    path(
+        "leaderboard/groups/",
+        LeaderboardView.as_view(board=RankingEntry.Board.GROUPS),
+        name="leaderboard_groups",
+    ),
+    path(
+        "leaderboard/groups/mine/",
+        GroupRankView.as_view(),
+        name="leaderboard_group_ranks",
+    ),
+]
@@ -0,0 +1,218 @@
+"""
+Module: tracking views
+
+This module provides the activity, emission, footprint and leaderboard
+endpoints of the tracking API. The read endpoints are async views (see
+`core.views`) whose responses are cached (see `core.http_cache`), the
+writes run in transactions, which Django only supports synchronously.
+"""
+
+from dataclasses import asdict
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import router
+
+from drf_spectacular.utils import extend_schema
+from rest_framework.exceptions import ParseError
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.http_cache import ResponseCache
+from core.views import AsyncGenericAPIView
+
+from .factors import compute_emissions
+from .ingest import ingest_events
+from .models import FootprintRollup, RankingEntry
+from .parsers import JSONArrayParser, NDJSONParser
+from .ranking import LEADERBOARD_TAG, RankingIndex
+from .serializers import (
+    ActivityEventSerializer,
+    EmissionEstimateSerializer,
+    FootprintQuerySerializer,
+    FootprintRollupSerializer,
+    IngestResultSerializer,
+    LeaderboardQuerySerializer,
+    RankSerializer,
+)
+
+
+class ActivityIngestView(GenericAPIView):
+    """Record a batch of activities of the authenticated user."""
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONArrayParser, NDJSONParser]
+    serializer_class = ActivityEventSerializer
+
+    @extend_schema(
+        request={
+            "application/json": ActivityEventSerializer(many=True),
+            "application/x-ndjson": ActivityEventSerializer,
+        },
+        responses=IngestResultSerializer,
+    )
+    def post(self, request):
+        """
+        Record a batch of activities, sent as a JSON array or as newline
+        delimited JSON (`application/x-ndjson`).
+
+        Invalid activities are rejected and reported, the others are
+        recorded. Activities whose key was already recorded are skipped, so
+        a batch can safely be sent again, e.g. after the request failed.
+        """
+        try:
+            result = ingest_events(request.user, request.data)
+        except ValueError as exc:
+            raise ParseError(str(exc)) from exc
+        return Response(asdict(result))
+
+
+class FootprintView(AsyncGenericAPIView):
+    """
+    The footprint of the authenticated user over days, weeks or months.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = FootprintRollupSerializer
+    response_cache = ResponseCache()
+
+    async def get_rollups(self, params):
+        """Return the latest rollups of the requested period and range."""
+        rollups = FootprintRollup.objects.filter(
+            user=self.request.user, period=params["period"]
+        )
+        if "since" in params:
+            rollups = rollups.filter(start__gte=params["since"])
+        if "until" in params:
+            rollups = rollups.filter(start__lte=params["until"])
+        latest = rollups.order_by("-start")[: params["limit"]]
+        return sorted(
+            [rollup async for rollup in latest],
+            key=lambda rollup: rollup.start,
+        )
+
+    @extend_schema(
+        operation_id="api_v1_footprint_list",
+        parameters=[FootprintQuerySerializer],
+        responses=FootprintRollupSerializer(many=True),
+    )
+    async def get(self, request):
+        """
+        List the footprint of the latest days, weeks or months in
+        chronological order. Weeks start on Monday.
+        """
+        query = FootprintQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rollups = await self.get_rollups(query.validated_data)
+        return Response(self.get_serializer(rollups, many=True).data)
+
+
+class EmissionEstimateView(GenericAPIView):
+    """Estimate the footprint of activities without recording them."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = EmissionEstimateSerializer
+
+    @extend_schema(
+        request=EmissionEstimateSerializer(many=True),
+        responses=EmissionEstimateSerializer(many=True),
+    )
+    def post(self, request):
+        """
+        Compute the footprint of up to `TRACKING_ESTIMATE_MAX_ACTIVITIES`
+        activities from the emission factors in one call.
+        """
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            max_length=settings.TRACKING_ESTIMATE_MAX_ACTIVITIES,
+        )
+        serializer.is_valid(raise_exception=True)
+        activities = [
+            SimpleNamespace(**activity)
+            for activity in serializer.validated_data
+        ]
+        compute_emissions(activities)
+        return Response(self.get_serializer(activities, many=True).data)
+
+
+class LeaderboardView(AsyncGenericAPIView):
+    """The users or groups that saved the most CO2e."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = RankSerializer
+    board = RankingEntry.Board.USERS
+    response_cache = ResponseCache(tags=[LEADERBOARD_TAG])
+
+    def get_index(self):
+        """Return the ranking index of the board."""
+        return RankingIndex(self.board, router.db_for_read(RankingEntry))
+
+    async def get_names(self, ids):
+        """Return the names of the ranked users or groups by id."""
+        if self.board == RankingEntry.Board.USERS:
+            users = get_user_model().objects.filter(pk__in=ids)
+            return {
+                str(user.pk): user.get_full_name()
+                async for user in users.only("first_name", "last_name")
+            }
+        groups = Group.objects.filter(pk__in=ids).values_list("pk", "name")
+        return {str(pk): name async for pk, name in groups}
+
+    async def get_ranks(self, ranked):
+        """Serialize (rank, id, score) tuples."""
+        names = await self.get_names([entry for rank, entry, score in ranked])
+        return self.get_serializer(
+            [
+                {"rank": rank, "name": names.get(entry, ""), "score": score}
+                for rank, entry, score in ranked
+            ],
+            many=True,
+        ).data
+
+    @extend_schema(
+        parameters=[LeaderboardQuerySerializer],
+        responses=RankSerializer(many=True),
+    )
+    async def get(self, request):
+        """List the leaders in order of their savings."""
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        top = await self.get_index().aget_top(
+            query.validated_data["limit"], query.validated_data["offset"]
+        )
+        return Response(await self.get_ranks(top))
+
+
+class UserRankView(LeaderboardView):
+    """The rank of the authenticated user."""
+
+    @extend_schema(responses=RankSerializer)
+    async def get(self, request):
+        """Return the rank and savings of the authenticated user."""
+        rank, score = await self.get_index().aget_rank(request.user.pk)
+        ranks = await self.get_ranks([(rank, str(request.user.pk), score)])
+        return Response(ranks[0])
+
+
+class GroupRankView(LeaderboardView):
+    """The ranks of the groups of the authenticated user."""
+
+    board = RankingEntry.Board.GROUPS
+
+    @extend_schema(responses=RankSerializer(many=True))
+    async def get(self, request):
+        """Return the rank and savings of every group of the user."""
+        index = self.get_index()
+        groups = request.user.groups.values_list("pk", flat=True)
+        ranked = sorted(
+            [(*await index.aget_rank(pk), str(pk)) async for pk in groups]
+        )
+        return Response(
+            await self.get_ranks(
+                [(rank, pk, score) for rank, score, pk in ranked]
+            )
+        )
@@ -6,9 +6,14 @@ Provides admin configuration for the user app.
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils.translation import gettext_lazy as _
 
+from core.pagination import EstimatedCountPaginator, KeysetChangeList
+
+from .export import export_response
 from .forms import CustomUserChangeForm, CustomUserCreationForm
 from .models import CustomUser
+from .search import search_users
 
 
 @admin.register(CustomUser)
@@ -16,6 +21,11 @@ class CustomUserAdmin(UserAdmin):
     """Admin configuration for the CustomUser model."""
 
     search_fields = ("email", "first_name", "last_name")
+    # search with the full text indexes of the database, see users.search
+    indexed_search = True
+    # estimate the counts and page by email instead of counting all rows
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ["last_login", "date_joined", "is_superuser"]
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
@@ -24,6 +34,7 @@ class CustomUserAdmin(UserAdmin):
         "email",
         "get_full_name",
         "get_is_admin",
+        "get_group_names",
         "is_active",
     )
     list_filter = (
@@ -86,3 +97,35 @@ class CustomUserAdmin(UserAdmin):
         ),
     )
     ordering = ("email",)
+    actions = ["export_csv", "export_ndjson"]
+
+    def get_changelist(self, request, **kwargs):
+        """Use keyset pagination ordered by email."""
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search with the full text index, if there is one."""
+        if self.indexed_search and search_term:
+            results = search_users(queryset, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_queryset(self, request):
+        """Prefetch the groups shown in the changelist."""
+        return super().get_queryset(request).with_groups()
+
+    @admin.display(description=_("Groups"))
+    def get_group_names(self, obj):
+        """Returns the comma separated group names of the user."""
+        return ", ".join(obj.get_groups())
+
+    @admin.action(description=_("Export as CSV"), permissions=["view"])
+    def export_csv(self, request, queryset):
+        """Stream the selected users as CSV, see `users.export`."""
+        return export_response(request, queryset, "csv")
+
+    @admin.action(description=_("Export as NDJSON"), permissions=["view"])
+    def export_ndjson(self, request, queryset):
+        """Stream the selected users as NDJSON, see `users.export`."""
+        return export_response(request, queryset, "ndjson")
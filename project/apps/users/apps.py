@@ -13,3 +13,8 @@ class UsersConfig(AppConfig):
 
     name = "users"
     verbose_name = _("Users")
+
+    def ready(self):
+        """Connect the signal receivers of the app."""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa: F401
@@ -0,0 +1,116 @@
+"""
+Module: user authentication
+
+This module provides the authentication of the mobile API with the signed
+access tokens of `users.tokens`. Users are resolved through an in-process
+cache, so an authenticated request usually runs no database query at all.
+Async API views (see `core.views`) authenticate in the event loop with
+`aauthenticate`.
+"""
+
+from django.utils.translation import gettext_lazy as _
+
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.authentication import (
+    BaseAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from .caches import api_user_cache
+from .models import CustomUser
+from .tokens import ACCESS, TokenError, get_auth_hash, verify_token
+
+
+def get_api_user(user_id):
+    """
+    Get a user by id, from the in-process cache if possible.
+
+    Args:
+        user_id (str): The id of the user.
+
+    Returns:
+        CustomUser: The user, or None if it does not exist.
+    """
+    user, version = api_user_cache.get(user_id)
+    if user is None:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        if user is not None:
+            api_user_cache.set(user, version)
+    return user
+
+
+async def aget_api_user(user_id):
+    """Async version of `get_api_user`."""
+    user, version = api_user_cache.get(user_id)
+    if user is None:
+        user = await CustomUser.objects.filter(pk=user_id).afirst()
+        if user is not None:
+            api_user_cache.set(user, version)
+    return user
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate requests with a signed access token.
+
+    Clients send the token in the "Authorization" header:
+
+        Authorization: Bearer <access token>
+
+    The token payload is available as `request.auth`.
+    """
+
+    keyword = "Bearer"
+
+    def get_payload(self, request):
+        """Return the verified token payload, or None without token."""
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed(_("Invalid token header."))
+        try:
+            return verify_token(header[1].decode(), ACCESS)
+        except (TokenError, UnicodeError) as exc:
+            raise AuthenticationFailed(exc) from exc
+
+    def check_user(self, user, payload):
+        """Check that the user of a token may still use it."""
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_("User is inactive or deleted."))
+        if get_auth_hash(user) != payload["auth"]:
+            raise AuthenticationFailed(_("Token is invalid."))
+
+    def authenticate(self, request):
+        """Return the user and the token payload, or None without token."""
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+        user = get_api_user(payload["sub"])
+        self.check_user(user, payload)
+        return user, payload
+
+    async def aauthenticate(self, request):
+        """Async version of `authenticate`."""
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+        user = await aget_api_user(payload["sub"])
+        self.check_user(user, payload)
+        return user, payload
+
+    def authenticate_header(self, request):
+        """Return the WWW-Authenticate header of 401 responses."""
+        return f'{self.keyword} realm="api"'
+
+
+class SignedTokenScheme(OpenApiAuthenticationExtension):
+    """Describes `SignedTokenAuthentication` in the OpenAPI schema."""
+
+    target_class = SignedTokenAuthentication
+    name = "signedToken"
+
+    def get_security_definition(self, auto_schema):
+        """Return the security scheme of the signed tokens."""
+        return {"type": "http", "scheme": "bearer"}
@@ -0,0 +1,94 @@
+"""
+Module: user backends
+
+This module provides the authentication backend of the project. It
+authenticates like Django's `ModelBackend`, and adds an async path for the
+async login views, which hashes on the hashing executor (see
+`users.hashing`) instead of the event loop or the thread of the
+synchronous views. Both paths look the email address up ignoring case,
+with the unique index on its lowercase (see
+`CustomUserQuerySet.filter_email`).
+"""
+
+import inspect
+
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.views.decorators.debug import sensitive_variables
+
+from asgiref.sync import sync_to_async
+
+from .hashing import amake_password
+from .models import CustomUser
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate users by email and password."""
+
+    async def aauthenticate(self, request, password=None, **credentials):
+        """
+        Async version of `authenticate`.
+
+        Raises:
+            HashingBusy: If too many hash operations are pending.
+        """
+        del request
+        email = credentials.get(
+            CustomUser.USERNAME_FIELD, credentials.get("username")
+        )
+        if email is None or password is None:
+            return None
+        try:
+            user = await CustomUser.objects.filter_email(email).aget()
+        except CustomUser.DoesNotExist:
+            # hash anyway, so that unknown emails take as long as known ones
+            await amake_password(password)
+            return None
+        if await user.acheck_password(password) and (
+            self.user_can_authenticate(user)
+        ):
+            return user
+        return None
+
+
+@sensitive_variables("credentials")
+async def aauthenticate(request=None, **credentials):
+    """
+    Authenticate like `django.contrib.auth.authenticate`, awaiting the
+    backends that have an async path instead of running all of them in a
+    thread like `django.contrib.auth.aauthenticate`. A backend is skipped if
+    its signature does not take the credentials, and a `PermissionDenied`
+    of a backend stops the authentication.
+
+    Raises:
+        HashingBusy: If too many hash operations are pending.
+    """
+    # pylint: disable-next=protected-access
+    for backend, backend_path in auth._get_backends(return_tuples=True):
+        authenticate = getattr(backend, "aauthenticate", None)
+        if authenticate is None:
+            signature = inspect.signature(backend.authenticate)
+            authenticate = sync_to_async(backend.authenticate)
+        else:
+            signature = inspect.signature(authenticate)
+        try:
+            signature.bind(request, **credentials)
+        except TypeError:
+            continue
+        try:
+            user = await authenticate(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is None:
+            continue
+        user.backend = backend_path
+        return user
+    await user_login_failed.asend(
+        sender=auth.__name__,
+        # pylint: disable-next=protected-access
+        credentials=auth._clean_credentials(credentials),
+        request=request,
+    )
+    return None
@@ -0,0 +1,167 @@
+"""
+Module: user caches
+
+This module provides the cache keys and invalidation helpers for data that
+is derived from a user, such as the names of the groups a user belongs to,
+and the in-process cache of users authenticated by API tokens.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import record_cache
+
+# seconds a cached list of group names is kept
+GROUP_NAMES_TIMEOUT = 60 * 60
+
+
+def group_names_key(user_id):
+    """
+    Build the cache key for the group names of a user.
+
+    Args:
+        user_id (UUID): The id of the user.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"users:group-names:{user_id}"
+
+
+def get_group_names(user_id):
+    """
+    Get the cached group names of a user.
+
+    Args:
+        user_id (UUID): The id of the user.
+
+    Returns:
+        list: The group names, or None if they are not cached.
+    """
+    names = cache.get(group_names_key(user_id))
+    record_cache("group_names", names is not None)
+    return names
+
+
+def set_group_names(user_id, names):
+    """
+    Cache the group names of a user.
+
+    Args:
+        user_id (UUID): The id of the user.
+        names (list): The group names.
+    """
+    cache.set(group_names_key(user_id), names, GROUP_NAMES_TIMEOUT)
+
+
+def invalidate_group_names(user_ids):
+    """
+    Drop the cached group names of the given users.
+
+    Args:
+        user_ids (iterable): The ids of the users.
+    """
+    cache.delete_many([group_names_key(user_id) for user_id in user_ids])
+
+
+def api_user_version_key(user_id):
+    """
+    Build the cache key for the version of a user in the API user cache.
+
+    Args:
+        user_id (UUID): The id of the user.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"users:api-user-version:{user_id}"
+
+
+class UserCache:
+    """
+    Bounded, thread-safe in-process cache of users, keyed by their id.
+
+    Users are evicted least recently used first once `API_USER_CACHE_SIZE`
+    is reached, and expire after `API_USER_CACHE_TIMEOUT` seconds.
+
+    Every entry holds the version of the user in the shared Django cache
+    when it was loaded. Invalidating a user replaces that version, and
+    every hit compares it, so a saved or deleted user is dropped by all
+    processes on their next request, not only by the one that changed it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, user_id):
+        """
+        Get a cached user.
+
+        The version is read before the user is loaded on a miss, and passed
+        to `set`, so that a change in between is not cached as current.
+
+        Args:
+            user_id (str): The id of the user.
+
+        Returns:
+            tuple: The user, or None if it is not cached, expired or
+                changed, and the current version of the user.
+        """
+        version = cache.get(api_user_version_key(user_id))
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and (
+                entry[1] < time.monotonic() or entry[2] != version
+            ):
+                del self._users[user_id]
+                entry = None
+            if entry is not None:
+                self._users.move_to_end(user_id)
+        record_cache("api_user", entry is not None)
+        return (None if entry is None else entry[0]), version
+
+    def set(self, user, version):
+        """
+        Cache a user.
+
+        Args:
+            user (CustomUser): The user.
+            version (str): The version of the user returned by `get`
+                before the user was loaded.
+        """
+        expires = time.monotonic() + settings.API_USER_CACHE_TIMEOUT
+        with self._lock:
+            self._users[str(user.pk)] = (user, expires, version)
+            self._users.move_to_end(str(user.pk))
+            while len(self._users) > settings.API_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """
+        Drop a user from the cache of all processes.
+
+        Args:
+            user_id (UUID): The id of the user.
+        """
+        # the version outlives the entries of the other processes
+        cache.set(
+            api_user_version_key(user_id),
+            uuid4().hex,
+            settings.API_USER_CACHE_TIMEOUT,
+        )
+        with self._lock:
+            self._users.pop(str(user_id), None)
+
+    def clear(self):
+        """Drop all users from the cache."""
+        with self._lock:
+            self._users.clear()
+
+
+api_user_cache = UserCache()
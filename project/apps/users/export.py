@@ -0,0 +1,214 @@
+"""
+Module: user export
+
+This module exports users, with their group names and admin flag, as CSV
+or NDJSON. The users are read in chunks, with a server-side cursor where
+the database has one, and written chunk by chunk, so the memory of an
+export does not grow with the number of users.
+
+The header of a CSV export holds the names of the columns in the active
+language. Its cells that a spreadsheet would run as a formula are quoted,
+the values of NDJSON exports are not changed. The keys of an NDJSON export
+are the column keys of `EXPORT_COLUMNS`, which do not change with the
+language.
+"""
+
+import csv
+import json
+from io import StringIO
+from itertools import islice
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from asgiref.sync import sync_to_async
+
+from .models import CustomUser
+
+# the users read and written at once
+EXPORT_CHUNK_SIZE = 2000
+
+# the content types of the export formats
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# the first characters of a text that spreadsheets run as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# the columns of an export and the model fields they read
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("email", "email"),
+    ("first_name", "first_name"),
+    ("last_name", "last_name"),
+    ("is_active", "is_active"),
+    ("is_admin", "is_superuser"),
+    ("groups", None),
+    ("date_joined", "date_joined"),
+    ("last_login", "last_login"),
+)
+
+
+def get_column_names():
+    """
+    Name the export columns in the active language, like the admin does.
+
+    Returns:
+        list: The column names.
+    """
+    names = []
+    for key, field in EXPORT_COLUMNS:
+        if key == "is_admin":
+            name = CustomUser.get_is_admin.short_description
+        elif key == "groups":
+            name = CustomUser.get_groups.short_description
+        else:
+            name = CustomUser._meta.get_field(field).verbose_name
+        names.append(str(name))
+    return names
+
+
+def format_value(value):
+    """Format a value for a CSV cell."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ", ".join(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def escape_formula(text):
+    """
+    Escape a CSV cell that a spreadsheet would run as a formula, e.g. a
+    name starting with "=", by prefixing it with a quote.
+    """
+    return f"'{text}" if text.startswith(FORMULA_PREFIXES) else text
+
+
+def get_group_names(user_ids):
+    """
+    Read the group names of users with a single query.
+
+    Args:
+        user_ids (list): The ids of the users.
+
+    Returns:
+        dict: The sorted group names by user id, of users with groups.
+    """
+    memberships = (
+        CustomUser.groups.through.objects.filter(customuser_id__in=user_ids)
+        .order_by("group__name")
+        .values_list("customuser_id", "group__name")
+    )
+    names = {}
+    for user_id, name in memberships:
+        names.setdefault(user_id, []).append(name)
+    return names
+
+
+def export_users(queryset, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Export users chunk by chunk.
+
+    The users are read as rows instead of model instances and the group
+    names of a chunk with one query. The admin flag is the superuser flag,
+    like `CustomUser.get_is_admin`.
+
+    The column names are read when the export is created, so that they
+    follow the language that is active then, e.g. of the request, even if
+    the chunks are written later.
+
+    Args:
+        queryset (QuerySet): The users to export.
+        file_format (str): Either "csv" or "ndjson".
+        chunk_size (int): The users read and written at once.
+
+    Returns:
+        iterator: The text of the export, a chunk of users at a time.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    header = get_column_names() if file_format == "csv" else None
+    fields = [field for _key, field in EXPORT_COLUMNS if field]
+    # rows cannot be prefetched into, e.g. the groups of the admin queryset
+    rows = (
+        queryset.prefetch_related(None)
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    return _write_chunks(rows, header, chunk_size)
+
+
+def _write_chunks(rows, header, chunk_size):
+    """Write the rows as CSV if there is a header, else as NDJSON."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    keys = [key for key, _field in EXPORT_COLUMNS]
+    groups = keys.index("groups")
+    while chunk := list(islice(rows, chunk_size)):
+        names = get_group_names([row[0] for row in chunk])
+        for row in chunk:
+            values = list(row)
+            values.insert(groups, names.get(row[0], []))
+            if header is not None:
+                writer.writerow(
+                    [escape_formula(format_value(value)) for value in values]
+                )
+            else:
+                buffer.write(
+                    json.dumps(dict(zip(keys, values)), default=format_value)
+                    + "\n"
+                )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # the header of an export without users
+        yield buffer.getvalue()
+
+
+async def _aiterate(chunks):
+    """
+    Iterate the chunks of an export in the thread of synchronous code.
+
+    Django reads a synchronous iterator of a streaming response into a list
+    under ASGI, which would hold the whole export in memory.
+    """
+    chunks = iter(chunks)
+    end = object()
+    while (chunk := await sync_to_async(next)(chunks, end)) is not end:
+        yield chunk
+
+
+def export_response(request, queryset, file_format):
+    """
+    Stream an export of users as a download.
+
+    Args:
+        request (HttpRequest): The request.
+        queryset (QuerySet): The users to export.
+        file_format (str): Either "csv" or "ndjson".
+
+    Returns:
+        StreamingHttpResponse: The export.
+    """
+    chunks = export_users(queryset, file_format)
+    if isinstance(request, ASGIRequest):
+        chunks = _aiterate(chunks)
+    return StreamingHttpResponse(
+        chunks,
+        content_type=f"{EXPORT_FORMATS[file_format]}; charset=utf-8",
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="users.{file_format}"'
+            )
+        },
+    )
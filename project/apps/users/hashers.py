@@ -0,0 +1,75 @@
+"""
+Module: user hashers
+
+This module provides the password hashers of the project: Django's hashers,
+adding the time spent hashing to the request metrics (see `core.metrics`).
+The preferred hasher takes its cost parameters, e.g. the PBKDF2 iterations,
+from `PASSWORD_HASHER_COST` (see `config.hashers`). A password hashed with
+another cost is rehashed by Django on the next successful login. The
+algorithms and encoded passwords are otherwise unchanged.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from core.metrics import timed
+
+
+class CostHasherMixin:
+    """Set the cost parameters of the preferred hasher from the settings."""
+
+    def __init__(self):
+        super().__init__()
+        path = f"{type(self).__module__}.{type(self).__qualname__}"
+        if settings.PASSWORD_HASHERS[0] == path:
+            for name, value in settings.PASSWORD_HASHER_COST.items():
+                setattr(self, name, value)
+
+
+class TimedHasherMixin:
+    """Time the hashing of a password hasher."""
+
+    def encode(self, password, salt, *args, **kwargs):
+        """Hash a password."""
+        with timed("hashing"):
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        """Check a password against its encoded hash."""
+        with timed("hashing"):
+            return super().verify(password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        """Hash the missing iterations of an outdated hash."""
+        with timed("hashing"):
+            return super().harden_runtime(password, encoded)
+
+
+class PBKDF2PasswordHasher(
+    CostHasherMixin, TimedHasherMixin, hashers.PBKDF2PasswordHasher
+):
+    """`PBKDF2PasswordHasher`, timed and with a configurable cost."""
+
+
+class PBKDF2SHA1PasswordHasher(
+    CostHasherMixin, TimedHasherMixin, hashers.PBKDF2SHA1PasswordHasher
+):
+    """`PBKDF2SHA1PasswordHasher`, timed and with a configurable cost."""
+
+
+class Argon2PasswordHasher(
+    CostHasherMixin, TimedHasherMixin, hashers.Argon2PasswordHasher
+):
+    """`Argon2PasswordHasher`, timed and with a configurable cost."""
+
+
+class BCryptSHA256PasswordHasher(
+    CostHasherMixin, TimedHasherMixin, hashers.BCryptSHA256PasswordHasher
+):
+    """`BCryptSHA256PasswordHasher`, timed and with a configurable cost."""
+
+
+class ScryptPasswordHasher(
+    CostHasherMixin, TimedHasherMixin, hashers.ScryptPasswordHasher
+):
+    """`ScryptPasswordHasher`, timed and with a configurable cost."""
@@ -0,0 +1,217 @@
+"""
+Module: user hashing
+
+This module provides helpers to hash passwords outside of the request or
+save path. Hashing is CPU bound, so bulk operations spread it across a
+process pool instead of hashing one password after another.
+
+Async logins hash on a bounded executor instead of the event loop (see
+`averify_password`), threads by default, since hashlib and argon2 release
+the GIL while hashing. At most `PASSWORD_HASHING_MAX_PENDING` operations
+run or wait at once; beyond that `HashingBusy` is raised, so that a login
+storm is answered quickly instead of queueing up behind the executor.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+from core.metrics import timed
+
+# number of chunks a batch of passwords is split into for the pool
+HASHING_CHUNKS = 64
+
+
+def _init_worker():
+    """
+    Initialise a pool worker.
+
+    Workers started with the "spawn" method (the default on macOS) do not
+    inherit the configured Django app registry, so it is set up again.
+    """
+    django.setup()
+
+
+def get_worker_count(workers=None):
+    """
+    Resolve the number of hashing workers.
+
+    Args:
+        workers (int, optional): The requested number of workers. Defaults
+            to the number of available CPUs.
+
+    Returns:
+        int: The number of workers to use, at least 1.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+def create_hashing_pool(workers=None):
+    """
+    Create a process pool for password hashing.
+
+    Args:
+        workers (int, optional): The number of worker processes.
+
+    Returns:
+        ProcessPoolExecutor: The pool, or None if a single worker is
+        requested and hashing should run in the current process.
+    """
+    workers = get_worker_count(workers)
+    if workers == 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def hash_passwords(passwords, pool=None):
+    """
+    Hash a sequence of raw passwords.
+
+    Args:
+        passwords (list): The raw passwords. ``None`` entries produce an
+            unusable password, like ``set_password(None)``.
+        pool (ProcessPoolExecutor, optional): The pool to hash on. If not
+            given, the passwords are hashed in the current process.
+
+    Returns:
+        list: The encoded passwords, in the same order as the input.
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # hand out small chunks so that all workers stay busy until the end
+    chunksize = max(1, len(passwords) // HASHING_CHUNKS)
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+class HashingBusy(RuntimeError):
+    """Raised when too many hash operations are pending."""
+
+
+class HashingExecutor:
+    """
+    The executor of the async hash operations of a process, with a limit
+    on the operations pending at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+
+    def get_executor(self):
+        """
+        Return the executor, started on first use in every process.
+
+        Returns:
+            Executor: The pool, or None to hash on the calling thread.
+        """
+        kind = settings.PASSWORD_HASHING_EXECUTOR
+        if kind == "inline":
+            return None
+        with self._lock:
+            # pools do not survive a fork, so every worker starts one
+            if self._executor is None or self._pid != os.getpid():
+                workers = get_worker_count(
+                    settings.PASSWORD_HASHING_WORKERS or None
+                )
+                if kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers, initializer=_init_worker
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="hashing"
+                    )
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        """Stop the executor, e.g. after the settings changed."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one of the `PASSWORD_HASHING_MAX_PENDING` slots.
+
+        Raises:
+            HashingBusy: If all slots are taken.
+        """
+        with self._lock:
+            if self._pending >= settings.PASSWORD_HASHING_MAX_PENDING:
+                raise HashingBusy
+            self._pending += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, func, *args):
+        """
+        Run a hash operation on the executor.
+
+        Args:
+            func (callable): The operation, a module level function for
+                the process executor.
+            *args: The arguments of the operation.
+
+        Returns:
+            object: The result of the operation.
+
+        Raises:
+            HashingBusy: If too many operations are pending.
+        """
+        with self.slot():
+            executor = self.get_executor()
+            if executor is None:
+                return func(*args)
+            # the hashers run without the request context, so the request
+            # is charged with the time it waits for its hash instead
+            with timed("hashing"):
+                return await asyncio.get_running_loop().run_in_executor(
+                    executor, func, *args
+                )
+
+
+hashing_executor = HashingExecutor()
+
+
+async def averify_password(password, encoded):
+    """
+    Check a password against its hash on the hashing executor.
+
+    Args:
+        password (str): The raw password.
+        encoded (str): The encoded password.
+
+    Returns:
+        tuple: Whether the password is correct and whether its hash has to
+        be updated to the preferred hasher and cost.
+
+    Raises:
+        HashingBusy: If too many hash operations are pending.
+    """
+    return await hashing_executor.run(verify_password, password, encoded)
+
+
+async def amake_password(password):
+    """
+    Hash a password on the hashing executor, see `make_password`.
+
+    Raises:
+        HashingBusy: If too many hash operations are pending.
+    """
+    return await hashing_executor.run(make_password, password)
@@ -0,0 +1,162 @@
+"""
+Module: user ids
+
+This module reissues the random (version 4) ids of existing users as
+time-ordered ids (version 7, see `core.fields.uuid7`) carrying the time the
+users joined, so that the primary key index of users created before
+`UUID7Field` holds them in the order they joined as well.
+
+The id of a user is replaced in every column referencing it: the foreign
+keys of other models, including the many to many tables of Django's auth
+app, the object ids of the admin log, which are text, and, on SQLite, the
+full text search index of `users.search`. Other references, like the
+leaderboards of the tracking app, are updated by the receivers of the
+`user_ids_reissued` signal.
+
+The running workers keep the users they authenticated by token in their
+own memory (see `users.caches.api_user_cache`). The reissued users of a
+batch are invalidated in the shared cache once it is committed, so the
+workers load them again, by the id that no longer exists, on their next
+request.
+"""
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router, transaction
+from django.db.models import Case, Value, When
+from django.dispatch import Signal
+
+from core.fields import uuid7
+
+from .caches import api_user_cache
+from .models import CustomUser
+from .search import FTS_TABLE
+
+# sent with the reissued ids of a batch, as `ids` ({old id: new id}), and the
+# database alias, as `using`, inside the transaction of the batch
+user_ids_reissued = Signal()
+
+# the users per batch; a statement holds 3 parameters per user, which stays
+# below the 999 parameters of older SQLite versions
+REISSUE_BATCH_SIZE = 300
+
+
+def get_references(using):
+    """
+    List the columns referencing the id of a user.
+
+    Args:
+        using (str): The database alias.
+
+    Returns:
+        list: The (table, column) pairs.
+    """
+    references = [
+        (relation.related_model._meta.db_table, relation.field.column)
+        for relation in CustomUser._meta.get_fields(include_hidden=True)
+        if relation.auto_created
+        and not relation.concrete
+        and (relation.one_to_many or relation.one_to_one)
+    ]
+    if connections[using].vendor == "sqlite":
+        references.append((FTS_TABLE, "id"))
+    references.append((CustomUser._meta.db_table, CustomUser._meta.pk.column))
+    return references
+
+
+def replace_ids(table, column, ids, connection):
+    """
+    Replace ids in a column with a single statement.
+
+    Args:
+        table (str): The table.
+        column (str): The column.
+        ids (dict): The new ids by old id.
+        connection (DatabaseWrapper): The database connection.
+    """
+    prep = CustomUser._meta.pk.get_db_prep_value
+    quote = connection.ops.quote_name
+    params = []
+    for old, new in ids.items():
+        params += [prep(old, connection), prep(new, connection)]
+    params += [prep(old, connection) for old in ids]
+    column = quote(column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {quote(table)} SET {column} = CASE {column} "
+            + "WHEN %s THEN %s " * len(ids)
+            + f"END WHERE {column} IN ({placeholders})",
+            params,
+        )
+
+
+def replace_log_entry_ids(ids, using):
+    """
+    Replace ids in the object ids of the admin log entries of users.
+
+    Args:
+        ids (dict): The new ids by old id.
+        using (str): The database alias.
+    """
+    content_type = ContentType.objects.db_manager(using).get_for_model(
+        CustomUser
+    )
+    LogEntry.objects.using(using).filter(
+        content_type=content_type, object_id__in=[str(old) for old in ids]
+    ).update(
+        object_id=Case(
+            *[
+                When(object_id=str(old), then=Value(str(new)))
+                for old, new in ids.items()
+            ]
+        )
+    )
+
+
+def reissue_user_ids(batch_size=REISSUE_BATCH_SIZE, using=None):
+    """
+    Reissue the ids of users that are not time-ordered.
+
+    Every batch is reissued in its own transaction. The foreign keys of
+    Django are checked at the end of a transaction, so a batch updates the
+    references before the users themselves.
+
+    Sessions and tokens hold the id of their user, so the reissued users
+    are signed out.
+
+    Args:
+        batch_size (int): The users per batch.
+        using (str, optional): The database alias, defaults to the database
+            users are written to.
+
+    Yields:
+        dict: The new ids by old id of every batch.
+    """
+    using = using or router.db_for_write(CustomUser)
+    connection = connections[using]
+    references = get_references(using)
+    users = CustomUser.objects.using(using).order_by("pk")
+    last = None
+    while True:
+        batch = users.filter(pk__gt=last) if last else users
+        batch = list(batch.values_list("pk", "date_joined")[:batch_size])
+        if not batch:
+            return
+        # the reissued ids of earlier batches may be visited again
+        last = batch[-1][0]
+        ids = {
+            pk: uuid7(date_joined.timestamp())
+            for pk, date_joined in batch
+            if pk.version != 7
+        }
+        if not ids:
+            continue
+        with transaction.atomic(using=using):
+            for table, column in references:
+                replace_ids(table, column, ids, connection)
+            replace_log_entry_ids(ids, using)
+            user_ids_reissued.send(sender=CustomUser, ids=ids, using=using)
+        for old in ids:
+            api_user_cache.invalidate(old)
+        yield ids
@@ -0,0 +1,177 @@
+"""
+Module: benchmark_login
+
+Provides a management command that sends concurrent logins to the token
+endpoint through the ASGI application in-process, hashing on the event loop
+and on the thread and process executors of `users.hashing`, and reports
+their throughput, latency and how long the event loop was blocked.
+"""
+
+import asyncio
+import json
+from statistics import quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from asgiref.sync import async_to_sync
+
+from core.benchmark import asgi_request
+from users.hashing import hashing_executor
+from users.models import CustomUser
+
+# password of the benchmark user
+PASSWORD = "benchmark-password"
+# seconds between two ticks of the event loop lag probe
+TICK = 0.001
+
+
+class Command(BaseCommand):
+    """Benchmark concurrent logins per hashing executor."""
+
+    help = (
+        "Send concurrent token logins through config.asgi with every "
+        "PASSWORD_HASHING_EXECUTOR and report logins/second, p50 and p99 "
+        "latency, rejected logins and the longest event loop stall. The "
+        "user is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--logins",
+            type=int,
+            default=200,
+            help="The number of logins per executor.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="The number of clients logging in at once.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="The number of hashing workers, 0 for the CPUs.",
+        )
+        parser.add_argument(
+            "--max-pending",
+            type=int,
+            default=64,
+            help="The PASSWORD_HASHING_MAX_PENDING limit.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        # pylint: disable=import-outside-toplevel
+        from config.asgi import application
+
+        self.stdout.write(
+            f"{options['logins']} logins, {options['concurrency']} clients"
+        )
+        self.stdout.write(
+            f"{'executor':10}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'rejected':>10}{'stall ms':>10}"
+        )
+        # the connection has to stay open for the rolled back transaction
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with translation.override("en"), transaction.atomic():
+                user = CustomUser.objects.create_user(
+                    email="login@benchmark.invalid", password=PASSWORD
+                )
+                body = json.dumps(
+                    {"email": user.email, "password": PASSWORD}
+                ).encode()
+                for executor in ("inline", "thread", "process"):
+                    with override_settings(
+                        DEBUG=False,
+                        PASSWORD_HASHING_EXECUTOR=executor,
+                        PASSWORD_HASHING_WORKERS=options["workers"],
+                        PASSWORD_HASHING_MAX_PENDING=options["max_pending"],
+                    ):
+                        # the executor starts again with the settings
+                        hashing_executor.shutdown()
+                        self.report(
+                            executor,
+                            *async_to_sync(self.run)(
+                                application, body, options
+                            ),
+                        )
+                transaction.set_rollback(True)
+        finally:
+            hashing_executor.shutdown()
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+    async def run(self, application, body, options):
+        """
+        Send the logins from concurrent clients.
+
+        Returns:
+            tuple: The elapsed seconds, the latencies of the successful
+            logins, the number of rejected logins and the longest stall of
+            the event loop in seconds.
+        """
+        path = reverse("token_obtain")
+        headers = {"content-type": "application/json"}
+        # the first login starts the executor
+        await asgi_request(application, path, "", "POST", headers, body)
+        pending = iter(range(options["logins"]))
+        latencies = []
+        rejected = 0
+        stall = 0.0
+        done = asyncio.Event()
+
+        async def client():
+            nonlocal rejected
+            for _ in pending:
+                start = perf_counter()
+                status = await asgi_request(
+                    application, path, "", "POST", headers, body
+                )
+                if status == 503:
+                    rejected += 1
+                elif status != 200:
+                    raise CommandError(f"Login failed with status {status}")
+                else:
+                    latencies.append(perf_counter() - start)
+
+        async def probe():
+            # a tick arriving late means the loop was busy in between
+            nonlocal stall
+            while not done.is_set():
+                start = perf_counter()
+                await asyncio.sleep(TICK)
+                stall = max(stall, perf_counter() - start - TICK)
+
+        probe_task = asyncio.ensure_future(probe())
+        start = perf_counter()
+        await asyncio.gather(
+            *(client() for _ in range(options["concurrency"]))
+        )
+        elapsed = perf_counter() - start
+        done.set()
+        await probe_task
+        return elapsed, latencies, rejected, stall
+
+    def report(self, executor, elapsed, latencies, rejected, stall):
+        """Write the results of an executor."""
+        throughput = len(latencies) / elapsed
+        if len(latencies) < 2:
+            # too few logins got through for percentiles
+            latencies = [float("nan")] * 2
+        percentiles = quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{executor:10}{throughput:10.1f}"
+            f"{percentiles[49] * 1000:10.1f}{percentiles[98] * 1000:10.1f}"
+            f"{rejected:10}{stall * 1000:10.1f}"
+        )
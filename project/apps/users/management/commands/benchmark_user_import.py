@@ -0,0 +1,81 @@
+"""
+Module: benchmark_user_import
+
+Provides a management command that compares the throughput of
+`CustomUserManager.create_user` with `CustomUserManager.bulk_create_users`.
+"""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """Benchmark one-at-a-time against bulk user creation."""
+
+    help = (
+        "Report users/second for create_user and bulk_create_users. All "
+        "users are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=500,
+            help="The number of users to create per run.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The batch size for bulk creation.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="The number of hashing processes, defaults to the CPUs.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        count = options["count"]
+        rows = [
+            {"email": f"bench{i}@Example.COM", "password": f"secret-{i}"}
+            for i in range(count)
+        ]
+        single = self._measure(
+            lambda: [CustomUser.objects.create_user(**row) for row in rows]
+        )
+        bulk = self._measure(
+            lambda: CustomUser.objects.bulk_create_users(
+                rows,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+            )
+        )
+        self.stdout.write(f"create_user:       {count / single:10.1f} users/s")
+        self.stdout.write(f"bulk_create_users: {count / bulk:10.1f} users/s")
+        self.stdout.write(f"speedup:           {single / bulk:10.1f}x")
+
+    @staticmethod
+    def _measure(func):
+        """
+        Time a function inside a rolled back transaction.
+
+        Args:
+            func (callable): The function to time.
+
+        Returns:
+            float: The elapsed time in seconds.
+        """
+        with transaction.atomic():
+            start = perf_counter()
+            func()
+            elapsed = perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
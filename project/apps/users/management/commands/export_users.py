@@ -0,0 +1,65 @@
+"""
+Module: export_users
+
+Provides a management command to export users as CSV or NDJSON, see
+`users.export`.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import translation
+
+from users.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_users
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """Export users as CSV or NDJSON."""
+
+    help = (
+        "Export users with their group names and admin flag as CSV or "
+        "NDJSON. The users are streamed in chunks, so the memory does not "
+        "grow with their number."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "path",
+            nargs="?",
+            help="The file to write, defaults to the standard output.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+            help="The export format.",
+        )
+        parser.add_argument(
+            "--language",
+            default=settings.LANGUAGE_CODE,
+            help="The language of the CSV header.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="The users read and written at once.",
+        )
+
+    def handle(self, *args, **options):
+        """Export the users."""
+        if options["chunk_size"] < 1:
+            raise CommandError("The chunk size must be positive.")
+        with translation.override(options["language"]):
+            chunks = export_users(
+                CustomUser.objects.order_by("pk"),
+                options["format"],
+                options["chunk_size"],
+            )
+        if options["path"] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["path"], "w", encoding="utf-8", newline="") as file:
+            file.writelines(chunks)
@@ -0,0 +1,120 @@
+"""
+Module: import_users
+
+Provides a management command to bulk import users from a CSV or NDJSON
+file.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import CustomUser
+
+# columns, besides email and password, that may be set by an import
+IMPORT_FIELDS = (
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_active",
+    "is_superuser",
+)
+BOOLEAN_FIELDS = ("is_staff", "is_active", "is_superuser")
+TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+def parse_row(row):
+    """
+    Reduce a raw import row to the fields a user may be created with.
+
+    Args:
+        row (dict): The row as read from the file.
+
+    Returns:
+        dict: The email, password and known fields of the row.
+    """
+    user = {"email": row.get("email"), "password": row.get("password")}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if value in (None, ""):
+            continue
+        if field in BOOLEAN_FIELDS and isinstance(value, str):
+            value = value.strip().lower() in TRUE_VALUES
+        user[field] = value
+    return user
+
+
+def read_rows(file, file_format):
+    """
+    Lazily read the rows of an import file.
+
+    Args:
+        file (file): The opened import file.
+        file_format (str): Either "csv" or "ndjson".
+
+    Yields:
+        dict: The parsed rows.
+    """
+    if file_format == "csv":
+        for row in csv.DictReader(file):
+            yield parse_row(row)
+        return
+    for line in file:
+        if line.strip():
+            yield parse_row(json.loads(line))
+
+
+class Command(BaseCommand):
+    """Bulk import users from a CSV or NDJSON file."""
+
+    help = (
+        "Bulk import users from a CSV or NDJSON file. The file is streamed "
+        "and the passwords are hashed across a process pool."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument("path", help="The CSV or NDJSON file.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "ndjson"),
+            help="The file format, guessed from the extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of users hashed and inserted at once.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="The number of hashing processes, defaults to the CPUs.",
+        )
+        parser.add_argument(
+            "--ignore-conflicts",
+            action="store_true",
+            help="Skip users whose email already exists.",
+        )
+
+    def handle(self, *args, **options):
+        """Import the users."""
+        path = Path(options["path"])
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format in ("json", "jsonl"):
+            file_format = "ndjson"
+        if file_format not in ("csv", "ndjson"):
+            raise CommandError(f"Unknown import format: {file_format}")
+        try:
+            with path.open(encoding="utf-8", newline="") as file:
+                total = CustomUser.objects.bulk_create_users(
+                    read_rows(file, file_format),
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                    ignore_conflicts=options["ignore_conflicts"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc) from exc
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} users."))
@@ -0,0 +1,47 @@
+"""
+Module: reissue_user_ids
+
+Provides a management command that reissues the random ids of users created
+before ids were time-ordered, see `users.ids`.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.ids import REISSUE_BATCH_SIZE, reissue_user_ids
+
+
+class Command(BaseCommand):
+    """Reissue the random ids of users as time-ordered ids."""
+
+    help = (
+        "Reissue the random (version 4) ids of users as time-ordered "
+        "(version 7) ids of the time they joined, in every column "
+        "referencing them. The reissued users are signed out."
+    )
+
+    def add_arguments(self, parser):
+        """Add the command arguments."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REISSUE_BATCH_SIZE,
+            help="The users reissued per transaction.",
+        )
+        parser.add_argument(
+            "--database",
+            help="The database alias, defaults to the primary database.",
+        )
+
+    def handle(self, *args, **options):
+        """Reissue the ids."""
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be positive.")
+        reissued = 0
+        for ids in reissue_user_ids(
+            options["batch_size"], using=options["database"]
+        ):
+            reissued += len(ids)
+            self.stdout.write(f"Reissued {reissued} user ids.")
+        self.stdout.write(
+            self.style.SUCCESS(f"Reissued the ids of {reissued} users.")
+        )
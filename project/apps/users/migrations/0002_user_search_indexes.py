@@ -0,0 +1,72 @@
+from django.db import migrations
+
+SEARCH_FIELDS = ("email", "first_name", "last_name")
+FTS_TABLE = "users_customuser_fts"
+
+POSTGRESQL_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS users_customuser_{field}_trgm "
+        f"ON users_customuser USING gin (UPPER({field}::text) gin_trgm_ops)"
+        for field in SEARCH_FIELDS
+    ),
+]
+POSTGRESQL_BACKWARDS = [
+    f"DROP INDEX IF EXISTS users_customuser_{field}_trgm"
+    for field in SEARCH_FIELDS
+]
+
+SQLITE_FORWARDS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "id UNINDEXED, email, first_name, last_name, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE} (id, email, first_name, last_name) "
+    "SELECT id, email, first_name, last_name FROM users_customuser",
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON users_customuser "
+    f"BEGIN INSERT INTO {FTS_TABLE} (id, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    f"CREATE TRIGGER {FTS_TABLE}_update "
+    "AFTER UPDATE OF email, first_name, last_name ON users_customuser "
+    f"BEGIN DELETE FROM {FTS_TABLE} WHERE id = old.id; "
+    f"INSERT INTO {FTS_TABLE} (id, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON users_customuser "
+    f"BEGIN DELETE FROM {FTS_TABLE} WHERE id = old.id; END",
+]
+SQLITE_BACKWARDS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def run_statements(statements):
+    """Return a migration function running vendor specific statements."""
+
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements(
+                {"postgresql": POSTGRESQL_FORWARDS, "sqlite": SQLITE_FORWARDS}
+            ),
+            run_statements(
+                {
+                    "postgresql": POSTGRESQL_BACKWARDS,
+                    "sqlite": SQLITE_BACKWARDS,
+                }
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+import core.fields
+
+# Only the default of new ids changes, both are UUIDs in the same column. The
+# AlterField is applied to the state only, since SQLite would otherwise copy
+# the table, dropping the triggers of 0002_user_search_indexes. Existing ids
+# are reissued with the reissue_user_ids command.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_search_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="customuser",
+                    name="id",
+                    field=core.fields.UUID7Field(
+                        help_text="The unique identifier for the object.",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
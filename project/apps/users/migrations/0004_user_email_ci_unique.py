@@ -0,0 +1,49 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# The unique index on the lowercase email replaces the case-insensitive
+# scans of logins. It needs no backfilled column, but cannot be created
+# while users have the same email in different case, which are listed
+# instead of failing with an integrity error.
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """Fail with the emails used by more than one user, ignoring case."""
+    CustomUser = apps.get_model("users", "CustomUser")
+    duplicates = list(
+        CustomUser.objects.using(schema_editor.connection.alias)
+        .values(email_lower=Lower("email"))
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values_list("email_lower", flat=True)[:20]
+    )
+    if duplicates:
+        raise ValueError(
+            "Users share these emails in different case, merge or rename "
+            f"them before migrating: {', '.join(duplicates)}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_uuid7_ids"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_duplicate_emails, migrations.RunPython.noop, elidable=True
+        ),
+        migrations.AddConstraint(
+            model_name="customuser",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="users_customuser_email_ci_unique",
+                violation_error_message=(
+                    "A user with this email address already exists."
+                ),
+            ),
+        ),
+    ]
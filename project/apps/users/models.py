@@ -7,15 +7,64 @@ instead of a username, and a user profile model for additional user
 information.
 """
 
-from uuid import uuid4
+from itertools import islice
 
 from django.contrib.auth.base_user import BaseUserManager
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, Group
+from django.db import models, router
+from django.db.models import Prefetch, UniqueConstraint, Value
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
+from core.fields import UUID7Field
 
-class CustomUserManager(BaseUserManager):
+from .caches import get_group_names, set_group_names
+from .hashing import (
+    HashingBusy,
+    amake_password,
+    averify_password,
+    create_hashing_pool,
+    hash_passwords,
+)
+
+
+class CustomUserQuerySet(models.QuerySet):
+    """QuerySet for the `CustomUser` model."""
+
+    def with_groups(self):
+        """
+        Prefetch the groups of the users, so that `CustomUser.get_groups`
+        does not run a query per user.
+
+        Returns:
+            CustomUserQuerySet: The queryset with the groups prefetched.
+        """
+        return self.prefetch_related(
+            Prefetch(
+                "groups", queryset=Group.objects.only("name").order_by("name")
+            )
+        )
+
+    def filter_email(self, email):
+        """
+        Filter the users by email address, ignoring case.
+
+        Both sides are lowercased by the database, like the unique index on
+        `Lower("email")` (see `CustomUser.Meta`), which answers the lookup
+        instead of a scan of the table.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            CustomUserQuerySet: The user with the email address, if any.
+        """
+        return self.alias(email_lower=Lower("email")).filter(
+            email_lower=Lower(Value(email))
+        )
+
+
+class CustomUserManager(BaseUserManager.from_queryset(CustomUserQuerySet)):
     """
     Custom user model manager where email is the unique identifier
     for authentication instead of usernames.
@@ -24,6 +73,13 @@ class CustomUserManager(BaseUserManager):
     managing instances of the `CustomUser` model.
     """
 
+    def get_by_natural_key(self, username):
+        """
+        Get a user by email address, ignoring case, so that `ModelBackend`
+        authenticates with the index on `Lower("email")`.
+        """
+        return self.filter_email(username).get()
+
     def create_user(self, email, password, **extra_fields):
         """
         Create and save a User with the given email and password.
@@ -65,15 +121,92 @@ class CustomUserManager(BaseUserManager):
             raise ValueError(_("Superuser must have is_superuser=True."))
         return self.create_user(email, password, **extra_fields)
 
+    def bulk_create_users(
+        self, rows, batch_size=1000, workers=None, ignore_conflicts=False
+    ):
+        """
+        Create users in batches from an iterable of rows.
+
+        Applies the same email normalisation as `create_user` and the same
+        name defaults as `CustomUser.save`, but hashes the passwords of a
+        batch across a process pool and writes it with a single
+        `bulk_create`. The rows are consumed lazily, so large imports do
+        not have to fit into memory.
+
+        Args:
+            rows (iterable): Dicts with an "email" and a "password" key and
+                any additional fields to set for the user.
+            batch_size (int): The number of users hashed and inserted at
+                once.
+            workers (int, optional): The number of hashing processes.
+                Defaults to the number of CPUs, 1 hashes in-process.
+            ignore_conflicts (bool): Skip rows whose email already exists
+                instead of failing.
+
+        Returns:
+            int: The number of users created, without the skipped rows.
+        """
+        rows = iter(rows)
+        total = 0
+        pool = create_hashing_pool(workers)
+        try:
+            while batch := list(islice(rows, batch_size)):
+                users = [self._build_user(row) for row in batch]
+                # an empty password is unusable, like `set_password(None)`
+                passwords = hash_passwords(
+                    [row.get("password") or None for row in batch], pool
+                )
+                for user, password in zip(users, passwords):
+                    user.password = password
+                self.bulk_create(
+                    users,
+                    batch_size=batch_size,
+                    ignore_conflicts=ignore_conflicts,
+                )
+                if ignore_conflicts:
+                    # the ids are generated here, so only the users that
+                    # were inserted have one of them; they are counted
+                    # where they were written, a replica may lag behind
+                    using = self._db or router.db_for_write(self.model)
+                    total += (
+                        self.db_manager(using)
+                        .filter(pk__in=[user.pk for user in users])
+                        .count()
+                    )
+                else:
+                    total += len(users)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return total
+
+    def _build_user(self, row):
+        """
+        Build an unsaved user for bulk creation, without hashing.
+
+        Args:
+            row (dict): The email address, raw password and additional
+                fields of the user. The password is hashed by the caller.
+
+        Returns:
+            CustomUser: The unsaved user.
+        """
+        extra_fields = dict(row)
+        extra_fields.pop("password", None)
+        email = extra_fields.pop("email", None)
+        if not email:
+            raise ValueError(_("The Email must be set"))
+        user = self.model(email=self.normalize_email(email), **extra_fields)
+        user.set_default_names()
+        return user
+
 
 class CustomUser(AbstractUser):
     """Custom user model representing a user in the system."""
 
-    id = models.UUIDField(
-        max_length=36,
+    # time-ordered, so that new users are appended to the primary key index
+    id = UUID7Field(
         primary_key=True,
-        default=uuid4,
-        editable=False,
         help_text=_("The unique identifier for the object."),
     )
     email = models.EmailField(
@@ -106,28 +239,90 @@ class CustomUser(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        """Metadata for the CustomUser model."""
+
+        constraints = [
+            # emails differing only in case belong to the same user
+            UniqueConstraint(
+                Lower("email"),
+                name="users_customuser_email_ci_unique",
+                violation_error_message=_(
+                    "A user with this email address already exists."
+                ),
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         """
         Overwrite the save method to set the first and last name
         based on the email, if they are not set.
         """
+        self.set_default_names()
+        super().save(*args, **kwargs)
+
+    def set_default_names(self):
+        """
+        Set the first and last name based on the email, if they are not
+        set. `bulk_create` bypasses `save`, so bulk creation calls this
+        directly.
+        """
         if not self.first_name:
             self.first_name = self.email.split("@")[0][:1].upper()
         if not self.last_name:
             self.last_name = self.email.split("@")[0][1:2].upper()
-        super().save(*args, **kwargs)
 
     def __str__(self):
         """Str representation of the object."""
         return self.get_full_name()
 
+    async def acheck_password(self, raw_password):
+        """
+        Check the password like `check_password`, hashing on the hashing
+        executor (see `users.hashing`) instead of the event loop. A hash of
+        another hasher or cost than the preferred one is updated, unless the
+        executor is busy, then a later login updates it.
+
+        Raises:
+            HashingBusy: If too many hash operations are pending to check
+                the password.
+        """
+        is_correct, must_update = await averify_password(
+            raw_password, self.password
+        )
+        if is_correct and must_update:
+            try:
+                password = await amake_password(raw_password)
+            except HashingBusy:
+                # a correct password is not rejected for its upgrade
+                return is_correct
+            self.password = password
+            # upgrading the hash is no password change
+            await self.asave(update_fields=["password"])
+        return is_correct
+
     def get_groups(self):
-        """Returns a list of group names that the user belongs to."""
-        return [
-            # pylint: disable=no-member
-            group.name
-            for group in self.groups.all()
-        ]
+        """
+        Returns a list of group names that the user belongs to.
+
+        The names are read from a `group_names` annotation or from
+        prefetched groups (see `CustomUserQuerySet.with_groups`) if present.
+        Otherwise they are read from the per-user cache, which is filled
+        with a single query on a miss and invalidated by the signals in
+        `users.signals`.
+        """
+        if hasattr(self, "group_names"):
+            return [name for name in self.group_names or [] if name]
+        # pylint: disable=no-member
+        if "groups" in getattr(self, "_prefetched_objects_cache", {}):
+            return [group.name for group in self.groups.all()]
+        names = get_group_names(self.pk)
+        if names is None:
+            names = list(
+                self.groups.order_by("name").values_list("name", flat=True)
+            )
+            set_group_names(self.pk, names)
+        return names
 
     get_groups.short_description = _("Groups")
 
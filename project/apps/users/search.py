@@ -0,0 +1,56 @@
+"""
+Module: user search
+
+This module provides an index backed search for users. On PostgreSQL the
+search fields are covered by trigram indexes, which Django's default
+`icontains` lookups use, on SQLite the users are matched against an FTS5 full
+text index. Both indexes are created by the `0002_user_search_indexes`
+migration.
+"""
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+# name of the SQLite FTS5 table mirroring the search fields
+FTS_TABLE = "users_customuser_fts"
+
+
+def build_fts_query(search_term):
+    """
+    Build an FTS5 query matching all words of a search term as prefixes.
+
+    Args:
+        search_term (str): The search term as entered by the user.
+
+    Returns:
+        str: The FTS5 query, or an empty string if the term has no words.
+    """
+    words = [
+        word for word in search_term.split() if any(c.isalnum() for c in word)
+    ]
+    # quote every word, so that FTS5 operators are matched literally
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search_users(queryset, search_term):
+    """
+    Filter users by a search term with the full text index of the database.
+
+    Args:
+        queryset (QuerySet): The users to search.
+        search_term (str): The search term.
+
+    Returns:
+        QuerySet: The matching users, or None if the database has no full
+        text index and the default search should be used.
+    """
+    if connections[queryset.db].vendor != "sqlite":
+        return None
+    query = build_fts_query(search_term)
+    if not query:
+        return None
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]
+        )
+    )
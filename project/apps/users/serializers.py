@@ -0,0 +1,119 @@
+"""
+Module: user serializers
+
+This module provides the serializers of the user API.
+"""
+
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .backends import aauthenticate
+from .models import CustomUser
+from .tokens import (
+    REFRESH,
+    TokenError,
+    create_token_pair,
+    get_auth_hash,
+    revoke_token,
+    verify_token,
+)
+
+
+class TokenPairSerializer(serializers.Serializer):
+    """An access token and the refresh token to renew it."""
+
+    access = serializers.CharField()
+    refresh = serializers.CharField()
+    token_type = serializers.CharField()
+    expires_in = serializers.IntegerField(
+        help_text=_("The lifetime of the access token in seconds.")
+    )
+
+
+class TokenObtainSerializer(serializers.Serializer):
+    """Log in with email and password to obtain a token pair."""
+
+    email = serializers.EmailField()
+    password = serializers.CharField(
+        write_only=True, style={"input_type": "password"}
+    )
+
+    async def aauthenticate(self):
+        """
+        Authenticate the user of the validated credentials, hashing on the
+        hashing executor (see `users.hashing`).
+
+        Returns:
+            CustomUser: The authenticated user.
+
+        Raises:
+            ValidationError: If the credentials are wrong.
+            HashingBusy: If too many hash operations are pending.
+        """
+        user = await aauthenticate(
+            self.context.get("request"),
+            email=self.validated_data["email"],
+            password=self.validated_data["password"],
+        )
+        if user is None:
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        _("Unable to log in with the provided credentials.")
+                    ]
+                },
+                code="authorization",
+            )
+        return user
+
+    def create(self, validated_data):
+        """Issue a token pair for the authenticated user."""
+        return create_token_pair(validated_data["user"])
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """A refresh token."""
+
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        """Verify the refresh token and return its payload."""
+        try:
+            return verify_token(value, REFRESH)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc)) from exc
+
+
+class TokenRefreshSerializer(RefreshTokenSerializer):
+    """Exchange a refresh token for a new token pair."""
+
+    def validate(self, attrs):
+        """Check that the user may still use the API."""
+        payload = attrs["refresh"]
+        user = CustomUser.objects.filter(pk=payload["sub"]).first()
+        if (
+            user is None
+            or not user.is_active
+            or get_auth_hash(user) != payload["auth"]
+        ):
+            raise serializers.ValidationError(
+                _("Token is invalid."), code="authorization"
+            )
+        attrs["user"] = user
+        return attrs
+
+    def create(self, validated_data):
+        """
+        Revoke the used refresh token and issue a new token pair.
+
+        Raises:
+            ValidationError: If a concurrent request used the token first.
+        """
+        if not revoke_token(validated_data["refresh"], REFRESH):
+            raise serializers.ValidationError(
+                {"refresh": [_("Token has been revoked.")]},
+                code="authorization",
+            )
+        return create_token_pair(validated_data["user"])
@@ -0,0 +1,71 @@
+"""
+Module: user signals
+
+This module contains the signal receivers of the user app. They keep the
+cached group names of users in sync with group membership changes and drop
+changed users from the in-process cache of API users and their cached
+responses.
+"""
+
+from django.contrib.auth.models import Group
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.http_cache import invalidate_user_responses
+
+from .caches import api_user_cache, invalidate_group_names
+from .models import CustomUser
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate the cached group names when group memberships change.
+
+    The relation can be changed from both sides: `user.groups` (forward)
+    and `group.user_set` (reverse). For a reverse clear the affected users
+    are only known before the memberships are removed.
+    """
+    del sender, kwargs
+    user_ids = None
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            user_ids = [instance.pk]
+    elif action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        user_ids = pk_set
+    if user_ids is not None:
+        invalidate_group_names(user_ids)
+        invalidate_user_responses(user_ids)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached group names and responses of the members of a
+    group.
+    """
+    del sender, kwargs
+    user_ids = list(instance.user_set.values_list("pk", flat=True))
+    invalidate_group_names(user_ids)
+    invalidate_user_responses(user_ids)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop a saved or deleted user from the API user cache, so that changes
+    of `is_active` or the password apply to the next request, and
+    invalidate their cached responses.
+    """
+    del sender, kwargs
+    api_user_cache.invalidate(instance.pk)
+    invalidate_user_responses([instance.pk])
@@ -6,9 +6,85 @@ cases cover various functionalities including user creation, profile creation,
 custom save methods, and specific model methods.
 """
 
-from django.test import TestCase
+import csv
+import json
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from uuid import uuid4
 
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth import authenticate, hashers
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.core.signals import setting_changed
+from django.db import IntegrityError, connection, transaction
+from django.dispatch import receiver
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from asgiref.sync import async_to_sync
+from config.hashers import HASHERS, hasher_config
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .admin import CustomUserAdmin
+from .authentication import SignedTokenAuthentication
+from .backends import aauthenticate
+from .caches import UserCache, api_user_cache
+from .export import export_users
+from .forms import CustomUserCreationForm
+from .hashing import HashingBusy, hashing_executor
+from .ids import reissue_user_ids
 from .models import CustomUser
+from .search import build_fts_query, search_users
+from .serializers import TokenRefreshSerializer
+from .tokens import ACCESS, REFRESH, create_token
+
+
+@receiver(setting_changed)
+def hashing_settings_changed(sender, setting, **kwargs):
+    """
+    Apply changed hasher costs and hashing executor settings of
+    `override_settings`. Django reloads the hashers only if
+    `PASSWORD_HASHERS` changes.
+    """
+    del sender, kwargs
+    if setting == "PASSWORD_HASHER_COST":
+        hashers.get_hashers.cache_clear()
+    elif setting in ("PASSWORD_HASHING_EXECUTOR", "PASSWORD_HASHING_WORKERS"):
+        hashing_executor.shutdown()
+
+
+class TokenBackend:
+    """
+    A backend taking other credentials than an email and a password.
+    """
+
+    def authenticate(self, request, token=None):
+        """
+        Authenticate nobody.
+        """
+        del request, token
+
+
+class DenyingBackend:
+    """
+    A backend denying every login by email and password.
+    """
+
+    def authenticate(self, request, email=None, password=None):
+        """
+        Deny the login.
+        """
+        raise PermissionDenied
 
 
 class CustomUserModelTests(TestCase):
@@ -94,3 +170,741 @@ class CustomUserModelTests(TestCase):
             email=self.email, password=self.password
         )
         self.assertTrue(user.get_is_admin())
+
+    def test_email_ignores_case(self):
+        """
+        Test that logins and uniqueness ignore the case of the email.
+        """
+        user = CustomUser.objects.create_user(
+            email="Jane.Doe@Example.COM", password=self.password
+        )
+        self.assertEqual(user.email, "Jane.Doe@example.com")
+        self.assertEqual(
+            authenticate(email="JANE.doe@example.com", password=self.password),
+            user,
+        )
+        self.assertEqual(
+            async_to_sync(aauthenticate)(
+                email="jane.DOE@EXAMPLE.com", password=self.password
+            ),
+            user,
+        )
+        self.assertIsNone(
+            authenticate(email="jane@example.com", password=self.password)
+        )
+        form = CustomUserCreationForm(
+            {
+                "email": "jane.doe@example.com",
+                "password1": "Z8w!kq2-pv",
+                "password2": "Z8w!kq2-pv",
+            }
+        )
+        self.assertEqual(
+            form.non_field_errors(),
+            ["A user with this email address already exists."],
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create_user(
+                email="JANE.DOE@example.com", password=None
+            )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(
+                CustomUser.objects.filter_email(
+                    "jane.doe@EXAMPLE.com"
+                ).exists()
+            )
+        self.assertIn('LOWER("users_customuser"."email")', queries[0]["sql"])
+
+
+class BulkCreateUsersTests(TestCase):
+    """
+    Test suite for bulk user provisioning.
+    """
+
+    def test_bulk_create_users(self):
+        """
+        Test that bulk creation normalises emails, sets the name defaults
+        and hashes the passwords.
+        """
+        total = CustomUser.objects.bulk_create_users(
+            [
+                {"email": "anna@EXAMPLE.com", "password": "secret-1"},
+                {
+                    "email": "bob@example.com",
+                    "password": "secret-2",
+                    "first_name": "Bob",
+                    "is_staff": False,
+                },
+            ],
+            batch_size=1,
+            workers=1,
+        )
+        self.assertEqual(total, 2)
+        anna = CustomUser.objects.get(email="anna@example.com")
+        self.assertEqual((anna.first_name, anna.last_name), ("A", "N"))
+        self.assertTrue(anna.check_password("secret-1"))
+        bob = CustomUser.objects.get(email="bob@example.com")
+        self.assertEqual((bob.first_name, bob.last_name), ("Bob", "O"))
+        self.assertFalse(bob.is_staff)
+
+    def test_bulk_create_users_ignore_conflicts(self):
+        """
+        Test that skipped rows are not counted and that empty passwords
+        are unusable.
+        """
+        CustomUser.objects.create_user(
+            email="taken@example.com", password=None
+        )
+        total = CustomUser.objects.bulk_create_users(
+            [
+                {"email": "taken@example.com", "password": "secret"},
+                {"email": "new@example.com", "password": ""},
+            ],
+            workers=1,
+            ignore_conflicts=True,
+        )
+        self.assertEqual(total, 1)
+        user = CustomUser.objects.get(email="new@example.com")
+        self.assertFalse(user.has_usable_password())
+        self.assertFalse(user.check_password(""))
+
+    def test_bulk_create_users_process_pool(self):
+        """
+        Test that passwords hashed on a process pool are usable.
+        """
+        CustomUser.objects.bulk_create_users(
+            [{"email": "pool@example.com", "password": "secret"}],
+            workers=2,
+        )
+        user = CustomUser.objects.get(email="pool@example.com")
+        self.assertTrue(user.check_password("secret"))
+
+    def test_bulk_create_users_requires_email(self):
+        """
+        Test that rows without an email are rejected.
+        """
+        with self.assertRaises(ValueError):
+            CustomUser.objects.bulk_create_users(
+                [{"email": "", "password": "secret"}], workers=1
+            )
+
+    def test_import_users_command(self):
+        """
+        Test importing users from CSV and NDJSON files.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = Path(directory) / "users.csv"
+            csv_path.write_text(
+                "email,password,is_staff\ncsv@example.com,secret,false\n"
+            )
+            ndjson_path = Path(directory) / "users.ndjson"
+            ndjson_path.write_text(
+                '{"email": "json@example.com", "password": "secret"}\n'
+            )
+            call_command(
+                "import_users", csv_path, workers=1, stdout=StringIO()
+            )
+            call_command(
+                "import_users", ndjson_path, workers=1, stdout=StringIO()
+            )
+        self.assertFalse(
+            CustomUser.objects.get(email="csv@example.com").is_staff
+        )
+        self.assertTrue(
+            CustomUser.objects.filter(email="json@example.com").exists()
+        )
+
+
+class GroupResolutionTests(TestCase):
+    """
+    Test suite for resolving the group names of users.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a user and two groups.
+        """
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="member@example.com", password=None
+        )
+        self.editors = Group.objects.create(name="Editors")
+        self.admins = Group.objects.create(name="Admins")
+
+    def test_get_groups_prefetched(self):
+        """
+        Test that prefetched groups are used without further queries.
+        """
+        self.user.groups.add(self.editors, self.admins)
+        user = CustomUser.objects.with_groups().get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.get_groups(), ["Admins", "Editors"])
+
+    def test_get_groups_cached(self):
+        """
+        Test that group names are cached and the cache is invalidated by
+        membership changes from both sides of the relation.
+        """
+        self.user.groups.add(self.editors)
+        self.assertEqual(self.user.get_groups(), ["Editors"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.get_groups(), ["Editors"])
+        self.admins.user_set.add(self.user)
+        self.assertEqual(self.user.get_groups(), ["Admins", "Editors"])
+        self.editors.user_set.clear()
+        self.assertEqual(self.user.get_groups(), ["Admins"])
+        self.admins.name = "Owners"
+        self.admins.save()
+        self.assertEqual(self.user.get_groups(), ["Owners"])
+        self.user.groups.clear()
+        self.assertEqual(self.user.get_groups(), [])
+
+    def _changelist_queries(self):
+        """
+        Count the queries of a changelist page showing all users.
+        """
+        url = reverse("admin:users_customuser_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    @mock.patch.object(CustomUserAdmin, "list_per_page", 1000)
+    def test_changelist_constant_queries(self):
+        """
+        Test that the changelist query count does not grow with the
+        number of users and groups shown.
+        """
+        admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", password=None
+        )
+        self.client.force_login(admin)
+        small = self._changelist_queries()
+        CustomUser.objects.bulk_create_users(
+            (
+                {"email": f"user{i}@example.com", "password": None}
+                for i in range(998)
+            ),
+            workers=1,
+        )
+        CustomUser.groups.through.objects.bulk_create(
+            CustomUser.groups.through(customuser=user, group=group)
+            for user in CustomUser.objects.all()
+            for group in (self.editors, self.admins)
+        )
+        self.assertEqual(CustomUser.objects.count(), 1000)
+        self.assertEqual(self._changelist_queries(), small)
+
+
+class AdminSearchPaginationTests(TestCase):
+    """
+    Test suite for the indexed search and keyset pagination of the admin.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a logged in admin and users.
+        """
+        self.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", password=None
+        )
+        self.client.force_login(self.admin)
+        CustomUser.objects.bulk_create_users(
+            (
+                {"email": f"user{i:02}@example.com", "password": None}
+                for i in range(30)
+            ),
+            workers=1,
+        )
+        self.url = reverse("admin:users_customuser_changelist")
+
+    def test_build_fts_query(self):
+        """
+        Test that search terms are quoted prefix queries.
+        """
+        self.assertEqual(build_fts_query('jo "do'), '"jo"* """do"*')
+        self.assertEqual(build_fts_query(" @ "), "")
+
+    def test_search_users(self):
+        """
+        Test that the full text index matches prefixes and follows updates.
+        """
+        user = CustomUser.objects.create_user(
+            email="gh@navy.mil",
+            password=None,
+            first_name="Grace",
+            last_name="Hopper",
+        )
+        users = CustomUser.objects.all()
+        self.assertEqual(list(search_users(users, "gra hop")), [user])
+        self.assertEqual(list(search_users(users, "navy.m")), [user])
+        user.last_name = "Brewster"
+        user.save()
+        self.assertFalse(search_users(users, "hopper").exists())
+        self.assertTrue(search_users(users, "brew").exists())
+        user.delete()
+        self.assertFalse(search_users(users, "navy").exists())
+
+    @mock.patch.object(CustomUserAdmin, "list_per_page", 20)
+    def test_keyset_pagination(self):
+        """
+        Test that the changelist pages with a cursor on the email.
+        """
+        response = self.client.get(self.url)
+        cl = response.context["cl"]
+        self.assertTrue(cl.keyset_pagination)
+        self.assertEqual(len(cl.result_list), 20)
+        self.assertEqual(cl.next_page_url, "?after=user18%40example.com")
+        response = self.client.get(self.url + cl.next_page_url)
+        cl = response.context["cl"]
+        self.assertEqual(
+            [user.email for user in cl.result_list],
+            [f"user{i}@example.com" for i in range(19, 30)],
+        )
+        self.assertIsNone(cl.next_page_url)
+        self.assertEqual(cl.first_page_url, "?")
+
+    @mock.patch("core.pagination.EXACT_COUNT_LIMIT", 10)
+    def test_estimated_count(self):
+        """
+        Test that large results are estimated instead of counted.
+        """
+        response = self.client.get(self.url)
+        self.assertTrue(response.context["cl"].paginator.count_is_estimate)
+        self.assertContains(response, "~31 users")
+        response = self.client.get(self.url, {"q": "user0"})
+        cl = response.context["cl"]
+        self.assertEqual(cl.result_count, 10)
+        self.assertFalse(cl.paginator.count_is_estimate)
+
+
+class TokenAuthenticationTests(TestCase):
+    """
+    Test suite for the signed token authentication of the API.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a user.
+        """
+        cache.clear()
+        api_user_cache.clear()
+        self.password = "testpass123"
+        self.user = CustomUser.objects.create_user(
+            email="mobile@example.com", password=self.password
+        )
+
+    def authenticate(self, token):
+        """
+        Authenticate a request carrying the given access token.
+        """
+        request = APIRequestFactory().get(
+            "/", headers={"authorization": f"Bearer {token}"}
+        )
+        return SignedTokenAuthentication().authenticate(Request(request))
+
+    def test_obtain_refresh_and_revoke(self):
+        """
+        Test the token endpoints, including refresh token rotation.
+        """
+        response = self.client.post(
+            reverse("token_obtain"),
+            {"email": self.user.email, "password": self.password},
+        )
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+        user, payload = self.authenticate(tokens["access"])
+        self.assertEqual((user, payload["sub"]), (self.user, str(user.pk)))
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 400)
+        refresh = self.client.post(
+            reverse("token_obtain"),
+            {"email": self.user.email, "password": self.password},
+        ).json()["refresh"]
+        response = self.client.post(
+            reverse("token_revoke"), {"refresh": refresh}
+        )
+        self.assertEqual(response.status_code, 204)
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": refresh}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_refresh_token_is_used_once(self):
+        """
+        Test that concurrent refreshes with the same token get one pair.
+        """
+        refresh = create_token(self.user, REFRESH)
+        serializers = [
+            TokenRefreshSerializer(data={"refresh": refresh}) for _ in range(2)
+        ]
+        # both requests verify the token before either revokes it
+        for serializer in serializers:
+            self.assertTrue(serializer.is_valid())
+        self.assertIn("access", serializers[0].save())
+        with self.assertRaises(ValidationError):
+            serializers[1].save()
+
+    def test_obtain_invalid_credentials(self):
+        """
+        Test that wrong credentials do not obtain tokens.
+        """
+        response = self.client.post(
+            reverse("token_obtain"),
+            {"email": self.user.email, "password": "wrong"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_authenticate_without_queries(self):
+        """
+        Test that cached users are authenticated without queries.
+        """
+        token = create_token(self.user, ACCESS)
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            self.authenticate(token)
+
+    def test_authenticate_invalidated(self):
+        """
+        Test that deactivating a user or changing the password invalidates
+        the cached user and the tokens.
+        """
+        token = create_token(self.user, ACCESS)
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        self.user.is_active = True
+        self.user.set_password("changed123")
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token + "x")
+
+    def test_authenticate_invalidated_in_other_process(self):
+        """
+        Test that a user changed by another process is not served from the
+        cache of this one.
+        """
+        token = create_token(self.user, ACCESS)
+        self.authenticate(token)
+        # the cache of the process that deactivates the user
+        other = UserCache()
+        with mock.patch("users.signals.api_user_cache", other):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        # the user was loaded again
+        user, version = api_user_cache.get(str(self.user.pk))
+        self.assertFalse(user.is_active)
+        self.assertIsNotNone(version)
+
+
+@override_settings(
+    PASSWORD_HASHERS=HASHERS, PASSWORD_HASHER_COST={"iterations": 1000}
+)
+class LoginHashingTests(TestCase):
+    """
+    Test suite for the hashing of async logins and the hasher profiles.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment by creating a user with a cheap hash.
+        """
+        self.password = "testpass123"
+        self.user = CustomUser.objects.create_user(
+            email="login@example.com", password=self.password
+        )
+
+    def login(self, password=None, email=None):
+        """
+        Log in at the token endpoint.
+        """
+        return self.client.post(
+            reverse("token_obtain"),
+            {
+                "email": email or self.user.email,
+                "password": password or self.password,
+            },
+        )
+
+    def test_hasher_profiles(self):
+        """
+        Test that a profile puts its hasher first and sets its cost.
+        """
+        hashers_, cost = hasher_config("argon2")
+        self.assertEqual(hashers_[0], "users.hashers.Argon2PasswordHasher")
+        self.assertEqual(sorted(hashers_), sorted(HASHERS))
+        self.assertEqual(cost["time_cost"], 2)
+        self.assertEqual(hasher_config("default"), (HASHERS, {}))
+        with self.assertRaises(ValueError):
+            hasher_config("md5")
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_rehash_on_login(self):
+        """
+        Test that a login rehashes a password with an outdated cost once.
+        """
+        with self.settings(PASSWORD_HASHER_COST={"iterations": 1200}):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(
+                self.user.password.startswith("pbkdf2_sha256$1200$")
+            )
+            encoded = self.user.password
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.password, encoded)
+        self.assertEqual(self.login("wrong").status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_hash_on_executor(self):
+        """
+        Test that logins, also of unknown emails, hash on the executor.
+        """
+        threads = []
+
+        def record_thread(func):
+            def wrapper(*args):
+                threads.append(threading.current_thread().name)
+                return func(*args)
+
+            return wrapper
+
+        with mock.patch(
+            "users.hashing.verify_password",
+            record_thread(hashers.verify_password),
+        ), mock.patch(
+            "users.hashing.make_password",
+            record_thread(hashers.make_password),
+        ):
+            self.assertEqual(self.login().status_code, 200)
+            response = self.login(email="unknown@example.com")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("non_field_errors", response.json())
+            with self.settings(PASSWORD_HASHING_EXECUTOR="inline"):
+                self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(threads[0].startswith("hashing"))
+        self.assertTrue(threads[1].startswith("hashing"))
+        self.assertFalse(threads[2].startswith("hashing"))
+
+    def test_backpressure(self):
+        """
+        Test that logins beyond the pending limit are answered with 503.
+        """
+        with self.settings(PASSWORD_HASHING_MAX_PENDING=0):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_busy_rehash_is_skipped(self):
+        """
+        Test that a correct login succeeds if its rehash finds the executor
+        busy, and the hash is updated by a later login.
+        """
+        with self.settings(PASSWORD_HASHER_COST={"iterations": 1200}):
+            with mock.patch(
+                "users.models.amake_password", side_effect=HashingBusy
+            ):
+                self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(
+                self.user.password.startswith("pbkdf2_sha256$1000$")
+            )
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(
+                self.user.password.startswith("pbkdf2_sha256$1200$")
+            )
+
+    def test_aauthenticate_backends(self):
+        """
+        Test that backends not taking the credentials are skipped and that
+        a PermissionDenied stops the authentication, like `authenticate`.
+        """
+        backends = ["users.tests.TokenBackend", "users.backends.EmailBackend"]
+        credentials = {"email": self.user.email, "password": self.password}
+        with self.settings(AUTHENTICATION_BACKENDS=backends):
+            user = async_to_sync(aauthenticate)(**credentials)
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.backend, "users.backends.EmailBackend")
+        with self.settings(
+            AUTHENTICATION_BACKENDS=["users.tests.DenyingBackend", *backends]
+        ):
+            self.assertIsNone(async_to_sync(aauthenticate)(**credentials))
+
+
+class ReissueUserIdsTests(TestCase):
+    """
+    Test suite for reissuing random user ids as time-ordered ids.
+    """
+
+    def test_reissue_user_ids(self):
+        """
+        Test that ids, memberships, the admin log and the search index are
+        reissued.
+        """
+        old = [
+            CustomUser.objects.create_user(
+                id=uuid4(), email=f"old{i}@example.com", password=None
+            )
+            for i in range(5)
+        ]
+        new = CustomUser.objects.create_user(
+            email="new@example.com", password=None
+        )
+        group = Group.objects.create(name="Cyclists")
+        group.user_set.add(old[0], new)
+        entry = LogEntry.objects.log_actions(
+            new.pk, [old[1]], ADDITION, single_object=True
+        )
+        batches = list(reissue_user_ids(batch_size=2))
+        self.assertEqual(sum(len(ids) for ids in batches), 5)
+        ids = {pk: new_pk for batch in batches for pk, new_pk in batch.items()}
+        self.assertEqual(set(ids), {user.pk for user in old})
+        for user in old:
+            reissued = CustomUser.objects.get(email=user.email)
+            self.assertEqual(reissued.pk, ids[user.pk])
+            self.assertEqual(reissued.pk.version, 7)
+            self.assertEqual(
+                reissued.pk.int >> 80,
+                int(user.date_joined.timestamp() * 1000),
+            )
+        self.assertFalse(CustomUser.objects.filter(pk__in=ids).exists())
+        self.assertEqual(CustomUser.objects.get(pk=new.pk), new)
+        self.assertEqual(
+            set(group.user_set.values_list("pk", flat=True)),
+            {ids[old[0].pk], new.pk},
+        )
+        entry.refresh_from_db()
+        self.assertEqual(entry.object_id, str(ids[old[1].pk]))
+        self.assertEqual(entry.get_edited_object().email, old[1].email)
+        users = CustomUser.objects.all()
+        self.assertEqual(
+            list(search_users(users, "old0").values_list("pk", flat=True)),
+            [ids[old[0].pk]],
+        )
+        stdout = StringIO()
+        call_command("reissue_user_ids", stdout=stdout)
+        self.assertIn("Reissued the ids of 0 users.", stdout.getvalue())
+
+
+class ExportUsersTests(TestCase):
+    """
+    Test suite for the streaming user export.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment with an admin, a group member and users.
+        """
+        self.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", password=None
+        )
+        member = CustomUser.objects.create_user(
+            email="member@example.com", password=None
+        )
+        member.groups.add(
+            Group.objects.create(name="Cyclists"),
+            Group.objects.create(name="Walkers"),
+        )
+        for i in range(3):
+            CustomUser.objects.create_user(
+                email=f"user{i}@example.com", password=None
+            )
+
+    def test_export_command(self):
+        """
+        Test that the command exports CSV in a language and NDJSON.
+        """
+        stdout = StringIO()
+        call_command("export_users", language="de", stdout=stdout)
+        rows = list(csv.DictReader(StringIO(stdout.getvalue())))
+        self.assertEqual(len(rows), 5)
+        member = next(row for row in rows if row["Gruppen"])
+        self.assertEqual(member["E-Mail-Adresse"], "member@example.com")
+        self.assertEqual(member["Gruppen"], "Cyclists, Walkers")
+        self.assertEqual(member["Administrator"], "false")
+        stdout = StringIO()
+        call_command("export_users", format="ndjson", stdout=stdout)
+        users = {
+            user["email"]: user
+            for user in map(json.loads, stdout.getvalue().splitlines())
+        }
+        self.assertTrue(users["admin@example.com"]["is_admin"])
+        self.assertEqual(
+            users["member@example.com"]["groups"], ["Cyclists", "Walkers"]
+        )
+        self.assertIsNone(users["member@example.com"]["last_login"])
+
+    def test_export_escapes_formulas(self):
+        """
+        Test that CSV cells starting a formula are quoted, NDJSON values not.
+        """
+        CustomUser.objects.create_user(
+            email="formula@example.com",
+            password=None,
+            first_name='=HYPERLINK("http://example.com")',
+            last_name="-1+2",
+        )
+        users = CustomUser.objects.filter(email="formula@example.com")
+        with translation.override("en"):
+            chunks = export_users(users, "csv")
+        [row] = csv.DictReader(StringIO("".join(chunks)))
+        self.assertEqual(
+            row["Firstname"], '\'=HYPERLINK("http://example.com")'
+        )
+        self.assertEqual(row["Lastname"], "'-1+2")
+        [line] = "".join(export_users(users, "ndjson")).splitlines()
+        self.assertEqual(json.loads(line)["last_name"], "-1+2")
+
+    def test_export_in_chunks(self):
+        """
+        Test that the users are read and written a chunk at a time.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(export_users(CustomUser.objects.all(), "csv", 2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[0].count("\n"), 3)
+        # a query of the users, fetched a chunk at a time, and a query of
+        # the groups of every chunk
+        self.assertEqual(len(queries), 4)
+        with self.assertRaises(ValueError):
+            export_users(CustomUser.objects.all(), "xlsx")
+
+    def test_admin_action(self):
+        """
+        Test that the admin action streams the selected users.
+        """
+        self.client.force_login(self.admin)
+        with translation.override("de"):
+            url = reverse("admin:users_customuser_changelist")
+        response = self.client.post(
+            url,
+            {
+                "action": "export_csv",
+                "_selected_action": [self.admin.pk],
+            },
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="users.csv"'
+        )
+        content = b"".join(response.streaming_content).decode()
+        header, row, _end = content.split("\r\n")
+        self.assertIn("E-Mail-Adresse", header)
+        self.assertIn("admin@example.com", row)
@@ -0,0 +1,159 @@
+"""
+Module: user tokens
+
+This module issues and verifies the signed tokens of the mobile API. Tokens
+are signed with the SECRET_KEY and carry the user id, so they can be
+verified without a database lookup. An access token authenticates API
+requests for a short time; a refresh token is exchanged for a new token
+pair and is rotated on every use. Revoked tokens are kept in the default
+cache until they would have expired anyway, which has to be shared by all
+processes outside of DEBUG (see `core.checks.check_shared_cache`).
+"""
+
+import secrets
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class TokenError(ValueError):
+    """Raised for invalid, expired or revoked tokens."""
+
+
+def get_token_lifetime(token_type):
+    """
+    Get the lifetime of a token type.
+
+    Args:
+        token_type (str): Either ACCESS or REFRESH.
+
+    Returns:
+        int: The lifetime in seconds.
+    """
+    if token_type == ACCESS:
+        return settings.API_ACCESS_TOKEN_LIFETIME
+    return settings.API_REFRESH_TOKEN_LIFETIME
+
+
+def get_auth_hash(user):
+    """
+    Get the part of the session auth hash that binds a token to a password.
+
+    Args:
+        user (CustomUser): The user.
+
+    Returns:
+        str: The hash, which changes when the password changes.
+    """
+    return user.get_session_auth_hash()[:16]
+
+
+def create_token(user, token_type):
+    """
+    Create a signed token.
+
+    Args:
+        user (CustomUser): The user the token authenticates.
+        token_type (str): Either ACCESS or REFRESH.
+
+    Returns:
+        str: The signed token.
+    """
+    payload = {
+        "sub": str(user.pk),
+        "jti": secrets.token_urlsafe(12),
+        "iat": int(time.time()),
+        "auth": get_auth_hash(user),
+    }
+    return signing.dumps(payload, salt=f"users.tokens.{token_type}")
+
+
+def create_token_pair(user):
+    """
+    Create an access and a refresh token for a user.
+
+    Args:
+        user (CustomUser): The user the tokens authenticate.
+
+    Returns:
+        dict: The tokens, their type and the access token lifetime.
+    """
+    return {
+        "access": create_token(user, ACCESS),
+        "refresh": create_token(user, REFRESH),
+        "token_type": "Bearer",
+        "expires_in": get_token_lifetime(ACCESS),
+    }
+
+
+def verify_token(token, token_type):
+    """
+    Verify a token and return its payload.
+
+    Args:
+        token (str): The signed token.
+        token_type (str): The expected token type, ACCESS or REFRESH.
+
+    Returns:
+        dict: The payload with the user id ("sub"), the token id ("jti"),
+        the issue time ("iat") and the password binding ("auth").
+
+    Raises:
+        TokenError: If the token is invalid, expired or revoked.
+    """
+    try:
+        payload = signing.loads(
+            token,
+            salt=f"users.tokens.{token_type}",
+            max_age=get_token_lifetime(token_type),
+        )
+    except signing.SignatureExpired as exc:
+        raise TokenError(_("Token has expired.")) from exc
+    except signing.BadSignature as exc:
+        raise TokenError(_("Token is invalid.")) from exc
+    if cache.get(revoked_token_key(payload["jti"])):
+        raise TokenError(_("Token has been revoked."))
+    return payload
+
+
+def revoked_token_key(jti):
+    """
+    Build the cache key marking a token as revoked.
+
+    Args:
+        jti (str): The id of the token.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"users:revoked-token:{jti}"
+
+
+def revoke_token(payload, token_type):
+    """
+    Revoke a verified token until it expires.
+
+    The token is claimed with `cache.add`, which only one of concurrent
+    requests revoking the same token succeeds with, so that a refresh
+    token is exchanged at most once.
+
+    Args:
+        payload (dict): The payload returned by `verify_token`.
+        token_type (str): The type of the token, ACCESS or REFRESH.
+
+    Returns:
+        bool: Whether the token was revoked by this call, False if it was
+        revoked before or has expired.
+    """
+    remaining = payload["iat"] + get_token_lifetime(token_type) - time.time()
+    if remaining <= 0:
+        return False
+    return cache.add(
+        revoked_token_key(payload["jti"]), True, int(remaining) + 1
+    )
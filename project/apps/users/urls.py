@@ -0,0 +1,23 @@
+"""
+Module: user urls
+
+This module defines the URL patterns of the user API.
+"""
+
+from django.urls import path
+
+from .views import TokenObtainView, TokenRefreshView, TokenRevokeView
+
+urlpatterns = [
+    path("auth/token/", TokenObtainView.as_view(), name="token_obtain"),
+    path(
+        "auth/token/refresh/",
+        TokenRefreshView.as_view(),
+        name="token_refresh",
+    ),
+    path(
+        "auth/token/revoke/",
+        TokenRevokeView.as_view(),
+        name="token_revoke",
+    ),
+]
@@ -0,0 +1,93 @@
+"""
+Module: user views
+
+This module provides the token endpoints of the user API. Logins hash on the
+hashing executor (see `users.hashing`) and are answered with 503 while too
+many hash operations are pending.
+"""
+
+from django.utils.translation import gettext_lazy as _
+
+from drf_spectacular.utils import extend_schema
+from rest_framework import exceptions, status
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.views import AsyncGenericAPIView
+
+from .hashing import HashingBusy
+from .serializers import (
+    RefreshTokenSerializer,
+    TokenObtainSerializer,
+    TokenPairSerializer,
+    TokenRefreshSerializer,
+)
+from .tokens import ACCESS, REFRESH, revoke_token
+
+
+class LoginBusy(exceptions.APIException):
+    """Too many logins are being hashed at once."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many logins at once, please retry shortly.")
+    default_code = "login_busy"
+    # seconds sent as Retry-After
+    wait = 1
+
+
+class TokenObtainView(AsyncGenericAPIView):
+    """Obtain an access and a refresh token with email and password."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    serializer_class = TokenObtainSerializer
+
+    @extend_schema(responses=TokenPairSerializer)
+    async def post(self, request):
+        """Log in and return a token pair."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            user = await serializer.aauthenticate()
+        except HashingBusy as exc:
+            raise LoginBusy from exc
+        return Response(serializer.save(user=user))
+
+
+class TokenRefreshView(GenericAPIView):
+    """
+    Exchange a refresh token for a new token pair. The refresh token can
+    only be used once.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    serializer_class = TokenRefreshSerializer
+
+    @extend_schema(responses=TokenPairSerializer)
+    def post(self, request):
+        """Exchange a refresh token for a new token pair."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save())
+
+
+class TokenRevokeView(GenericAPIView):
+    """
+    Revoke a refresh token and, if the request is authenticated with one,
+    the access token.
+    """
+
+    permission_classes = [AllowAny]
+    serializer_class = RefreshTokenSerializer
+
+    @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    def post(self, request):
+        """Revoke the tokens."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revoke_token(serializer.validated_data["refresh"], REFRESH)
+        if isinstance(request.auth, dict):
+            revoke_token(request.auth, ACCESS)
+        return Response(status=status.HTTP_204_NO_CONTENT)
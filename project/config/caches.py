@@ -0,0 +1,55 @@
+"""
+Module: config.caches
+
+This module builds the cache settings from the environment. Without
+configuration every process uses its own in-memory cache; a `CACHE_URL`
+such as ``redis://host:6379/0`` switches to a cache shared by all
+processes, which the response cache, the revoked tokens and the read
+replica pins need as soon as more than one process serves requests.
+"""
+
+from urllib.parse import unquote, urlsplit
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_config(environ):
+    """
+    Build the settings of the default cache from the environment.
+
+    Supported URLs are ``locmem://`` (default), ``redis://`` and
+    ``rediss://`` (requires `redis`), ``memcached://host:port[,host:port]``
+    (requires `pymemcache`), ``file:///path`` and ``dummy://``.
+    `CACHE_MAX_ENTRIES` bounds the in-memory and file caches.
+
+    Args:
+        environ (dict): The environment, usually `os.environ`.
+
+    Returns:
+        dict: The cache settings.
+
+    Raises:
+        ValueError: If `CACHE_URL` has an unsupported scheme.
+    """
+    url = urlsplit(environ.get("CACHE_URL") or "locmem://")
+    if url.scheme not in CACHE_BACKENDS:
+        raise ValueError(f"Unsupported CACHE_URL scheme: {url.scheme}")
+    config = {"BACKEND": CACHE_BACKENDS[url.scheme]}
+    if url.scheme in ("redis", "rediss"):
+        config["LOCATION"] = url.geturl()
+    elif url.scheme == "memcached":
+        config["LOCATION"] = url.netloc.split(",")
+    elif url.scheme == "file":
+        config["LOCATION"] = unquote(url.path)
+    if url.scheme in ("locmem", "file"):
+        config["OPTIONS"] = {
+            "MAX_ENTRIES": int(environ.get("CACHE_MAX_ENTRIES", 10000))
+        }
+    return config
@@ -4,19 +4,64 @@ Module: decorators
 This module contains custom decorators for the project.
 """
 
-from functools import wraps
+from functools import cache, wraps
 
 from django.core.exceptions import PermissionDenied
 
+from asgiref.sync import iscoroutinefunction
+
+
+def check_admin_or_superuser(user):
+    """Raise PermissionDenied unless the user is an admin or a superuser."""
+    if not user.is_authenticated and not user.is_superuser:
+        raise PermissionDenied
+
 
 def admin_or_superuser_required(view_func):
-    """Decorator to check if the user is an admin or a superuser."""
+    """
+    Decorator to check if the user is an admin or a superuser.
+
+    Async views stay async, their user is loaded with `request.auser()`.
+    """
+
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            """Check if the user is an admin or a superuser."""
+            check_admin_or_superuser(await request.auser())
+            return await view_func(request, *args, **kwargs)
+
+        return _wrapped_async_view
 
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
         """Check if the user is an admin or a superuser."""
-        if not request.user.is_authenticated and not request.user.is_superuser:
-            raise PermissionDenied
+        check_admin_or_superuser(request.user)
         return view_func(request, *args, **kwargs)
 
     return _wrapped_view
+
+
+def lazy_view(build_view):
+    """
+    Decorator building a view on its first request, e.g. to import the
+    modules of rarely used views only when they are requested. The schema
+    generator builds the view with the `build_view` attribute of the
+    decorated view, see `core.generators`.
+
+    Args:
+        build_view (callable): Returns the view, called once.
+
+    Returns:
+        callable: A synchronous view calling the built view.
+    """
+    build_view = cache(build_view)
+
+    @wraps(build_view)
+    def _wrapped_view(request, *args, **kwargs):
+        """Call the view, building it on the first request."""
+        return build_view()(request, *args, **kwargs)
+
+    _wrapped_view.build_view = build_view
+    return _wrapped_view
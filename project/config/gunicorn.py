@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration for production.
+
+The application is loaded in the master process and preloaded there (see
+`core.forkserver.preload`) before the workers are forked, so that they
+share the loaded modules, URLconf, templates, translations and API schema
+through copy-on-write memory, like the workers of `runforkserver`:
+
+    gunicorn -c config/gunicorn.py config.wsgi
+"""
+
+# load config.wsgi in the master process, before forking the workers
+preload_app = True
+
+
+def on_starting(server):
+    """Preload the application and drop the metrics of a previous server."""
+    del server
+    # imported once config.wsgi has set up Django
+    # pylint: disable=import-outside-toplevel
+    from core.forkserver import preload
+    from core.metrics import clear_files
+
+    # the pids of the workers of a previous server may be reused
+    clear_files()
+    preload()
@@ -0,0 +1,55 @@
+"""
+Module: config.hashers
+
+This module builds the password hasher settings of a profile. A profile
+selects the hasher of new passwords and its cost. The other hashers stay
+installed, so that existing passwords keep working and are rehashed with
+the profile on the next successful login.
+"""
+
+# the preferred hasher and its cost parameters of every profile
+HASHER_PROFILES = {
+    # Django's defaults, PBKDF2-SHA256 with 870,000 iterations in Django 5.1
+    "default": ("users.hashers.PBKDF2PasswordHasher", {}),
+    # PBKDF2-SHA256 with the 600,000 iterations recommended by OWASP
+    "owasp": (
+        "users.hashers.PBKDF2PasswordHasher",
+        {"iterations": 600_000},
+    ),
+    # memory-hard Argon2id with the OWASP parameters (19 MiB, 2 passes),
+    # requires the argon2-cffi package
+    "argon2": (
+        "users.hashers.Argon2PasswordHasher",
+        {"time_cost": 2, "memory_cost": 19_456, "parallelism": 1},
+    ),
+}
+
+# the installed hashers, see PASSWORD_HASHERS
+HASHERS = [
+    "users.hashers.PBKDF2PasswordHasher",
+    "users.hashers.PBKDF2SHA1PasswordHasher",
+    "users.hashers.Argon2PasswordHasher",
+    "users.hashers.BCryptSHA256PasswordHasher",
+    "users.hashers.ScryptPasswordHasher",
+]
+
+
+def hasher_config(profile):
+    """
+    Build the password hasher settings of a profile.
+
+    Args:
+        profile (str): The profile, see `HASHER_PROFILES`.
+
+    Returns:
+        tuple: The hashers, preferred hasher first, and the cost parameters
+        of the preferred hasher.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if profile not in HASHER_PROFILES:
+        raise ValueError(f"Unsupported password hasher profile: {profile}")
+    preferred, cost = HASHER_PROFILES[profile]
+    hashers = [preferred, *(path for path in HASHERS if path != preferred)]
+    return hashers, dict(cost)
@@ -6,10 +6,17 @@ This module contains the settings for the Django project.
 
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 from django.utils.translation import gettext_lazy as _
 
+from .caches import cache_config
+from .database import database_config, replica_configs
+from .hashers import hasher_config
+from .startup import startup_config
+from .templates import template_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,14 +37,20 @@ ALLOWED_HOSTS = ["*"]
 
 # Application definition
 
+# What a process loads before it is first used, "eager" or "lazy", see
+# config/startup.py; manage.py starts with the "lazy" profile
+STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "eager")
+admin_app, warm_on_startup = startup_config(STARTUP_PROFILE)
+
 INSTALLED_APPS = [
     # Third-party apps
     "django_translation_flags",  # Enhances translation with language flags
     "modeltranslation",  # Provides support for model field translation
+    "rest_framework",  # REST API framework
     "drf_spectacular",  # OpenAPI schema generator
     "corsheaders",  # cors
     # Django built-in apps
-    "django.contrib.admin",  # Django administration panel
+    admin_app,  # Django administration panel
     "django.contrib.auth",  # Django authentication system
     "django.contrib.contenttypes",  # Django content types framework
     "django.contrib.sessions",  # Django session framework
@@ -46,72 +59,211 @@ INSTALLED_APPS = [
     # Custom apps
     "core.apps.CoreConfig",  # Core functionality app
     "users.apps.UsersConfig",  # User management app
+    "tracking.apps.TrackingConfig",  # Eco activity tracking app
 ]
 
+# Django's middleware are replaced by the versions of core.middleware, which
+# run their hooks in the event loop under ASGI (see check core.W002)
 MIDDLEWARE = [
+    # Records the per route request metrics, see METRICS_ENABLED
+    "core.middleware.MetricsMiddleware",
     # Provides security features, such as setting security-related headers
-    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.SecurityMiddleware",
+    # Serves the collected static files, see STATIC_SERVE
+    "core.middleware.StaticFilesMiddleware",
+    # Reads from the primary database after writes of a session or token
+    "core.middleware.ReplicaPinningMiddleware",
     # Manages sessions across requests
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.SessionMiddleware",
     # Handles user language preferences for dynamic language switching
-    "django.middleware.locale.LocaleMiddleware",
+    "core.middleware.LocaleMiddleware",
     # Handles common operations for processing each request
-    "django.middleware.common.CommonMiddleware",
+    "core.middleware.CommonMiddleware",
     # Adds CSRF protection to views that use the CSRF token
-    "django.middleware.csrf.CsrfViewMiddleware",
+    "core.middleware.CsrfViewMiddleware",
     # cors middleware
     "corsheaders.middleware.CorsMiddleware",
     # Handles user authentication
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.AuthenticationMiddleware",
     # Manages messages (e.g., from the messages framework)
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.MessageMiddleware",
     # Adds the X-Frame-Options header to protect against clickjacking attacks
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.XFrameOptionsMiddleware",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        # Signed bearer tokens of the mobile API
+        "users.authentication.SignedTokenAuthentication",
+        # Django sessions, e.g. for logged in admins
+        "rest_framework.authentication.SessionAuthentication",
+    ],
 }
 
+SPECTACULAR_SETTINGS = {
+    # includes the views built on their first request, see core.generators
+    "DEFAULT_GENERATOR_CLASS": "core.generators.SchemaGenerator",
+}
+
+# Lifetimes of the signed API tokens, in seconds
+API_ACCESS_TOKEN_LIFETIME = 5 * 60
+API_REFRESH_TOKEN_LIFETIME = 14 * 24 * 60 * 60
+# Number of users kept in the in-process cache of token authenticated users
+# and the seconds after which a cached user is read from the database again
+API_USER_CACHE_SIZE = 10000
+API_USER_CACHE_TIMEOUT = 60
+
+# Number of activity events validated and inserted at once by an ingestion
+TRACKING_INGEST_BATCH_SIZE = 1000
+# Number of activities whose footprint may be estimated in one request
+TRACKING_ESTIMATE_MAX_ACTIVITIES = 10000
+
+# Version of the deployed code, e.g. the git revision. Precomputed data such
+# as the cached API schema is rebuilt when it changes.
+CODE_VERSION = os.environ.get("CODE_VERSION", "")
+
+# Build the API schema of every language when a worker starts, instead of on
+# the first schema request.
+SCHEMA_CACHE_WARM = not DEBUG and warm_on_startup
+
 ROOT_URLCONF = "config.urls"
 
-TEMPLATES = [
-    {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
-        # List of directories where the engine should look for template files.
-        "DIRS": [BASE_DIR / "templates"],
-        # Whether to look for templates in Django apps. If True,
-        # DjangoTemplates looks for templates in a 'templates' subdirectory of
-        # each app specified in INSTALLED_APPS.
-        "APP_DIRS": True,
-        "OPTIONS": {
-            "context_processors": [
-                #  Adds some variables to the context in debug mode.
-                "django.template.context_processors.debug",
-                #  Adds the request variable to the context.
-                "django.template.context_processors.request",
-                #  Adds the user and request variables to the context.
-                "django.contrib.auth.context_processors.auth",
-                #  Adds the messages variable to the context.
-                "django.contrib.messages.context_processors.messages",
-            ],
-        },
-    },
-]
+# Template engine profile, see config/templates.py: "production" compiles
+# templates once per process and drops the template debug information.
+TEMPLATE_PROFILE = os.environ.get(
+    "TEMPLATE_PROFILE", "development" if DEBUG else "production"
+)
+
+TEMPLATES = [template_config(TEMPLATE_PROFILE, [BASE_DIR / "templates"])]
 
 WSGI_APPLICATION = "config.wsgi.application"
+# Entry point of ASGI servers, e.g. `daphne config.asgi:application`
+ASGI_APPLICATION = "config.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Configured from the environment, see config/database.py: DATABASE_URL
+# selects SQLite (default) or PostgreSQL, DATABASE_CONN_MAX_AGE,
+# DATABASE_POOL*, SQLITE_MMAP_SIZE and SQLITE_BUSY_TIMEOUT tune connections.
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(os.environ, BASE_DIR / "db.sqlite3"),
+    # read replicas from DATABASE_REPLICA_URLS, as "replica_1", "replica_2"
+    **replica_configs(os.environ),
 }
 
+# Sends reads of the replica apps to the replicas and writes to the primary
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+# Apps whose models are read from the replicas
+DATABASE_REPLICA_APPS = ["users", "auth", "tracking"]
+# Seconds reads of a session or token stay on the primary after it wrote,
+# longer than the replication lag
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get("DATABASE_REPLICA_PIN_SECONDS", 5)
+)
+
+# File the emission factors are memory mapped from by all workers of a host,
+# one per project and database. It records the database it was written
+# from, and is rewritten if a worker finds another one.
+EMISSION_FACTOR_CATALOGUE = os.environ.get(
+    "EMISSION_FACTOR_CATALOGUE",
+    BASE_DIR
+    / "var"
+    / f"emission_factors.{Path(DATABASES['default']['NAME']).name}.bin",
+)
+
+
+# Metrics
+# Served in Prometheus format at /metrics/, see core/metrics.py
+
+# Record the wall time, queries, template and hashing time and cache lookups
+# of every request per route.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# Directory the workers of a deployment write their metrics to, to be merged
+METRICS_DIR = os.environ.get("METRICS_DIR", BASE_DIR / "var" / "metrics")
+# Seconds between the writes of the metrics of a worker
+METRICS_FLUSH_INTERVAL = int(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+# Sample the stacks of requests and write those of requests slower than
+# this many milliseconds to PROFILE_DIR, see core/profiling.py; 0 disables
+PROFILE_SLOW_REQUESTS_MS = int(os.environ.get("PROFILE_SLOW_REQUESTS_MS", 0))
+# Milliseconds between two samples of the profiler
+PROFILE_INTERVAL_MS = int(os.environ.get("PROFILE_INTERVAL_MS", 5))
+# Directory the folded stacks of slow requests are written to
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", Path(tempfile.gettempdir()) / "eco-track" / "profiles"
+)
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Configured from the environment, see config/caches.py: CACHE_URL selects
+# the per-process memory cache (default), Redis, Memcached or files.
+CACHES = {
+    "default": cache_config(os.environ),
+    # Rendered template fragments, see {% cache %} in the admin templates.
+    # Kept in the memory of every process: rendering a fragment is cheaper
+    # than fetching it from a shared cache, and a deploy starts empty.
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template-fragments",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+# Whether the default and the response cache have to be shared by all
+# processes, which the system checks core.E001 and core.E003 enforce: the
+# revoked API tokens are otherwise only known to the process that revoked
+# them and are lost on a restart, and invalidated responses are served by the
+# other processes
+CACHE_SHARED_REQUIRED = not DEBUG
+
+# Cache of rendered GET responses, see core/http_cache.py
+RESPONSE_CACHE_ALIAS = "default"
+# Seconds a rendered response is kept, entries are also invalidated when
+# the data they show changes
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+
+# Where sessions are stored: "db", "cached_db" (read from the cache, written
+# through to the database) or "signed_cookies" (no server-side storage).
+SESSION_STORE = os.environ.get("SESSION_STORE", "db")
+# Skip saving sessions whose data did not change during the request.
+SESSION_COALESCE_WRITES = os.environ.get("SESSION_COALESCE_WRITES", "1") == "1"
+
+if SESSION_COALESCE_WRITES and SESSION_STORE in ("db", "cached_db"):
+    SESSION_ENGINE = f"core.sessions.{SESSION_STORE}"
+else:
+    SESSION_ENGINE = f"django.contrib.sessions.backends.{SESSION_STORE}"
+
+
+# Password hashers
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+
+# Selects the hasher of new passwords and its cost, see config/hashers.py;
+# passwords of other hashers or costs are rehashed on the next login.
+PASSWORD_HASHER_PROFILE = os.environ.get("PASSWORD_HASHER_PROFILE", "default")
+# Django's hashers, timed for the request metrics; the first one hashes new
+# passwords with the cost parameters of PASSWORD_HASHER_COST.
+PASSWORD_HASHERS, PASSWORD_HASHER_COST = hasher_config(PASSWORD_HASHER_PROFILE)
+# Where async logins hash, see users/hashing.py: "thread" or "process" for
+# a pool of PASSWORD_HASHING_WORKERS, "inline" for the calling thread.
+PASSWORD_HASHING_EXECUTOR = os.environ.get(
+    "PASSWORD_HASHING_EXECUTOR", "thread"
+)
+# Number of hashing workers; 0 uses the number of CPUs
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 0))
+# Hash operations running or waiting at once, further logins are answered
+# with 503 and Retry-After instead of queueing up
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.environ.get("PASSWORD_HASHING_MAX_PENDING", 64)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -199,13 +351,34 @@ STATICFILES_DIRS = [
     # Additional locations of static files
 ]
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # Collects static files under content hashed names with gzip and brotli
+    # variants, which clients may cache forever
+    "staticfiles": {
+        "BACKEND": "core.staticfiles.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Serve the collected static files from the application process, instead of
+# a separate web server
+STATIC_SERVE = os.environ.get("STATIC_SERVE", "1") == "1"
+
 # Specifies a custom user model for authentication.
 AUTH_USER_MODEL = "users.CustomUser"
+# Authenticates by email and password, with an async path for async logins
+AUTHENTICATION_BACKENDS = ["users.backends.EmailBackend"]
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Runs the tests with the metrics, profiles and emission factor catalogue in
+# a temporary directory
+TEST_RUNNER = "core.testing.TestRunner"
+
 
 # appends apps to BASE_DIR path: ! should stay at the bottom of the file !
 sys.path.append(os.path.join(BASE_DIR, "apps"))
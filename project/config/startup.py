@@ -0,0 +1,65 @@
+"""
+Module: config.startup
+
+This module builds the settings of a startup profile, which selects what a
+process loads before it is first used.
+
+The "eager" profile loads everything when a worker starts, so that no
+request pays for it: the admin modules of the apps are discovered by
+`django.setup()` and the API schema is built when the WSGI or ASGI
+application is imported (without DEBUG). The "lazy" profile defers both to
+their first use, the admin modules to the first load of the URLconf or run
+of the system checks and the schema to its first request, which shortens
+the start of `manage.py` and of short-lived processes.
+
+The model translations of modeltranslation are registered by every profile,
+since they add the fields of every translated language to the models.
+
+Every profile pauses the garbage collector while the project loads, which
+creates many objects but few reference cycles, see `pause_collection`.
+"""
+
+import gc
+
+# the admin app and whether to build the API schema at startup per profile
+STARTUP_PROFILES = {
+    "eager": ("django.contrib.admin", True),
+    "lazy": ("core.apps.LazyAdminConfig", False),
+}
+
+
+def startup_config(profile):
+    """
+    Build the settings of a startup profile.
+
+    Args:
+        profile (str): The profile, see `STARTUP_PROFILES`.
+
+    Returns:
+        tuple: The admin app of `INSTALLED_APPS` and whether the API schema
+        is built at startup.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if profile not in STARTUP_PROFILES:
+        raise ValueError(f"Unsupported startup profile: {profile}")
+    return STARTUP_PROFILES[profile]
+
+
+def pause_collection():
+    """Stop the garbage collector while the project loads."""
+    gc.disable()
+
+
+def resume_collection():
+    """
+    Resume the garbage collector once the project is loaded.
+
+    The objects loaded so far, e.g. the modules, models and URLconf, live as
+    long as the process. They are frozen, so that later collections, and the
+    one at exit, skip them, and forked workers do not copy the memory they
+    share with their parent by collecting them.
+    """
+    gc.freeze()
+    gc.enable()
@@ -0,0 +1,66 @@
+"""
+Module: config.templates
+
+This module builds the template engine settings of a profile. The
+"development" profile finds templates in the template directories and the
+apps, and keeps the debug information of the error page. The "production"
+profile compiles every template once per process with the cached loader and
+drops the debug information.
+"""
+
+TEMPLATE_PROFILES = ("development", "production")
+
+# loaders of the template directories and the apps, as used with APP_DIRS
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+CONTEXT_PROCESSORS = [
+    #  Adds some variables to the context in debug mode.
+    "django.template.context_processors.debug",
+    #  Adds the request variable to the context.
+    "django.template.context_processors.request",
+    #  Adds the user and request variables to the context.
+    "django.contrib.auth.context_processors.auth",
+    #  Adds the messages variable to the context.
+    "django.contrib.messages.context_processors.messages",
+]
+
+
+def template_config(profile, dirs):
+    """
+    Build the settings of the Django template engine.
+
+    Args:
+        profile (str): The profile, "development" or "production".
+        dirs (list): The directories to look for templates in.
+
+    Returns:
+        dict: The template engine settings.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if profile not in TEMPLATE_PROFILES:
+        raise ValueError(f"Unsupported template profile: {profile}")
+    config = {
+        # The Django backend, timing renders for the request metrics
+        "BACKEND": "core.template_backend.DjangoTemplates",
+        # List of directories where the engine should look for template files.
+        "DIRS": dirs,
+        "OPTIONS": {"context_processors": CONTEXT_PROCESSORS},
+    }
+    if profile == "development":
+        # Whether to look for templates in Django apps. If True,
+        # DjangoTemplates looks for templates in a 'templates' subdirectory
+        # of each app specified in INSTALLED_APPS.
+        config["APP_DIRS"] = True
+    else:
+        # templates are read and compiled once per process
+        config["OPTIONS"]["loaders"] = [
+            ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)
+        ]
+        # no origin and line tracking for the error page
+        config["OPTIONS"]["debug"] = False
+    return config
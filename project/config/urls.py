@@ -13,35 +13,59 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from core.http_cache import cache_response
+from core.views import metrics_view
 
 from .decorators import admin_or_superuser_required as perm
+from .decorators import lazy_view
+
+# the admin modules of the apps, unless discovered at startup, see
+# config/startup.py
+admin.autodiscover()
 
 # api urls
 api_patterns = [
-    # path("", include("users.urls")),
+    path("", include("users.urls")),
+    path("", include("tracking.urls")),
 ]
 
+# the documentation pages only change with the code, see CODE_VERSION; the
+# schema is cached by its view. The Swagger UI page is not cached, it holds
+# the CSRF token of the request it was rendered for.
+docs_cache = cache_response("docs")
+
+
+# the documentation views import the schema generator of drf-spectacular,
+# which the other views do not need
+# pylint: disable=import-outside-toplevel
+@lazy_view
+def redoc_view():
+    """Build the view of the ReDoc page."""
+    from drf_spectacular.views import SpectacularRedocView
+
+    return docs_cache(SpectacularRedocView.as_view(url_name="schema"))
+
+
+@lazy_view
+def swagger_ui_view():
+    """Build the view of the Swagger UI page."""
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    return SpectacularSwaggerView.as_view(url_name="schema")
+
+
+@lazy_view
+def schema_view():
+    """Build the view of the cached schema."""
+    from core.schema import CachedSpectacularAPIView
+
+    return CachedSpectacularAPIView.as_view()
+
+
 docs_patterns = [
-    path(
-        "redoc/",
-        perm(SpectacularRedocView.as_view(url_name="schema")),
-        name="redoc",
-    ),
-    path(
-        "swagger-ui/",
-        perm(SpectacularSwaggerView.as_view(url_name="schema")),
-        name="swagger-ui",
-    ),
-    path(
-        "schema/",
-        perm(SpectacularAPIView.as_view()),
-        name="schema",
-    ),
+    path("redoc/", perm(redoc_view), name="redoc"),
+    path("swagger-ui/", perm(swagger_ui_view), name="swagger-ui"),
+    path("schema/", perm(schema_view), name="schema"),
 ]
 
 # urls with translations
@@ -52,12 +76,12 @@ urlpatterns = i18n_patterns(
     path("", admin.site.urls),
 )
 
-# if in debug mode, add static and media urls
+# request metrics in Prometheus format, see core.metrics
+urlpatterns += [path("metrics/", perm(metrics_view), name="metrics")]
+
+# if in debug mode, add media urls; the collected static files are served by
+# core.middleware.StaticFilesMiddleware
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.STATIC_URL,
-        document_root=settings.STATIC_ROOT,
-    )
     urlpatterns += static(
         settings.MEDIA_URL,
         document_root=settings.MEDIA_ROOT,
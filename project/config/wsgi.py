@@ -9,8 +9,22 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from .startup import pause_collection, resume_collection
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
+pause_collection()
+
 application = get_wsgi_application()
+
+# build the cached API schema before the first request
+if settings.SCHEMA_CACHE_WARM:
+    # pylint: disable=wrong-import-position
+    from core.schema import schema_cache
+
+    schema_cache.warm()
+
+resume_collection()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # pylint: disable=django-not-configured
 """Django's command-line utility for administrative tasks."""
+
 import os
 import sys
 
@@ -8,16 +9,32 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    # most commands neither serve requests nor use the admin, see
+    # config/startup.py
+    os.environ.setdefault("STARTUP_PROFILE", "lazy")
     try:
         # pylint: disable=import-outside-toplevel
-        from django.core.management import execute_from_command_line
+        from django.core.management import ManagementUtility
     except ImportError as exc:
         raise ImportError(
             "Couldn't import Django. Are you sure it's installed and "
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv)
+
+    # pylint: disable=import-outside-toplevel
+    from config.startup import pause_collection, resume_collection
+
+    class StartupManagementUtility(ManagementUtility):
+        """Resumes the garbage collector once the project is loaded."""
+
+        def fetch_command(self, subcommand):
+            """Return the command, called after `django.setup()`."""
+            resume_collection()
+            return super().fetch_command(subcommand)
+
+    pause_collection()
+    StartupManagementUtility(sys.argv).execute()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 #!/bin/bash
 
-# Collect the static files
+# Collect the static files under content hashed names, with gzip and brotli
+# variants (see core/staticfiles.py)
 python3 manage.py collectstatic --noinput 
\ No newline at end of file
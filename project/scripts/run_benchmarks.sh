@@ -0,0 +1,5 @@
+#!/bin/bash
+
+# Run the benchmark suite and compare it with the baseline; pass
+# --save-baseline to record a new baseline on this machine
+python3 manage.py benchmark_suite --baseline benchmark-baseline.json "$@"
@@ -3,3 +3,4 @@
 # Run the tests
 python3 manage.py test users.tests
 python3 manage.py test core.tests
+python3 manage.py test tracking.tests